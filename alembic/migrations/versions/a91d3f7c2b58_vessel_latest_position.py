@@ -0,0 +1,58 @@
+"""vessel latest position
+
+Revision ID: a91d3f7c2b58
+Revises: f2c8a6d41e93
+Create Date: 2025-06-18 11:27:45.630418
+
+Tabela z ostatnią znaną pozycją każdej łodzi (kopia najnowszego wpisu
+z locations). Wypełniana przy migracji; dalej utrzymuje ją backend w tej samej
+transakcji co zapis, zmianę i usunięcie wpisów lokalizacji
+(crud/vessel_positions.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2 as ga
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a91d3f7c2b58'
+down_revision: Union[str, None] = 'f2c8a6d41e93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('vessel_latest_position',
+    sa.Column('vessel_id', sa.Integer(), nullable=False),
+    sa.Column('location_id', sa.BigInteger(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('position', ga.types.Geometry(geometry_type='POINT', srid=4326, spatial_index=False, from_text='ST_GeomFromEWKT', name='geometry'), nullable=False),
+    sa.Column('heading', sa.Numeric(precision=5, scale=2), nullable=False),
+    sa.Column('accuracy_meters', sa.Numeric(precision=7, scale=2), nullable=True),
+    sa.Column('source', sa.String(length=50), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['vessel_id'], ['vessels.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('vessel_id')
+    )
+    op.create_index('idx_vessel_latest_position_position', 'vessel_latest_position', ['position'], unique=False, postgresql_using='gist')
+
+    op.execute(
+        """
+        INSERT INTO vessel_latest_position (
+            vessel_id, location_id, timestamp, position, heading,
+            accuracy_meters, source, updated_at
+        )
+        SELECT DISTINCT ON (vessel_id)
+            vessel_id, location_id, timestamp, position, heading,
+            accuracy_meters, source, now()
+        FROM locations
+        ORDER BY vessel_id, timestamp DESC, location_id DESC
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_vessel_latest_position_position', table_name='vessel_latest_position', postgresql_using='gist')
+    op.drop_table('vessel_latest_position')
@@ -0,0 +1,47 @@
+"""geofence zones
+
+Revision ID: b8e3d5a0c7f2
+Revises: c4e7b2a9d315
+Create Date: 2025-06-23 09:41:57.204816
+
+Strefy geofencingu (porty, obszary zastrzeżone) jako wielokąty WGS84.
+Backend trzyma aktywne strefy w pamięci (app/core/geofence.py) i przy
+zapisie pozycji tworzy alerty geofence_enter / geofence_exit.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2 as ga
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e3d5a0c7f2'
+down_revision: Union[str, None] = 'c4e7b2a9d315'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('geofence_zones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('zone_type', sa.String(length=20), nullable=False),
+    sa.Column('area', ga.types.Geometry(geometry_type='MULTIPOLYGON', srid=4326, spatial_index=False, from_text='ST_GeomFromEWKT', name='geometry'), nullable=False),
+    sa.Column('severity', sa.String(length=20), nullable=False),
+    sa.Column('alert_on_enter', sa.Boolean(), nullable=False),
+    sa.Column('alert_on_exit', sa.Boolean(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.CheckConstraint("zone_type IN ('port', 'restricted', 'anchorage', 'other')"),
+    sa.CheckConstraint("severity IN ('info', 'warning', 'critical', 'emergency')"),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_geofence_zones_area', 'geofence_zones', ['area'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    op.drop_index('idx_geofence_zones_area', table_name='geofence_zones', postgresql_using='gist')
+    op.drop_table('geofence_zones')
@@ -0,0 +1,32 @@
+"""locations position time index
+
+Revision ID: c4e7b2a9d315
+Revises: a91d3f7c2b58
+Create Date: 2025-06-20 10:04:12.518733
+
+Złożony indeks GiST (position, timestamp) na locations dla zapytań "kto był
+w obszarze między T1 a T2" (GET /locations/who-was-here): jeden indeks
+zawęża naraz przestrzeń i czas, zamiast łączyć wyniki idx_locations_position
+i idx_locations_timestamp. Kolumna timestamp w GiST wymaga rozszerzenia
+btree_gist. Indeks zakładany na tabeli partycjonowanej powstaje w każdej
+partycji (także w tych tworzonych później).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7b2a9d315'
+down_revision: Union[str, None] = 'a91d3f7c2b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist;")
+    op.create_index('idx_locations_position_timestamp', 'locations', ['position', 'timestamp'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    op.drop_index('idx_locations_position_timestamp', table_name='locations', postgresql_using='gist')
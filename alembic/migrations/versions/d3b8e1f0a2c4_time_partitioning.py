@@ -0,0 +1,156 @@
+"""time partitioning
+
+Revision ID: d3b8e1f0a2c4
+Revises: a5413acc4128
+Create Date: 2025-06-10 09:12:44.318207
+
+Zamienia sensor_readings, locations i ais_data na tabele partycjonowane
+zakresowo (miesięcznie) po kolumnie timestamp. Klucz główny musi zawierać
+kolumnę partycjonującą, więc staje się złożony (id, timestamp). Z tego samego
+powodu klucz obcy weather_data.location_id -> locations zostaje usunięty
+(spójność pilnuje aplikacja, patrz crud/locations.delete_location_entry).
+
+Kolejne partycje tworzy polecenie `python -m app.core.partitions` w backendzie.
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3b8e1f0a2c4'
+down_revision: Union[str, None] = 'a5413acc4128'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+# tabela -> (kolumna id, klucz obcy, indeksy)
+PARTITIONED_TABLES = {
+    "sensor_readings": (
+        "id",
+        "FOREIGN KEY (sensor_id) REFERENCES sensors (id) ON DELETE CASCADE",
+        [
+            "CREATE INDEX idx_sensor_readings_timestamp ON sensor_readings (timestamp)",
+            "CREATE INDEX idx_sensor_readings_sensor_timestamp ON sensor_readings (sensor_id, timestamp)",
+        ],
+    ),
+    "locations": (
+        "location_id",
+        "FOREIGN KEY (vessel_id) REFERENCES vessels (id) ON DELETE CASCADE",
+        [
+            "CREATE INDEX idx_locations_timestamp ON locations (timestamp)",
+            "CREATE INDEX idx_locations_vessel_timestamp ON locations (vessel_id, timestamp)",
+            "CREATE INDEX idx_locations_position ON locations USING gist (position)",
+        ],
+    ),
+    "ais_data": (
+        "ais_data_id",
+        "FOREIGN KEY (vessel_id) REFERENCES vessels (id) ON DELETE CASCADE",
+        [
+            "CREATE INDEX idx_ais_data_vessel_timestamp ON ais_data (vessel_id, timestamp)",
+            "CREATE INDEX idx_ais_data_timestamp ON ais_data (timestamp)",
+            "CREATE INDEX idx_ais_data_position ON ais_data USING gist (position)",
+        ],
+    ),
+}
+
+
+def _add_months(month_start: date, months: int) -> date:
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _drop_indexes(index_statements) -> None:
+    for statement in index_statements:
+        index_name = statement.split()[2]
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+def _copy_table(source: str, target: str, id_column: str) -> None:
+    """Przenosi dane i własność sekwencji id ze starej tabeli do nowej."""
+    op.execute(f"INSERT INTO {target} SELECT * FROM {source}")
+    op.execute(
+        f"""
+        DO $$
+        DECLARE seq_name text := pg_get_serial_sequence('{source}', '{id_column}');
+        BEGIN
+            IF seq_name IS NOT NULL THEN
+                EXECUTE format('ALTER SEQUENCE %s OWNED BY {target}.{id_column}', seq_name);
+            END IF;
+        END $$;
+        """
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.execute(
+        "ALTER TABLE weather_data DROP CONSTRAINT IF EXISTS weather_data_location_id_fkey"
+    )
+
+    for table, (id_column, foreign_key, index_statements) in PARTITIONED_TABLES.items():
+        old_table = f"{table}_unpartitioned"
+        op.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+        op.execute(f"ALTER INDEX {table}_pkey RENAME TO {old_table}_pkey")
+        _drop_indexes(index_statements)
+        op.execute(f"UPDATE {old_table} SET timestamp = now() WHERE timestamp IS NULL")
+
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE (timestamp)"
+        )
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN timestamp SET NOT NULL")
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({id_column}, timestamp)")
+        op.execute(f"ALTER TABLE {table} ADD {foreign_key}")
+
+        # Partycje miesięczne od najstarszych danych do MONTHS_AHEAD miesięcy w przód
+        now = datetime.now(timezone.utc)
+        oldest = bind.execute(sa.text(f"SELECT min(timestamp) FROM {old_table}")).scalar() or now
+        month = date(oldest.year, oldest.month, 1)
+        last_month = _add_months(date(now.year, now.month, 1), MONTHS_AHEAD)
+        while month <= last_month:
+            next_month = _add_months(month, 1)
+            op.execute(
+                f"CREATE TABLE {table}_y{month.year:04d}m{month.month:02d} "
+                f"PARTITION OF {table} FOR VALUES FROM ('{month.isoformat()}') "
+                f"TO ('{next_month.isoformat()}')"
+            )
+            month = next_month
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+        for statement in index_statements:
+            op.execute(statement)
+
+        _copy_table(old_table, table, id_column)
+        op.execute(f"DROP TABLE {old_table}")
+
+
+def downgrade() -> None:
+    for table, (id_column, foreign_key, index_statements) in PARTITIONED_TABLES.items():
+        partitioned_table = f"{table}_partitioned"
+        op.execute(f"ALTER TABLE {table} RENAME TO {partitioned_table}")
+        op.execute(f"ALTER INDEX {table}_pkey RENAME TO {partitioned_table}_pkey")
+        _drop_indexes(index_statements)
+
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {partitioned_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN timestamp DROP NOT NULL")
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({id_column})")
+        op.execute(f"ALTER TABLE {table} ADD {foreign_key}")
+        for statement in index_statements:
+            op.execute(statement)
+
+        _copy_table(partitioned_table, table, id_column)
+        op.execute(f"DROP TABLE {partitioned_table} CASCADE")
+
+    op.create_foreign_key(
+        "weather_data_location_id_fkey",
+        "weather_data",
+        "locations",
+        ["location_id"],
+        ["location_id"],
+    )
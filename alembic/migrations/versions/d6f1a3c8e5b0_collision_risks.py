@@ -0,0 +1,42 @@
+"""collision risks
+
+Revision ID: d6f1a3c8e5b0
+Revises: b8e3d5a0c7f2
+Create Date: 2025-06-25 14:12:38.907351
+
+Bieżące pary łodzi z ryzykiem kolizji (CPA/TCPA) - tabelę nadpisuje przy
+każdej ocenie zadanie w tle backendu (app/core/collision_risk.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6f1a3c8e5b0'
+down_revision: Union[str, None] = 'b8e3d5a0c7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('collision_risks',
+    sa.Column('vessel_id', sa.Integer(), nullable=False),
+    sa.Column('other_vessel_id', sa.Integer(), nullable=False),
+    sa.Column('cpa_meters', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('tcpa_seconds', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('distance_meters', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('first_detected_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('evaluated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.CheckConstraint('vessel_id < other_vessel_id', name='chk_collision_risk_pair_order'),
+    sa.ForeignKeyConstraint(['other_vessel_id'], ['vessels.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['vessel_id'], ['vessels.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('vessel_id', 'other_vessel_id')
+    )
+    op.create_index('idx_collision_risks_other_vessel', 'collision_risks', ['other_vessel_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_collision_risks_other_vessel', table_name='collision_risks')
+    op.drop_table('collision_risks')
@@ -0,0 +1,89 @@
+"""sensor reading rollups
+
+Revision ID: e7a4c19b5d62
+Revises: d3b8e1f0a2c4
+Create Date: 2025-06-12 14:03:27.551904
+
+Tabela agregatów odczytów czujników w oknach 1 minuty, 1 godziny i 1 dnia.
+Istniejące odczyty są agregowane przy migracji (1m z odczytów, 1h z 1m,
+1d z 1h); dalej rollupy utrzymuje backend (crud/sensor_rollups.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a4c19b5d62'
+down_revision: Union[str, None] = 'd3b8e1f0a2c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATUS_ARRAY = "ARRAY['normal', 'warning', 'critical', 'error']"
+
+RAW_SOURCE = """
+    SELECT sensor_id, value AS min_v, value AS max_v, value AS sum_v, 1 AS cnt,
+           value AS first_v, timestamp AS first_ts, value AS last_v,
+           timestamp AS last_ts, coalesce(status, 'normal') AS status, timestamp AS ts
+    FROM sensor_readings
+"""
+
+ROLLUP_SOURCE = """
+    SELECT sensor_id, min_value AS min_v, max_value AS max_v, sum_value AS sum_v,
+           reading_count AS cnt, first_value AS first_v, first_timestamp AS first_ts,
+           last_value AS last_v, last_timestamp AS last_ts, worst_status AS status,
+           bucket_start AS ts
+    FROM sensor_reading_rollups WHERE resolution = '{source}'
+"""
+
+
+def _backfill(resolution: str, unit: str, source_sql: str) -> None:
+    bucket_expr = f"date_trunc('{unit}', s.ts AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'"
+    op.execute(
+        f"""
+        INSERT INTO sensor_reading_rollups (
+            sensor_id, resolution, bucket_start, min_value, max_value, sum_value,
+            reading_count, first_value, first_timestamp, last_value,
+            last_timestamp, worst_status, updated_at
+        )
+        SELECT
+            s.sensor_id, '{resolution}', {bucket_expr},
+            min(s.min_v), max(s.max_v), sum(s.sum_v), sum(s.cnt),
+            (array_agg(s.first_v ORDER BY s.first_ts))[1], min(s.first_ts),
+            (array_agg(s.last_v ORDER BY s.last_ts DESC))[1], max(s.last_ts),
+            ({STATUS_ARRAY})[max(array_position({STATUS_ARRAY}, s.status))],
+            now()
+        FROM ({source_sql}) s
+        GROUP BY s.sensor_id, {bucket_expr}
+        """
+    )
+
+
+def upgrade() -> None:
+    op.create_table('sensor_reading_rollups',
+    sa.Column('sensor_id', sa.Integer(), nullable=False),
+    sa.Column('resolution', sa.String(length=2), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('min_value', sa.Numeric(), nullable=False),
+    sa.Column('max_value', sa.Numeric(), nullable=False),
+    sa.Column('sum_value', sa.Numeric(), nullable=False),
+    sa.Column('reading_count', sa.Integer(), nullable=False),
+    sa.Column('first_value', sa.Numeric(), nullable=False),
+    sa.Column('first_timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_value', sa.Numeric(), nullable=False),
+    sa.Column('last_timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('worst_status', sa.String(length=20), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.CheckConstraint("resolution IN ('1m', '1h', '1d')"),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sensor_id', 'resolution', 'bucket_start')
+    )
+
+    _backfill("1m", "minute", RAW_SOURCE)
+    _backfill("1h", "hour", ROLLUP_SOURCE.format(source="1m"))
+    _backfill("1d", "day", ROLLUP_SOURCE.format(source="1h"))
+
+
+def downgrade() -> None:
+    op.drop_table('sensor_reading_rollups')
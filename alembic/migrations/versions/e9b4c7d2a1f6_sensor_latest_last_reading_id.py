@@ -0,0 +1,42 @@
+"""sensor latest last reading id
+
+Revision ID: e9b4c7d2a1f6
+Revises: d6f1a3c8e5b0
+Create Date: 2025-06-27 09:22:51.406183
+
+Największe id odczytu sensora w sensor_latest. Razem z reading_count służy
+jako znacznik zmian dla ETagów list odczytów (zamiast ostatniego okna rollupu,
+którego nie zmienia odczyt spóźniony). Wartość jest wyliczana przy migracji
+z istniejących odczytów; dalej utrzymuje ją backend (crud/sensor_latest.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9b4c7d2a1f6'
+down_revision: Union[str, None] = 'd6f1a3c8e5b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('sensor_latest', sa.Column('last_reading_id', sa.BigInteger(), nullable=True))
+    op.execute(
+        """
+        UPDATE sensor_latest l
+        SET last_reading_id = r.last_reading_id
+        FROM (
+            SELECT sensor_id, max(id) AS last_reading_id
+            FROM sensor_readings
+            GROUP BY sensor_id
+        ) r
+        WHERE r.sensor_id = l.sensor_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('sensor_latest', 'last_reading_id')
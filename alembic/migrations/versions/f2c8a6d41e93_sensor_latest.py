@@ -0,0 +1,63 @@
+"""sensor latest
+
+Revision ID: f2c8a6d41e93
+Revises: e7a4c19b5d62
+Create Date: 2025-06-16 09:41:12.208315
+
+Tabela bieżącego stanu czujników (ostatni odczyt, liczba odczytów).
+Stan jest wyliczany przy migracji z istniejących odczytów; dalej utrzymuje go
+backend przy każdym zapisie odczytów (crud/sensor_latest.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8a6d41e93'
+down_revision: Union[str, None] = 'e7a4c19b5d62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sensor_latest',
+    sa.Column('sensor_id', sa.Integer(), nullable=False),
+    sa.Column('last_value', sa.Numeric(), nullable=False),
+    sa.Column('last_status', sa.String(length=20), nullable=False),
+    sa.Column('last_timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('reading_count', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensors.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sensor_id')
+    )
+    op.create_index('idx_sensor_latest_last_timestamp', 'sensor_latest', ['last_timestamp'], unique=False)
+
+    # Ostatni odczyt z indeksu (sensor_id, timestamp), liczba z rollupów dziennych
+    op.execute(
+        """
+        INSERT INTO sensor_latest (
+            sensor_id, last_value, last_status, last_timestamp, reading_count, updated_at
+        )
+        SELECT s.id, r.value, coalesce(r.status, 'normal'), r.timestamp,
+               coalesce(c.reading_count, 0), now()
+        FROM sensors s
+        CROSS JOIN LATERAL (
+            SELECT value, status, timestamp FROM sensor_readings
+            WHERE sensor_id = s.id
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 1
+        ) r
+        LEFT JOIN (
+            SELECT sensor_id, sum(reading_count) AS reading_count
+            FROM sensor_reading_rollups WHERE resolution = '1d'
+            GROUP BY sensor_id
+        ) c ON c.sensor_id = s.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_sensor_latest_last_timestamp', table_name='sensor_latest')
+    op.drop_table('sensor_latest')
@@ -0,0 +1,103 @@
+"""
+Benchmark oceny ryzyka kolizji (CPA/TCPA) dla syntetycznej floty (bez bazy).
+
+Łodzie losowane są w kilku skupiskach (porty, tory wodne) o zadanym promieniu
+z losowym kursem i prędkością. Mierzony jest pełny evaluate_snapshot: siatka
+haszująca, wybór kandydatów i wektorowe CPA/TCPA. Cel: migawka 10 000 łodzi
+poniżej 1 s. Z --verify wynik porównywany jest z oceną wszystkich par O(n²)
+(tylko dla małych flot).
+
+    python -m app.benchmarks.collision_risk --sizes 1000 10000 20000 --repeat 5
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.core.collision_risk import (
+    METERS_PER_NM,
+    VesselSnapshot,
+    compute_cpa,
+    dead_reckon,
+    evaluate_snapshot,
+)
+
+
+def _snapshot(size: int, clusters: int, spread_nm: float, seed: int) -> VesselSnapshot:
+    rng = np.random.default_rng(seed)
+    centers = np.column_stack(
+        (rng.uniform(-10, 30, clusters), rng.uniform(35, 65, clusters))
+    )
+    member = rng.integers(0, clusters, size)
+    spread_deg = spread_nm / 60
+    lat = centers[member, 1] + rng.normal(0, spread_deg, size)
+    lon = centers[member, 0] + rng.normal(0, spread_deg, size) / np.cos(np.radians(lat))
+    now = time.time()
+    return VesselSnapshot(
+        vessel_ids=np.arange(1, size + 1, dtype=np.int64),
+        lon=lon,
+        lat=lat,
+        cog=rng.uniform(0, 360, size),
+        sog=rng.choice([0.0, 5.0, 12.0, 20.0], size) + rng.uniform(0, 2, size),
+        timestamp=now - rng.uniform(0, 120, size),
+    )
+
+
+def _brute_force_pairs(snapshot: VesselSnapshot, at: float, **thresholds) -> set:
+    snapshot = dead_reckon(snapshot, at)
+    first, second = np.triu_indices(len(snapshot.vessel_ids), k=1)
+    cpa, tcpa, distance = compute_cpa(snapshot, first, second)
+    underway = snapshot.sog >= thresholds["min_speed_kn"]
+    risky = (
+        (distance <= thresholds["search_radius_m"])
+        & (underway[first] | underway[second])
+        & (tcpa >= 0)
+        & (tcpa <= thresholds["alert_tcpa_s"])
+        & (cpa <= thresholds["alert_distance_m"])
+    )
+    ids = snapshot.vessel_ids
+    return set(zip(ids[first[risky]].tolist(), ids[second[risky]].tolist()))
+
+
+def run(sizes, repeat: int, clusters: int, spread_nm: float, verify: bool) -> None:
+    thresholds = {
+        "search_radius_m": 12 * METERS_PER_NM,
+        "alert_distance_m": 0.5 * METERS_PER_NM,
+        "alert_tcpa_s": 20 * 60,
+        "min_speed_kn": 0.5,
+    }
+    print(
+        f"{'vessels':>8} {'candidates':>11} {'risky':>7} {'median ms':>10} {'max ms':>8}"
+    )
+    for size in sizes:
+        snapshot = _snapshot(size, clusters, spread_nm, seed=size)
+        at = time.time()
+        timings = []
+        for _ in range(repeat):
+            result, stats = evaluate_snapshot(snapshot, at, **thresholds)
+            timings.append(stats["compute_ms"])
+        print(
+            f"{size:>8} {stats['candidate_pairs']:>11} {stats['risky_pairs']:>7} "
+            f"{statistics.median(timings):>10.2f} {max(timings):>8.2f}"
+        )
+        if verify:
+            expected = _brute_force_pairs(snapshot, at, **thresholds)
+            found = set(zip(result.vessel_ids.tolist(), result.other_vessel_ids.tolist()))
+            print(f"{'':>8} verify: {'OK' if found == expected else 'MISMATCH'} ({len(expected)} pairs)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark fleet CPA/TCPA evaluation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--clusters", type=int, default=40)
+    parser.add_argument("--spread-nm", type=float, default=15.0)
+    parser.add_argument("--verify", action="store_true")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.clusters, args.spread_nm, args.verify)
+
+
+if __name__ == "__main__":
+    main()
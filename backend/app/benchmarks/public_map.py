@@ -0,0 +1,138 @@
+"""
+Benchmark danych startowych mapy publicznej (GET /public/map/initial-vessels).
+
+Dla kolejnych rozmiarów floty wstawia syntetyczne aktywne statki (ostatnia
+pozycja + planowana trasa), mierzy liczbę zapytań SQL i czas
+get_public_map_initial_data, a na końcu wycofuje transakcję - baza zostaje
+bez zmian. Liczba zapytań powinna być stała, a czas rosnąć co najwyżej
+liniowo z rozmiarem odpowiedzi.
+
+    python -m app.benchmarks.public_map --sizes 100 500 2000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timezone
+
+from geoalchemy2 import WKTElement
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import async_engine
+from app.crud.public_map import get_public_map_initial_data
+from app.models.models import (
+    Operator,
+    RoutePoint,
+    Vessel,
+    VesselLatestPosition,
+    VesselType,
+)
+
+
+async def _seed(conn, vessel_count: int, route_points: int) -> None:
+    operator_id = (
+        await conn.execute(
+            insert(Operator).returning(Operator.id), [{"name": "benchmark"}]
+        )
+    ).scalar_one()
+    vessel_type_id = (
+        await conn.execute(
+            insert(VesselType).returning(VesselType.id), [{"name": "benchmark"}]
+        )
+    ).scalar_one()
+    vessel_ids = (
+        await conn.execute(
+            insert(Vessel).returning(Vessel.id, sort_by_parameter_order=True),
+            [
+                {
+                    "name": f"benchmark-{i}",
+                    "vessel_type_id": vessel_type_id,
+                    "operator_id": operator_id,
+                    "status": "active",
+                }
+                for i in range(vessel_count)
+            ],
+        )
+    ).scalars().all()
+
+    now = datetime.now(timezone.utc)
+    await conn.execute(
+        insert(VesselLatestPosition),
+        [
+            {
+                "vessel_id": vessel_id,
+                "location_id": i,
+                "timestamp": now,
+                "position": WKTElement(
+                    f"POINT({(i % 360) - 180} {(i % 170) - 85})", srid=4326
+                ),
+                "heading": i % 360,
+                "source": "gps",
+            }
+            for i, vessel_id in enumerate(vessel_ids)
+        ],
+    )
+    if route_points:
+        await conn.execute(
+            insert(RoutePoint),
+            [
+                {
+                    "vessel_id": vessel_id,
+                    "sequence_number": seq,
+                    "planned_position": WKTElement(f"POINT({seq} {seq})", srid=4326),
+                    "status": "planned",
+                }
+                for vessel_id in vessel_ids
+                for seq in range(route_points)
+            ],
+        )
+
+
+async def _measure(conn, repeat: int):
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    event.listen(conn.sync_connection, "before_cursor_execute", count)
+    timings = []
+    try:
+        for _ in range(repeat):
+            statements.clear()
+            session = AsyncSession(bind=conn)
+            started = time.perf_counter()
+            data = await get_public_map_initial_data(session)
+            timings.append((time.perf_counter() - started) * 1000)
+            await session.close()
+    finally:
+        event.remove(conn.sync_connection, "before_cursor_execute", count)
+    return len(data), len(statements), statistics.median(timings)
+
+
+async def run(sizes, repeat: int, route_points: int) -> None:
+    print(f"{'seeded':>8} {'vessels':>8} {'queries':>8} {'median ms':>10}")
+    for size in sizes:
+        async with async_engine.connect() as conn:
+            transaction = await conn.begin()
+            try:
+                await _seed(conn, size, route_points)
+                vessels, queries, median_ms = await _measure(conn, repeat)
+            finally:
+                await transaction.rollback()
+        print(f"{size:>8} {vessels:>8} {queries:>8} {median_ms:>10.1f}")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark public map initial data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--route-points", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.repeat, args.route_points))
+
+
+if __name__ == "__main__":
+    main()
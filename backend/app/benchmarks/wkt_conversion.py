@@ -0,0 +1,154 @@
+"""
+Benchmark zamiany geometrii na WKT w odpowiedziach API.
+
+Dla kolejnych rozmiarów wstawia N punktów do tabeli tymczasowej o kolumnach
+jak locations i mierzy pełną ścieżkę odczytu - zapytanie, transfer i zamianę
+w Pythonie:
+- to_shape - SELECT position (WKB) i WKBElement -> obiekt Shapely -> .wkt
+  dla każdego wiersza osobno (dotychczasowa ścieżka),
+- vectorized - SELECT position (WKB) i jedno wywołanie Shapely 2.0 na całej
+  tablicy WKB,
+- sql_wkt - SELECT point_wkt(position): formatowanie liczb w Postgresie
+  i dłuższy tekst w transferze, w Pythonie nic do zamiany,
+oraz pełne zbudowanie odpowiedzi LocationResponse z wierszy z WKB
+(response_wkb) i z wierszy z gotowym WKT (response_sql). Transakcja jest
+na końcu wycofywana - baza zostaje bez zmian.
+
+    python -m app.benchmarks.wkt_conversion --sizes 1000 10000 50000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import shapely
+from geoalchemy2 import Geometry
+from geoalchemy2.shape import to_shape
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    select,
+    text,
+)
+
+from app.core.database import async_engine
+from app.core.geometry import point_wkt
+from app.schemas.location import LocationResponse
+
+_points = Table(
+    "bench_wkt_points",
+    MetaData(),
+    Column("location_id", BigInteger),
+    Column("vessel_id", Integer),
+    Column("position", Geometry("POINT", srid=4326)),
+    Column("heading", Numeric(5, 2)),
+    Column("accuracy_meters", Numeric(7, 2)),
+    Column("timestamp", DateTime(timezone=True)),
+    Column("source", String(20)),
+    prefixes=["TEMPORARY"],
+)
+_COLUMNS = [column for column in _points.c if column.key != "position"]
+_WKB_QUERY = select(*_COLUMNS, _points.c.position)
+_WKT_QUERY = select(*_COLUMNS, point_wkt(_points.c.position).label("position"))
+
+
+async def _seed(conn, size: int) -> None:
+    await conn.run_sync(_points.metadata.create_all)
+    await conn.execute(
+        text(
+            """
+            INSERT INTO bench_wkt_points
+            SELECT i, 1,
+                   ST_SetSRID(ST_MakePoint(14.0 + (i % 1000) / 997.0,
+                                           54.0 + (i % 500) / 499.0), 4326),
+                   90.00, NULL, now(), 'gps'
+            FROM generate_series(1, :size) AS i
+            """
+        ),
+        {"size": size},
+    )
+    await conn.execute(text("ANALYZE bench_wkt_points"))
+
+
+async def _median_ms(case, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await case()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def _cases(conn):
+    async def rows(query):
+        return (await conn.execute(query)).all()
+
+    async def to_shape_case():
+        return [to_shape(row.position).wkt for row in await rows(_WKB_QUERY)]
+
+    async def vectorized_case():
+        wkb = [bytes(row.position.data) for row in await rows(_WKB_QUERY)]
+        return shapely.to_wkt(shapely.from_wkb(wkb), rounding_precision=-1)
+
+    async def sql_wkt_case():
+        return [row.position for row in await rows(_WKT_QUERY)]
+
+    async def response_wkb_case():
+        return [LocationResponse.model_validate(row) for row in await rows(_WKB_QUERY)]
+
+    async def response_sql_case():
+        return [LocationResponse.model_validate(row) for row in await rows(_WKT_QUERY)]
+
+    return {
+        "to_shape": to_shape_case,
+        "vectorized": vectorized_case,
+        "sql_wkt": sql_wkt_case,
+        "response_wkb": response_wkb_case,
+        "response_sql": response_sql_case,
+    }
+
+
+async def run(sizes, repeat: int) -> None:
+    print(f"{'points':>8} {'case':<14} {'median ms':>10} {'speedup':>8}")
+    baselines = {
+        "to_shape": "to_shape",
+        "vectorized": "to_shape",
+        "sql_wkt": "to_shape",
+        "response_wkb": "response_wkb",
+        "response_sql": "response_wkb",
+    }
+    for size in sizes:
+        async with async_engine.connect() as conn:
+            transaction = await conn.begin()
+            try:
+                await _seed(conn, size)
+                results = {
+                    name: await _median_ms(case, repeat)
+                    for name, case in _cases(conn).items()
+                }
+            finally:
+                await transaction.rollback()
+        for name, median_ms in results.items():
+            baseline = results[baselines[name]]
+            speedup = baseline / median_ms if median_ms else float("inf")
+            print(f"{size:>8} {name:<14} {median_ms:>10.2f} {speedup:>7.1f}x")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark geometry to WKT conversion")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
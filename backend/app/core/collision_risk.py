@@ -0,0 +1,310 @@
+"""
+Ocena ryzyka kolizji całej floty (CPA/TCPA) w tle.
+
+Co CPA_EVALUATION_INTERVAL_S sekund pobierany jest ostatni wpis AIS każdej
+łodzi z ostatnich CPA_MAX_POSITION_AGE_S sekund (pozycja, COG, SOG). Pary do
+oceny wybiera siatka haszująca: pozycje zamieniane są na punkty 3D na sferze
+(bez problemów z antypołudnikiem i biegunami), komórka ma bok równy promieniowi
+wyszukiwania, więc para bliższa niż CPA_SEARCH_RADIUS_NM leży w tej samej lub
+sąsiedniej komórce. Zamiast O(n²) par liczone są tylko pary z sąsiednich
+komórek, a CPA (najmniejsza odległość) i TCPA (czas do niej) dla wszystkich
+kandydatów naraz - wektorowo w NumPy, w lokalnym układzie płaskim pary.
+Wpisy AIS mają różny wiek, więc przed wyborem par pozycje przesuwane są do
+wspólnej chwili oceny (dead reckoning z COG/SOG).
+
+Para jest ryzykowna, gdy łodzie się zbliżają, CPA <= CPA_ALERT_DISTANCE_NM
+i TCPA <= CPA_ALERT_TCPA_MINUTES (pary dwóch stojących łodzi są pomijane).
+Bieżące ryzykowne pary trafiają do tabeli collision_risks, a nowa para - do
+alerts (crud/collision_risks.py). Przy kilku workerach ocenę w danej chwili
+wykonuje jeden (blokada doradcza PostgreSQL).
+
+Jednorazowa ocena (wynik zapisywany w bazie):
+    python -m app.core.collision_risk
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.database import AsyncSessionLocal
+from app.crud import collision_risks as crud_collision_risk
+
+logger = logging.getLogger(__name__)
+
+CPA_EVALUATION_INTERVAL_S = int(os.getenv("CPA_EVALUATION_INTERVAL_S", "30"))
+CPA_SEARCH_RADIUS_NM = float(os.getenv("CPA_SEARCH_RADIUS_NM", "12"))
+CPA_ALERT_DISTANCE_NM = float(os.getenv("CPA_ALERT_DISTANCE_NM", "0.5"))
+CPA_ALERT_TCPA_MINUTES = float(os.getenv("CPA_ALERT_TCPA_MINUTES", "20"))
+CPA_MAX_POSITION_AGE_S = int(os.getenv("CPA_MAX_POSITION_AGE_S", "600"))
+CPA_MIN_SPEED_KN = float(os.getenv("CPA_MIN_SPEED_KN", "0.5"))
+
+EARTH_RADIUS_M = 6_371_008.8
+METERS_PER_NM = 1852.0
+KNOT_MS = METERS_PER_NM / 3600
+# Wartości AIS oznaczające "niedostępne"
+AIS_COG_UNAVAILABLE = 360.0
+AIS_SOG_UNAVAILABLE = 102.3
+
+# Klucz komórki: trzy współrzędne po 20 bitów (przesunięte do wartości dodatnich)
+_AXIS_BITS = 20
+_AXIS_OFFSET = 1 << (_AXIS_BITS - 1)
+_MIN_CELL_M = EARTH_RADIUS_M / (_AXIS_OFFSET - 2)
+# Ta sama komórka i 13 z 26 sąsiednich - każda para komórek oceniana raz
+_HALF_NEIGHBOURHOOD = [(0, 0, 0)] + [
+    (dx, dy, dz)
+    for dx in (-1, 0, 1)
+    for dy in (-1, 0, 1)
+    for dz in (-1, 0, 1)
+    if (dx, dy, dz) > (0, 0, 0)
+]
+
+
+class VesselSnapshot(NamedTuple):
+    vessel_ids: np.ndarray  # int64
+    lon: np.ndarray  # stopnie
+    lat: np.ndarray
+    cog: np.ndarray  # stopnie
+    sog: np.ndarray  # węzły
+    timestamp: np.ndarray  # sekundy epoki
+
+
+class CpaResult(NamedTuple):
+    vessel_ids: np.ndarray  # mniejsze id pary
+    other_vessel_ids: np.ndarray
+    cpa_meters: np.ndarray
+    tcpa_seconds: np.ndarray
+    distance_meters: np.ndarray
+
+
+def snapshot_from_rows(rows) -> VesselSnapshot:
+    """Migawka z wierszy (vessel_id, timestamp, lon, lat, cog, sog); pomija dane niedostępne."""
+    vessel_ids = np.array([row.vessel_id for row in rows], dtype=np.int64)
+    values = np.array(
+        [
+            (row.lon, row.lat, row.cog, row.sog, row.timestamp.timestamp())
+            for row in rows
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 5)
+    lon, lat, cog, sog, timestamp = values.T
+    valid = (cog < AIS_COG_UNAVAILABLE) & (sog < AIS_SOG_UNAVAILABLE)
+    return VesselSnapshot(
+        vessel_ids[valid], lon[valid], lat[valid], cog[valid], sog[valid], timestamp[valid]
+    )
+
+
+def _velocities(snapshot: VesselSnapshot) -> Tuple[np.ndarray, np.ndarray]:
+    """Składowe prędkości wschód/północ w m/s."""
+    cog = np.radians(snapshot.cog)
+    speed = snapshot.sog * KNOT_MS
+    return speed * np.sin(cog), speed * np.cos(cog)
+
+
+def dead_reckon(snapshot: VesselSnapshot, at: float) -> VesselSnapshot:
+    """Pozycje przesunięte po kursie do chwili at (sekundy epoki)."""
+    v_east, v_north = _velocities(snapshot)
+    age = at - snapshot.timestamp
+    lat = snapshot.lat + np.degrees(v_north * age / EARTH_RADIUS_M)
+    cos_lat = np.maximum(np.cos(np.radians(snapshot.lat)), 1e-6)
+    lon = snapshot.lon + np.degrees(v_east * age / (EARTH_RADIUS_M * cos_lat))
+    return snapshot._replace(
+        lon=(lon + 180.0) % 360.0 - 180.0,
+        lat=np.clip(lat, -90.0, 90.0),
+        timestamp=np.full_like(snapshot.timestamp, at),
+    )
+
+
+def _unit_xyz(lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    lon_r, lat_r = np.radians(lon), np.radians(lat)
+    cos_lat = np.cos(lat_r)
+    return EARTH_RADIUS_M * np.column_stack(
+        (cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r))
+    )
+
+
+def _cell_keys(cells: np.ndarray) -> np.ndarray:
+    shifted = cells + _AXIS_OFFSET
+    return (shifted[:, 0] << (2 * _AXIS_BITS)) + (shifted[:, 1] << _AXIS_BITS) + shifted[:, 2]
+
+
+def candidate_pairs(
+    lon: np.ndarray, lat: np.ndarray, radius_m: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indeksy (first, second) par punktów odległych o co najwyżej radius_m
+    (cięciwa, dla małych odległości równa odległości po sferze). Każda para raz.
+    """
+    if radius_m < _MIN_CELL_M:
+        raise ValueError(f"Search radius must be at least {_MIN_CELL_M:.0f} m.")
+    xyz = _unit_xyz(lon, lat)
+    keys = _cell_keys(np.floor(xyz / radius_m).astype(np.int64))
+    order = np.argsort(keys, kind="stable")
+    cell_keys, starts, counts = np.unique(
+        keys[order], return_index=True, return_counts=True
+    )
+
+    firsts, seconds = [], []
+    for dx, dy, dz in _HALF_NEIGHBOURHOOD:
+        target = cell_keys + ((dx << (2 * _AXIS_BITS)) + (dy << _AXIS_BITS) + dz)
+        position = np.minimum(np.searchsorted(cell_keys, target), len(cell_keys) - 1)
+        found = cell_keys[position] == target
+        cell_a, cell_b = np.nonzero(found)[0], position[found]
+        size_a, size_b = counts[cell_a], counts[cell_b]
+        sizes = size_a * size_b
+        total = int(sizes.sum())
+        if total == 0:
+            continue
+        # Iloczyn kartezjański członków komórek a i b dla wszystkich par komórek naraz
+        group = np.repeat(np.arange(len(cell_a)), sizes)
+        local = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        index_a, index_b = np.divmod(local, size_b[group])
+        if (dx, dy, dz) == (0, 0, 0):
+            keep = index_a < index_b
+            group, index_a, index_b = group[keep], index_a[keep], index_b[keep]
+        firsts.append(order[starts[cell_a][group] + index_a])
+        seconds.append(order[starts[cell_b][group] + index_b])
+
+    if not firsts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    first, second = np.concatenate(firsts), np.concatenate(seconds)
+    offset = xyz[first] - xyz[second]
+    close = np.einsum("ij,ij->i", offset, offset) <= radius_m * radius_m
+    return first[close], second[close]
+
+
+def compute_cpa(
+    snapshot: VesselSnapshot, first: np.ndarray, second: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    CPA (m), TCPA (s, ujemne - łodzie się oddalają) i bieżąca odległość (m)
+    dla par indeksów migawki z pozycjami z tej samej chwili (dead_reckon).
+    """
+    lat_a, lat_b = snapshot.lat[first], snapshot.lat[second]
+    dlon = (snapshot.lon[second] - snapshot.lon[first] + 180.0) % 360.0 - 180.0
+    mean_lat = np.radians((lat_a + lat_b) / 2)
+    # Położenie b względem a w lokalnym układzie wschód/północ (metry)
+    east = np.radians(dlon) * EARTH_RADIUS_M * np.cos(mean_lat)
+    north = np.radians(lat_b - lat_a) * EARTH_RADIUS_M
+
+    v_east, v_north = _velocities(snapshot)
+    dv_east = v_east[second] - v_east[first]
+    dv_north = v_north[second] - v_north[first]
+    dv_squared = dv_east * dv_east + dv_north * dv_north
+    moving = dv_squared > 1e-9
+    tcpa = np.zeros_like(east)
+    np.divide(-(east * dv_east + north * dv_north), dv_squared, out=tcpa, where=moving)
+    ahead = np.maximum(tcpa, 0.0)
+    cpa = np.hypot(east + dv_east * ahead, north + dv_north * ahead)
+    return cpa, tcpa, np.hypot(east, north)
+
+
+def evaluate_snapshot(
+    snapshot: VesselSnapshot,
+    at: float,
+    search_radius_m: float = CPA_SEARCH_RADIUS_NM * METERS_PER_NM,
+    alert_distance_m: float = CPA_ALERT_DISTANCE_NM * METERS_PER_NM,
+    alert_tcpa_s: float = CPA_ALERT_TCPA_MINUTES * 60,
+    min_speed_kn: float = CPA_MIN_SPEED_KN,
+) -> Tuple[CpaResult, Dict[str, Any]]:
+    """Ryzykowne pary migawki i liczniki (łodzie, kandydaci, czas w ms)."""
+    started = time.perf_counter()
+    snapshot = dead_reckon(snapshot, at)
+    first, second = candidate_pairs(snapshot.lon, snapshot.lat, search_radius_m)
+    cpa, tcpa, distance = compute_cpa(snapshot, first, second)
+    underway = (snapshot.sog[first] >= min_speed_kn) | (snapshot.sog[second] >= min_speed_kn)
+    risky = (
+        underway
+        & (tcpa >= 0)
+        & (tcpa <= alert_tcpa_s)
+        & (cpa <= alert_distance_m)
+    )
+    ids_a, ids_b = snapshot.vessel_ids[first[risky]], snapshot.vessel_ids[second[risky]]
+    result = CpaResult(
+        np.minimum(ids_a, ids_b),
+        np.maximum(ids_a, ids_b),
+        cpa[risky],
+        tcpa[risky],
+        distance[risky],
+    )
+    stats = {
+        "vessels": len(snapshot.vessel_ids),
+        "candidate_pairs": len(first),
+        "risky_pairs": int(risky.sum()),
+        "compute_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    return result, stats
+
+
+last_run: Dict[str, Any] = {}
+
+
+async def evaluate_fleet() -> Optional[Dict[str, Any]]:
+    """Jedna ocena całej floty; None, gdy ocenę wykonuje właśnie inny worker."""
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        if not await crud_collision_risk.try_lock_evaluation_async(db):
+            return None
+        rows = await crud_collision_risk.get_ais_snapshot_async(
+            db, since=now - timedelta(seconds=CPA_MAX_POSITION_AGE_S)
+        )
+        snapshot = snapshot_from_rows(rows)
+        # Obliczenia NumPy poza pętlą zdarzeń
+        result, stats = await asyncio.to_thread(
+            evaluate_snapshot, snapshot, now.timestamp()
+        )
+        stats["new_pairs"] = await crud_collision_risk.store_collision_risks_async(
+            db, result, evaluated_at=now
+        )
+        await db.commit()
+    stats["evaluated_at"] = now
+    last_run.clear()
+    last_run.update(stats)
+    return stats
+
+
+_task: Optional[asyncio.Task] = None
+
+
+async def _run() -> None:
+    while True:
+        await asyncio.sleep(CPA_EVALUATION_INTERVAL_S)
+        try:
+            await evaluate_fleet()
+        except Exception:
+            logger.exception("Collision risk evaluation failed")
+
+
+def start_collision_risk() -> None:
+    global _task
+    if _task is None and CPA_EVALUATION_INTERVAL_S > 0:
+        _task = asyncio.create_task(_run())
+
+
+async def stop_collision_risk() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+def main() -> None:
+    stats = asyncio.run(evaluate_fleet())
+    if stats is None:
+        print("Evaluation is already running in another process")
+        return
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
@@ -7,3 +8,30 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+
+def get_async_database_url(url: str) -> str:
+    """Zamienia URL psycopg2 (postgresql://) na URL sterownika asyncpg."""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix) :]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", get_async_database_url(DATABASE_URL)
+)
+
+# Silnik asynchroniczny (asyncpg) dla gorących ścieżek API - zapytania nie blokują
+# wątków z puli, więc jeden worker uvicorna obsłuży setki równoległych żądań.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=int(os.getenv("ASYNC_DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "20")),
+    pool_pre_ping=True,
+)
+# expire_on_commit=False - po commit obiekty nadal mają załadowane atrybuty,
+# bo w trybie async nie wolno ich doładowywać leniwie przy serializacji.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
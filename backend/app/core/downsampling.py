@@ -0,0 +1,69 @@
+"""
+Próbkowanie w dół szeregów czasowych dla wykresów - Largest-Triangle-Three-Buckets.
+
+LTTB wybiera z każdego kubełka punkt tworzący największy trójkąt z punktem
+wybranym w poprzednim kubełku i średnią kolejnego kubełka, więc zachowuje
+kształt wykresu (piki, spadki) przy stałej liczbie punktów. Zwracane są
+oryginalne odczyty, nie wartości uśrednione.
+"""
+
+from typing import Sequence, List
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indeksy punktów wybranych przez LTTB (x rosnące, threshold >= 3)."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Pierwszy i ostatni punkt zawsze zostają, pozostałe n-2 dzielimy
+    # na threshold-2 kubełków: kubełek i to [edges[i], edges[i + 1]).
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    # Średnie "następnego" kubełka dla każdego kubełka naraz (sumy prefiksowe);
+    # dla ostatniego kubełka następnym jest sam ostatni punkt.
+    next_starts = edges[1:]
+    next_ends = np.append(edges[2:], n)
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    next_sizes = next_ends - next_starts
+    avg_x = (cum_x[next_ends] - cum_x[next_starts]) / next_sizes
+    avg_y = (cum_y[next_ends] - cum_y[next_starts]) / next_sizes
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # Podwojone pola trójkątów (a, kandydat, średnia następnego kubełka)
+        areas = np.abs(
+            (ax - avg_x[i]) * (y[start:end] - ay)
+            - (ax - x[start:end]) * (avg_y[i] - ay)
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_readings(readings: Sequence, max_points: int) -> List:
+    """
+    Zwraca co najwyżej max_points odczytów (obiektów z atrybutami timestamp
+    i value) posortowanych rosnąco po czasie.
+    """
+    n = len(readings)
+    if n <= max_points:
+        return list(readings)
+
+    first_timestamp = readings[0].timestamp.timestamp()
+    # Czas względem pierwszego odczytu - mniejsze liczby, mniejszy błąd float64
+    x = np.fromiter(
+        (r.timestamp.timestamp() - first_timestamp for r in readings),
+        dtype=np.float64,
+        count=n,
+    )
+    y = np.fromiter((float(r.value) for r in readings), dtype=np.float64, count=n)
+    return [readings[i] for i in lttb_indices(x, y, max_points)]
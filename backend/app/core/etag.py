@@ -0,0 +1,33 @@
+"""
+Słabe ETagi dla odpytywania przyrostowego (auto-odświeżanie wykresów).
+
+ETag liczony jest z taniego znacznika "najnowszych danych" (np. ostatniego
+okna rollupu 1m sensora) i parametrów zapytania. Gdy klient odsyła go
+w If-None-Match, a znacznik się nie zmienił, endpoint odpowiada 304 bez
+odpytywania tabeli odczytów.
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Response
+
+ETAG_HEADERS = {"Cache-Control": "no-cache"}  # Zawsze rewalidacja, nigdy świeża kopia
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Porównanie słabe - prefiks W/ nie ma znaczenia
+    bare = etag.removeprefix("W/")
+    return "*" in candidates or any(tag.removeprefix("W/") == bare for tag in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **ETAG_HEADERS})
@@ -0,0 +1,193 @@
+"""
+Alternatywne formaty odpowiedzi list szeregów czasowych.
+
+- NDJSON / CSV - serializacja strumieniowa paczek wierszy dla StreamingResponse;
+  każda paczka z kursora zamieniana jest na jeden fragment tekstu, więc pamięć
+  zależy od rozmiaru paczki, a nie od liczby eksportowanych wierszy.
+- columnar / msgpack - struktura tablic ({"timestamps": [...], "values": [...]})
+  budowana wprost z krotek wyniku zapytania, bez modelu Pydantic na wiersz.
+- GeoJSON - FeatureCollection składany w całości w Postgresie (json_agg,
+  ST_AsGeoJSON); Python przekazuje gotowy tekst bez obiektów i walidacji.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import AsyncIterator, Dict, Optional, Sequence, Tuple
+
+import msgpack
+from fastapi import Response
+from sqlalchemy import JSON, Select, Text, cast, func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_value(value):
+    # Decimal jako tekst - tak samo jak w odpowiedziach JSON API (bez utraty precyzji)
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def ndjson_chunks(
+    chunks: AsyncIterator[Sequence], columns: Sequence[str]
+) -> AsyncIterator[str]:
+    async for rows in chunks:
+        yield "".join(
+            json.dumps({c: _json_value(v) for c, v in zip(columns, row)}) + "\n"
+            for row in rows
+        )
+
+
+async def csv_chunks(
+    chunks: AsyncIterator[Sequence], columns: Sequence[str]
+) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    async for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue()
+
+
+def export_chunks(
+    export_format: str, chunks: AsyncIterator[Sequence], columns: Sequence[str]
+) -> AsyncIterator[str]:
+    if export_format == "csv":
+        return csv_chunks(chunks, columns)
+    return ndjson_chunks(chunks, columns)
+
+
+COLUMNAR_MEDIA_TYPES = {
+    "columnar": "application/json",
+    "msgpack": "application/msgpack",
+}
+
+
+def _columnar_default(value):
+    # W formatach kolumnowych liczby jako float - zwarte tablice dla wykresów
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unsupported type {type(value).__name__}")
+
+
+def to_columns(rows: Sequence, columns: Dict[str, str]) -> Dict[str, list]:
+    """Zamienia wiersze na słownik tablic: klucz wyniku -> atrybut wiersza."""
+    return {key: [getattr(row, attr) for row in rows] for key, attr in columns.items()}
+
+
+def columnar_response(
+    export_format: str,
+    rows: Sequence,
+    columns: Dict[str, str],
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    data = to_columns(rows, columns)
+    if export_format == "msgpack":
+        # Znaczniki czasu jako natywny typ Timestamp MessagePack
+        content = msgpack.packb(data, default=_columnar_default, datetime=True)
+    else:
+        content = json.dumps(data, default=_columnar_default, separators=(",", ":"))
+    return Response(
+        content=content,
+        media_type=COLUMNAR_MEDIA_TYPES[export_format],
+        headers=headers,
+    )
+
+
+GEOJSON_MEDIA_TYPE = "application/geo+json"
+GEOJSON_DEFAULT_PRECISION = 6  # Miejsca po przecinku współrzędnych (~0,1 m)
+
+
+def geojson_select(
+    page: Select,
+    id_column: str,
+    order: Sequence[Tuple[str, bool]],
+    precision: int = GEOJSON_DEFAULT_PRECISION,
+    cursor_columns: Sequence[str] = (),
+) -> Select:
+    """
+    Zapytanie zwracające jedną stronę jako FeatureCollection (tekst JSON).
+
+    page - zapytanie strony (filtry, sortowanie, limit) z geometrią w kolumnie
+    "geometry"; pozostałe kolumny poza id_column trafiają do properties.
+    order - (kolumna, malejąco) w kolejności sortowania strony; cursor_columns
+    - kolumny klucza, których wartości z ostatniego wiersza wracają jako
+    cursor_0, cursor_1, ... (do X-Next-Cursor).
+    """
+    # CTE użyte kilka razy (kolekcja i kursor) jest liczone przez Postgresa raz
+    page = page.cte("page")
+    ordering = [
+        page.c[name].desc() if descending else page.c[name].asc()
+        for name, descending in order
+    ]
+    reversed_ordering = [
+        page.c[name].asc() if descending else page.c[name].desc()
+        for name, descending in order
+    ]
+    properties = []
+    for column in page.c:
+        if column.name not in ("geometry", id_column):
+            properties.extend((literal_column(f"'{column.name}'"), column))
+    feature = func.json_build_object(
+        literal_column("'type'"),
+        literal_column("'Feature'"),
+        literal_column("'id'"),
+        page.c[id_column],
+        literal_column("'geometry'"),
+        cast(func.ST_AsGeoJSON(page.c.geometry, precision), JSON),
+        literal_column("'properties'"),
+        func.json_build_object(*properties),
+    )
+    collection = func.json_build_object(
+        literal_column("'type'"),
+        literal_column("'FeatureCollection'"),
+        literal_column("'features'"),
+        func.coalesce(
+            func.json_agg(aggregate_order_by(feature, *ordering)),
+            literal_column("'[]'::json"),
+        ),
+    )
+    # Klucz ostatniego wiersza strony = pierwszego w odwróconej kolejności
+    cursor = [
+        select(page.c[name])
+        .order_by(*reversed_ordering)
+        .limit(1)
+        .scalar_subquery()
+        .label(f"cursor_{i}")
+        for i, name in enumerate(cursor_columns)
+    ]
+    return select(
+        cast(collection, Text).label("collection"),
+        func.count().label("feature_count"),
+        *cursor,
+    ).select_from(page)
+
+
+def geojson_response(row, limit: Optional[int] = None) -> Response:
+    """Odpowiedź z gotowym tekstem FeatureCollection; kursor, gdy strona jest pełna."""
+    headers = {}
+    cursor = [value for key, value in row._mapping.items() if key.startswith("cursor_")]
+    if cursor and limit is not None and row.feature_count >= limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(cursor)
+    return Response(
+        content=row.collection, media_type=GEOJSON_MEDIA_TYPE, headers=headers
+    )
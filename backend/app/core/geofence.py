@@ -0,0 +1,293 @@
+"""
+Geofencing w ścieżce ingestii pozycji.
+
+Aktywne strefy z geofence_zones są trzymane w pamięci procesu jako STRtree
+przygotowanych (shapely.prepare) wielokątów. Nowe pozycje (Location, AisData)
+są sprawdzane względem drzewa paczką: zapytanie po prostokątach ograniczających
+wybiera kandydatów w O(log n), dokładny test wykonują przygotowane geometrie.
+Wejście i wyjście łodzi ze strefy to różnica względem poprzedniego zbioru stref
+łodzi - zapisywana jako wiersze alerts w tej samej transakcji co pozycja
+(crud/geofences.py). Nowy stan łodzi trafia do pamięci po commit, rollback go
+porzuca. Nie ma okresowych skanów ST_Contains po historii lokalizacji.
+
+Stan jest per proces: przy starcie inicjowany z vessel_latest_position (bez
+alertów), strefy zmienione w innym workerze są doładowywane co
+GEOFENCE_RELOAD_INTERVAL_S sekund. Pozycja spóźniona (starsza od ostatnio
+ocenionej dla łodzi) nie zmienia stanu. Zmiany i usunięcia historycznych
+wpisów lokalizacji nie generują alertów.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import shapely
+from geoalchemy2.elements import WKBElement, WKTElement
+from geoalchemy2.shape import to_shape
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import AsyncSessionLocal
+from app.crud.sensor_rollups import as_utc
+from app.models.models import GeofenceZone, VesselLatestPosition
+
+logger = logging.getLogger(__name__)
+
+GEOFENCE_RELOAD_INTERVAL_S = int(os.getenv("GEOFENCE_RELOAD_INTERVAL_S", "60"))
+
+_PENDING_KEY = "geofence_states_pending"
+
+
+class ZoneInfo(NamedTuple):
+    zone_id: int
+    name: str
+    zone_type: str
+    severity: str
+    alert_on_enter: bool
+    alert_on_exit: bool
+
+
+class VesselZoneState(NamedTuple):
+    timestamp: datetime
+    zone_ids: FrozenSet[int]
+
+
+_ZONE_COLUMNS = (
+    GeofenceZone.id,
+    GeofenceZone.name,
+    GeofenceZone.zone_type,
+    GeofenceZone.severity,
+    GeofenceZone.alert_on_enter,
+    GeofenceZone.alert_on_exit,
+    func.ST_AsBinary(GeofenceZone.area),
+)
+
+
+def _zones_query():
+    return select(*_ZONE_COLUMNS).where(GeofenceZone.active.is_(True))
+
+
+def _as_point(value: Any):
+    """Pozycja z wiersza ingestii (WKT, WKTElement/WKBElement, Shapely) jako geometria."""
+    if value is None:
+        return None
+    if isinstance(value, (WKBElement, WKTElement)):
+        return to_shape(value)
+    if isinstance(value, str):
+        return shapely.from_wkt(value)
+    return value
+
+
+class GeofenceIndex:
+    def __init__(self):
+        self._zones: Dict[int, ZoneInfo] = {}
+        self._zone_ids = np.empty(0, dtype=np.int64)
+        self._areas = np.empty(0, dtype=object)
+        self._tree: Optional[shapely.STRtree] = None
+        self._states: Dict[int, VesselZoneState] = {}
+        self._lock = threading.Lock()
+        self.loaded_at: Optional[datetime] = None
+        self.evaluated_points = 0
+        self.transitions = 0
+
+    def load(self, rows: Iterable[Tuple]) -> int:
+        """Buduje drzewo z wierszy _ZONE_COLUMNS (ostatnia kolumna to WKB obszaru)."""
+        zones, areas = {}, []
+        for row in rows:
+            zones[row[0]] = ZoneInfo(*row[:-1])
+            areas.append(bytes(row[-1]))
+        zone_ids = np.fromiter(zones, dtype=np.int64, count=len(zones))
+        areas = shapely.from_wkb(np.array(areas, dtype=object))
+        shapely.prepare(areas)
+        tree = shapely.STRtree(areas) if len(areas) else None
+        with self._lock:
+            self._zones, self._zone_ids, self._areas, self._tree = (
+                zones,
+                zone_ids,
+                areas,
+                tree,
+            )
+            # Usunięta lub wyłączona strefa znika ze stanu łodzi bez alertu wyjścia
+            self._states = {
+                vessel_id: state._replace(zone_ids=state.zone_ids.intersection(zones))
+                for vessel_id, state in self._states.items()
+            }
+            self.loaded_at = datetime.now(timezone.utc)
+        return len(zones)
+
+    def reload(self, db: Session) -> int:
+        return self.load(db.execute(_zones_query()).all())
+
+    async def reload_async(self, db: AsyncSession) -> int:
+        return self.load((await db.execute(_zones_query())).all())
+
+    async def warm_async(self, db: AsyncSession) -> int:
+        """Ładuje strefy i ustawia stan łodzi z ich ostatnich pozycji (bez alertów)."""
+        count = await self.reload_async(db)
+        rows = (
+            await db.execute(
+                select(
+                    VesselLatestPosition.vessel_id,
+                    VesselLatestPosition.timestamp,
+                    VesselLatestPosition.position,
+                )
+            )
+        ).all()
+        _, states = self.evaluate([row._asdict() for row in rows])
+        self.commit_states(states)
+        return count
+
+    def zones_containing(self, points: List) -> List[FrozenSet[int]]:
+        """Zbiory id stref zawierających kolejne punkty (brzeg strefy się liczy)."""
+        with self._lock:
+            tree, areas, zone_ids = self._tree, self._areas, self._zone_ids
+        found: List[set] = [set() for _ in points]
+        if tree is None or not points:
+            return [frozenset(zones) for zones in found]
+        geometries = np.array(points, dtype=object)
+        # Kandydaci po prostokątach ograniczających, potem dokładny test
+        # na przygotowanych wielokątach (pierwszy argument intersects)
+        point_idx, area_idx = tree.query(geometries)
+        hits = shapely.intersects(areas[area_idx], geometries[point_idx])
+        for point_i, zone_id in zip(point_idx[hits], zone_ids[area_idx[hits]]):
+            found[point_i].add(int(zone_id))
+        return [frozenset(zones) for zones in found]
+
+    def evaluate(
+        self, rows: Iterable[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[int, VesselZoneState]]:
+        """
+        Przejścia (słowniki z vessel_id, zone, event, timestamp) dla pozycji
+        w kolejności czasu oraz nowy stan zmienionych łodzi. Stan w pamięci
+        nie jest zmieniany - robi to commit_states.
+        """
+        positions = []
+        for row in rows:
+            point = _as_point(row.get("position"))
+            if point is not None and row.get("vessel_id") is not None:
+                positions.append((row["vessel_id"], as_utc(row["timestamp"]), point))
+        if not positions:
+            return [], {}
+        positions.sort(key=lambda position: position[:2])
+        containing = self.zones_containing([position[2] for position in positions])
+
+        with self._lock:
+            zones = self._zones
+            states = {
+                vessel_id: self._states.get(vessel_id)
+                for vessel_id in {position[0] for position in positions}
+            }
+
+        transitions = []
+        for (vessel_id, timestamp, _), zone_ids in zip(positions, containing):
+            state = states[vessel_id]
+            # Pierwsza pozycja łodzi to wejście do stref, w których się znajduje
+            previous = state.zone_ids if state is not None else frozenset()
+            if state is not None and timestamp < state.timestamp:
+                continue  # Pozycja spóźniona
+            for event_name, changed in (
+                ("enter", zone_ids - previous),
+                ("exit", previous - zone_ids),
+            ):
+                for zone_id in sorted(changed):
+                    if zone_id in zones:
+                        transitions.append(
+                            {
+                                "vessel_id": vessel_id,
+                                "zone": zones[zone_id],
+                                "event": event_name,
+                                "timestamp": timestamp,
+                            }
+                        )
+            states[vessel_id] = VesselZoneState(timestamp, zone_ids)
+
+        return transitions, {
+            vessel_id: state for vessel_id, state in states.items() if state is not None
+        }
+
+    def commit_states(self, states: Dict[int, VesselZoneState]) -> None:
+        with self._lock:
+            for vessel_id, state in states.items():
+                current = self._states.get(vessel_id)
+                # Równoległa transakcja mogła już zapisać nowszy stan
+                if current is None or state.timestamp >= current.timestamp:
+                    self._states[vessel_id] = state
+
+    def count(self, points: int, transitions: int) -> None:
+        with self._lock:
+            self.evaluated_points += points
+            self.transitions += transitions
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "zones": len(self._zones),
+            "tracked_vessels": len(self._states),
+            "evaluated_points": self.evaluated_points,
+            "transitions": self.transitions,
+            "loaded_at": self.loaded_at,
+        }
+
+
+geofence_index = GeofenceIndex()
+
+
+def evaluate_on_commit(db, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Ocenia pozycje (słowniki z vessel_id, timestamp, position) w sesji - Session
+    lub AsyncSession. Zwraca przejścia; nowy stan łodzi zostanie zapamiętany po
+    commit tej transakcji, rollback go porzuca.
+    """
+    rows = list(rows)
+    transitions, states = geofence_index.evaluate(rows)
+    geofence_index.count(len(rows), len(transitions))
+    if states:
+        session = getattr(db, "sync_session", db)
+        session.info.setdefault(_PENDING_KEY, {}).update(states)
+    return transitions
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_states_after_commit(session: Session) -> None:
+    states = session.info.pop(_PENDING_KEY, None)
+    if states:
+        geofence_index.commit_states(states)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+_task: Optional[asyncio.Task] = None
+
+
+async def _run() -> None:
+    while True:
+        await asyncio.sleep(GEOFENCE_RELOAD_INTERVAL_S)
+        try:
+            async with AsyncSessionLocal() as db:
+                await geofence_index.reload_async(db)
+        except Exception:
+            logger.exception("Geofence zone reload failed")
+
+
+def start_geofence_reload() -> None:
+    global _task
+    if _task is None and GEOFENCE_RELOAD_INTERVAL_S > 0:
+        _task = asyncio.create_task(_run())
+
+
+async def stop_geofence_reload() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -0,0 +1,40 @@
+"""
+Wyrażenia SQL dla geometrii (PostGIS, WGS84).
+
+Ścieżki odczytu wybierają WKT liczony w bazie zamiast obiektów geometrii,
+więc wiersz nie przechodzi przez to_shape (budowę obiektu Shapely) tylko
+po to, by wypisać współrzędne jako tekst. Filtry przestrzenne zaczynają się
+od && na prostokącie, aby planista mógł użyć indeksu GiST.
+"""
+
+from sqlalchemy import Text, cast, func, literal, or_
+
+
+def point_wkt(column):
+    """
+    WKT punktu w formacie Shapely - "POINT (lon lat)" ze spacją, którego
+    oczekują walidatory schematów i klienci (ST_AsText zwraca "POINT(lon lat)").
+    Dla NULL wynikiem jest NULL.
+    """
+    return (
+        literal("POINT (", Text)
+        + cast(func.ST_X(column), Text)
+        + literal(" ", Text)
+        + cast(func.ST_Y(column), Text)
+        + literal(")", Text)
+    )
+
+
+def envelope_filter(column, min_lon: float, min_lat: float, max_lon: float, max_lat: float):
+    """
+    Warunek && na kolumnie geometrii (korzysta z indeksu GiST). Prostokąt
+    przecinający antypołudnik (min_lon > max_lon) dzielony jest na dwa.
+    """
+    if min_lon <= max_lon:
+        return column.op("&&")(
+            func.ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326)
+        )
+    return or_(
+        column.op("&&")(func.ST_MakeEnvelope(min_lon, min_lat, 180, max_lat, 4326)),
+        column.op("&&")(func.ST_MakeEnvelope(-180, min_lat, max_lon, max_lat, 4326)),
+    )
@@ -0,0 +1,301 @@
+"""
+Bufor zapisu odroczonego (write-behind) dla ścieżek ingestii.
+
+W trybie buforowanym (INGEST_BUFFER_ENABLED=true) zwalidowany odczyt trafia do
+ograniczonej kolejki w pamięci procesu, a endpoint od razu odpowiada 202.
+Zadanie w tle opróżnia kolejkę co INGEST_FLUSH_INTERVAL_MS milisekund lub po
+zebraniu INGEST_FLUSH_MAX_ROWS wierszy (co nastąpi pierwsze) i zapisuje paczkę
+jednym wielowierszowym INSERT-em. Pełna kolejka oznacza przeciążenie bazy -
+endpoint zwraca wtedy 503 zamiast wydłużać czas odpowiedzi wszystkim klientom.
+
+Dane z kolejki, które nie zostały jeszcze zapisane, giną przy awarii procesu;
+przy zwykłym zamknięciu aplikacji do bazy trafia zarówno paczka zebrana przez
+zadanie w tle, jak i reszta kolejki.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.core.live_readings import publish_on_commit
+from app.core.tile_cache import invalidate_tiles_on_commit
+from app.crud.geofences import apply_geofences_async
+from app.crud.sensor_latest import apply_latest_async
+from app.crud.sensor_rollups import apply_rollups_async
+from app.crud.vessel_positions import apply_latest_positions_async
+from app.models.models import SensorReading, Location
+
+logger = logging.getLogger(__name__)
+
+INGEST_BUFFER_ENABLED = os.getenv("INGEST_BUFFER_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+INGEST_BUFFER_MAX_ROWS = int(os.getenv("INGEST_BUFFER_MAX_ROWS", "50000"))
+INGEST_FLUSH_INTERVAL_MS = int(os.getenv("INGEST_FLUSH_INTERVAL_MS", "250"))
+INGEST_FLUSH_MAX_ROWS = int(os.getenv("INGEST_FLUSH_MAX_ROWS", "2000"))
+# Przerwa przed ponowieniem zapisu, gdy baza jest chwilowo niedostępna
+INGEST_RETRY_MIN_S = 0.5
+INGEST_RETRY_MAX_S = float(os.getenv("INGEST_RETRY_MAX_S", "30"))
+
+# Błędy pojedynczego wiersza (ograniczenia, wartości spoza zakresu kolumny)
+_ROW_ERRORS = (IntegrityError, DataError)
+# Błędy połączenia - dane są poprawne, zapis trzeba ponowić
+_TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+BeforeCommitHook = Callable[[AsyncSession, List[Dict[str, Any]]], Awaitable[None]]
+
+
+class IngestBufferFull(Exception):
+    """Kolejka bufora jest pełna - klient powinien ponowić żądanie później."""
+
+
+class IngestBuffer:
+    """
+    Ograniczona kolejka wierszy jednego modelu z zadaniem zapisującym w tle.
+    before_commit(db, rows) jest wywoływane w transakcji zapisu paczki - służy
+    do aktualizacji tabel pochodnych (np. rollupów) razem z danymi. Z podaną
+    kolumną returning wiersze przekazywane do before_commit mają już jej
+    wartość (np. id nadane przez bazę).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model,
+        before_commit: Optional[BeforeCommitHook] = None,
+        returning=None,
+        max_rows: int = INGEST_BUFFER_MAX_ROWS,
+        flush_interval_ms: int = INGEST_FLUSH_INTERVAL_MS,
+        flush_max_rows: int = INGEST_FLUSH_MAX_ROWS,
+    ):
+        self.name = name
+        self.model = model
+        self.before_commit = before_commit
+        self.returning = returning
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_rows = flush_max_rows
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_rows)
+        self._task: Optional[asyncio.Task] = None
+        # Wiersze zdjęte z kolejki, ale jeszcze niezapisane - stop() zapisuje je,
+        # gdy zbieranie paczki zostanie przerwane
+        self._pending: List[Dict[str, Any]] = []
+        self._stopping = False
+        self._flushing = False
+        # Liczniki do monitorowania
+        self.flushed_rows = 0
+        self.dropped_rows = 0
+        self.rejected_rows = 0  # Odrzucone przy pełnej kolejce
+        self.retried_flushes = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def offer(self, row: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.rejected_rows += 1
+            raise IngestBufferFull(
+                f"Ingestion buffer '{self.name}' is full, retry later."
+            )
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Zatrzymuje zadanie w tle i zapisuje to, co zostało w kolejce. Trwający
+        zapis paczki nie jest przerywany - zadanie kończy go i wychodzi z pętli;
+        przerwane jest tylko czekanie na kolejne wiersze.
+        """
+        if self._task is not None:
+            self._stopping = True
+            if not self._flushing:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._stopping = False
+
+        remaining, self._pending = self._pending, []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+            if len(remaining) >= self.flush_max_rows:
+                await self._flush(remaining)
+                remaining = []
+        if remaining:
+            await self._flush(remaining)
+
+    async def _collect_chunk(self) -> List[Dict[str, Any]]:
+        # Czekamy na pierwszy wiersz bez limitu - od niego liczy się okno czasowe;
+        # paczka ponawiana po błędzie połączenia ma już wiersze
+        chunk = self._pending
+        if not chunk:
+            chunk.append(await self._queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while len(chunk) < self.flush_max_rows:
+            try:
+                chunk.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                chunk.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return chunk
+
+    async def _run(self) -> None:
+        retry_delay = INGEST_RETRY_MIN_S
+        while not self._stopping:
+            chunk = await self._collect_chunk()
+            self._flushing = True
+            try:
+                await self._flush(chunk)
+            except _TRANSIENT_ERRORS:
+                # Np. restart bazy - wiersze zostają w _pending (odpowiedź 202
+                # już poszła) i zapis jest ponawiany z rosnącą przerwą
+                self._flushing = False
+                self.retried_flushes += 1
+                logger.warning(
+                    "Ingestion buffer '%s' cannot reach the database, retrying %d rows in %.1f s",
+                    self.name,
+                    len(chunk),
+                    retry_delay,
+                    exc_info=True,
+                )
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, INGEST_RETRY_MAX_S)
+                continue
+            except Exception:
+                self.dropped_rows += len(chunk)
+                logger.exception(
+                    "Ingestion buffer '%s' failed to write %d rows",
+                    self.name,
+                    len(chunk),
+                )
+            self._flushing = False
+            self._pending = []
+            retry_delay = INGEST_RETRY_MIN_S
+
+    async def _insert(
+        self, db: AsyncSession, rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        if self.returning is None:
+            await db.execute(insert(self.model), rows)
+            return rows
+        ids = (
+            await db.scalars(
+                insert(self.model).returning(
+                    self.returning, sort_by_parameter_order=True
+                ),
+                rows,
+            )
+        ).all()
+        return [{**row, self.returning.key: id_} for row, id_ in zip(rows, ids)]
+
+    async def _flush(self, rows: List[Dict[str, Any]]) -> None:
+        async with AsyncSessionLocal() as db:
+            try:
+                inserted = await self._insert(db, rows)
+                if self.before_commit is not None:
+                    await self.before_commit(db, inserted)
+                await db.commit()
+                self.flushed_rows += len(rows)
+                return
+            except _ROW_ERRORS:
+                await db.rollback()
+
+        # Paczka zawiera wiersz łamiący ograniczenia (np. usunięty w międzyczasie
+        # sensor) lub wartość spoza zakresu kolumny - zapisujemy wiersze
+        # pojedynczo, żeby odrzucić tylko błędne.
+        await self._flush_individually(rows)
+
+    async def _flush_individually(self, rows: List[Dict[str, Any]]) -> None:
+        async with AsyncSessionLocal() as db:
+            for index, row in enumerate(rows):
+                try:
+                    inserted = await self._insert(db, [row])
+                    if self.before_commit is not None:
+                        await self.before_commit(db, inserted)
+                    await db.commit()
+                    self.flushed_rows += 1
+                except _TRANSIENT_ERRORS:
+                    # Zapisane już wiersze nie wrócą do ponowienia
+                    del rows[:index]
+                    raise
+                except _ROW_ERRORS as e:
+                    await db.rollback()
+                    self.dropped_rows += 1
+                    orig_error = getattr(e, "orig", None)
+                    logger.warning(
+                        "Ingestion buffer '%s' dropped row: %s",
+                        self.name,
+                        str(orig_error) if orig_error else str(e),
+                    )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "capacity": self._queue.maxsize,
+            "flushed_rows": self.flushed_rows,
+            "dropped_rows": self.dropped_rows,
+            "rejected_rows": self.rejected_rows,
+            "retried_flushes": self.retried_flushes,
+        }
+
+
+async def _sensor_readings_before_commit(
+    db: AsyncSession, rows: List[Dict[str, Any]]
+) -> None:
+    await apply_rollups_async(db, rows)
+    await apply_latest_async(db, rows)
+    publish_on_commit(db, rows)
+
+
+async def _locations_before_commit(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    await apply_latest_positions_async(db, rows)
+    await apply_geofences_async(db, rows)
+    invalidate_tiles_on_commit(db, "vessels", "tracks")
+
+
+sensor_readings_buffer = IngestBuffer(
+    "sensor_readings",
+    SensorReading,
+    before_commit=_sensor_readings_before_commit,
+    returning=SensorReading.id,
+)
+locations_buffer = IngestBuffer(
+    "locations",
+    Location,
+    before_commit=_locations_before_commit,
+    returning=Location.location_id,
+)
+
+
+def start_ingest_buffers() -> None:
+    sensor_readings_buffer.start()
+    locations_buffer.start()
+
+
+async def stop_ingest_buffers() -> None:
+    await sensor_readings_buffer.stop()
+    await locations_buffer.stop()
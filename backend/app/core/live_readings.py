@@ -0,0 +1,313 @@
+"""
+Wypychanie nowych odczytów czujników do subskrybentów (SSE).
+
+Ścieżki ingestii wołają publish_on_commit(db, rows) w transakcji zapisu;
+odczyty trafiają do subskrybentów dopiero po udanym commit, więc klient nigdy
+nie zobaczy odczytu, który został wycofany. Dwa tryby (LIVE_READINGS_BACKEND):
+
+- memory (domyślny) - odczyty rozsyłane po commit do subskrybentów w tym
+  samym procesie; wystarcza przy jednym workerze uvicorna.
+- postgres - w transakcji zapisu wykonywane jest pg_notify (doręczane przez
+  Postgresa dopiero po commit), a każdy worker nasłuchuje kanału (LISTEN)
+  na własnym połączeniu asyncpg i rozsyła odczyty swoim subskrybentom.
+
+Każdy subskrybent ma ograniczoną kolejkę; klient, który nie nadąża, jest
+rozłączany (zdarzenie overflow) i po ponownym połączeniu dociąga braki
+zwykłym zapytaniem z after_id.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Set
+
+import asyncpg
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.core.database import ASYNC_DATABASE_URL
+from app.core.sensor_cache import sensor_cache
+
+logger = logging.getLogger(__name__)
+
+LIVE_READINGS_BACKEND = os.getenv("LIVE_READINGS_BACKEND", "memory").lower()
+LIVE_READINGS_CHANNEL = os.getenv("LIVE_READINGS_CHANNEL", "sensor_readings_live")
+LIVE_SUBSCRIBER_QUEUE = int(os.getenv("LIVE_SUBSCRIBER_QUEUE", "1000"))
+LIVE_HEARTBEAT_S = int(os.getenv("LIVE_HEARTBEAT_S", "15"))
+
+# Limit payloadu NOTIFY to 8000 bajtów - paczki dzielimy z zapasem
+NOTIFY_PAYLOAD_MAX_BYTES = 7500
+_PENDING_KEY = "live_readings_pending"
+
+
+class Subscription:
+    """Subskrypcja odczytów statku i/lub wybranych sensorów."""
+
+    def __init__(
+        self,
+        vessel_id: Optional[int],
+        sensor_ids: Iterable[int],
+        max_queue: int = LIVE_SUBSCRIBER_QUEUE,
+    ):
+        self.vessel_id = vessel_id
+        self.sensor_ids = frozenset(sensor_ids)
+        self.overflowed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+
+    def offer(self, readings: List[Dict[str, Any]]) -> bool:
+        try:
+            self._queue.put_nowait(readings)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+
+    async def get(self) -> List[Dict[str, Any]]:
+        return await self._queue.get()
+
+
+class LiveReadingsHub:
+    """
+    Pub/sub w pamięci procesu. Indeksy sensor_id/vessel_id -> subskrypcje,
+    więc koszt rozesłania zależy od liczby pasujących subskrybentów,
+    a nie od liczby wszystkich otwartych dashboardów.
+    """
+
+    def __init__(self):
+        self._by_sensor: Dict[int, Set[Subscription]] = {}
+        self._by_vessel: Dict[int, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published_readings = 0
+        self.dropped_subscribers = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(
+            set().union(*self._by_sensor.values(), *self._by_vessel.values())
+        )
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def subscribe(
+        self, vessel_id: Optional[int] = None, sensor_ids: Iterable[int] = ()
+    ) -> Subscription:
+        subscription = Subscription(vessel_id, sensor_ids)
+        if vessel_id is not None:
+            self._by_vessel.setdefault(vessel_id, set()).add(subscription)
+        for sensor_id in subscription.sensor_ids:
+            self._by_sensor.setdefault(sensor_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription.vessel_id is not None:
+            self._discard(self._by_vessel, subscription.vessel_id, subscription)
+        for sensor_id in subscription.sensor_ids:
+            self._discard(self._by_sensor, sensor_id, subscription)
+
+    @staticmethod
+    def _discard(index: Dict[int, Set[Subscription]], key: int, subscription) -> None:
+        subscriptions = index.get(key)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del index[key]
+
+    def dispatch(self, readings: List[Dict[str, Any]]) -> None:
+        """Rozsyła paczkę odczytów - każdy subskrybent dostaje jedną wiadomość."""
+        matched: Dict[Subscription, List[Dict[str, Any]]] = {}
+        for reading in readings:
+            targets = self._by_sensor.get(reading["sensor_id"], set()) | self._by_vessel.get(
+                reading["vessel_id"], set()
+            )
+            for subscription in targets:
+                matched.setdefault(subscription, []).append(reading)
+        for subscription, subscription_readings in matched.items():
+            if not subscription.offer(subscription_readings):
+                # Klient nie nadąża - odpinamy go, strumień wyśle overflow
+                self.unsubscribe(subscription)
+                self.dropped_subscribers += 1
+        self.published_readings += len(readings)
+
+    def dispatch_threadsafe(self, readings: List[Dict[str, Any]]) -> None:
+        # Commit z synchronicznej sesji odbywa się w wątku z puli
+        if self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self.dispatch(readings)
+        else:
+            self._loop.call_soon_threadsafe(self.dispatch, readings)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": LIVE_READINGS_BACKEND,
+            "subscribers": self.subscribers,
+            "published_readings": self.published_readings,
+            "dropped_subscribers": self.dropped_subscribers,
+        }
+
+
+hub = LiveReadingsHub()
+
+
+def _event_value(value):
+    # Jak w odpowiedziach JSON API: Decimal jako tekst, czas w ISO 8601
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _reading_event(
+    row: Dict[str, Any], vessel_ids: Optional[Mapping[int, int]]
+) -> Dict[str, Any]:
+    if vessel_ids is not None:
+        vessel_id = vessel_ids.get(row["sensor_id"])
+    else:
+        metadata = sensor_cache.peek(row["sensor_id"])
+        vessel_id = metadata.vessel_id if metadata is not None else None
+    return {
+        "id": row.get("id"),
+        "sensor_id": row["sensor_id"],
+        "vessel_id": vessel_id,
+        "value": _event_value(row["value"]),
+        "status": row.get("status"),
+        "timestamp": _event_value(row["timestamp"]),
+    }
+
+
+def publish_on_commit(
+    db,
+    rows: Iterable[Dict[str, Any]],
+    vessel_ids: Optional[Mapping[int, int]] = None,
+) -> None:
+    """
+    Zapamiętuje zapisane odczyty (słowniki z id, sensor_id, value, status,
+    timestamp) w sesji - Session lub AsyncSession. Subskrybenci dostaną je po
+    commit tej transakcji; rollback je porzuca.
+
+    vessel_ids (sensor_id -> vessel_id) podaje ścieżka ingestii, która ustaliła
+    statek przy walidacji sensora; bez niego statek brany jest z cache'a
+    metadanych (sensor walidowany przez cache już w nim jest).
+    """
+    session = getattr(db, "sync_session", db)
+    session.info.setdefault(_PENDING_KEY, []).extend(
+        _reading_event(r, vessel_ids) for r in rows
+    )
+
+
+def _notify_payloads(readings: List[Dict[str, Any]]) -> List[str]:
+    payloads, chunk, size = [], [], 2
+    for reading in readings:
+        encoded = json.dumps(reading, separators=(",", ":"))
+        if chunk and size + len(encoded) + 1 > NOTIFY_PAYLOAD_MAX_BYTES:
+            payloads.append("[" + ",".join(chunk) + "]")
+            chunk, size = [], 2
+        chunk.append(encoded)
+        size += len(encoded) + 1
+    if chunk:
+        payloads.append("[" + ",".join(chunk) + "]")
+    return payloads
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_before_commit(session: Session) -> None:
+    if LIVE_READINGS_BACKEND != "postgres":
+        return
+    readings = session.info.pop(_PENDING_KEY, None)
+    if not readings:
+        return
+    # NOTIFY jest transakcyjny - Postgres doręczy go dopiero po commit
+    for payload in _notify_payloads(readings):
+        session.execute(select(func.pg_notify(LIVE_READINGS_CHANNEL, payload)))
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_after_commit(session: Session) -> None:
+    readings = session.info.pop(_PENDING_KEY, None)
+    if readings:
+        hub.dispatch_threadsafe(readings)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+async def sse_events(subscription: Subscription) -> AsyncIterator[str]:
+    """Strumień text/event-stream dla subskrypcji; odpina ją po rozłączeniu."""
+    try:
+        yield "retry: 3000\n\n"
+        while not subscription.overflowed:
+            try:
+                readings = await asyncio.wait_for(subscription.get(), LIVE_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"  # Utrzymuje połączenie przez proxy
+                continue
+            last_id = max((r["id"] for r in readings if r["id"] is not None), default=None)
+            id_line = f"id: {last_id}\n" if last_id is not None else ""
+            yield f"event: readings\n{id_line}data: {json.dumps(readings)}\n\n"
+        # Kolejka się przepełniła - klient łączy się ponownie i dociąga braki
+        yield "event: overflow\ndata: {}\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def _asyncpg_dsn(url: str) -> str:
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def _on_notification(connection, pid, channel, payload) -> None:
+    try:
+        hub.dispatch(json.loads(payload))
+    except (ValueError, KeyError, TypeError):
+        logger.warning("Invalid live readings notification payload")
+
+
+async def _listen() -> None:
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(_asyncpg_dsn(ASYNC_DATABASE_URL))
+            await connection.add_listener(LIVE_READINGS_CHANNEL, _on_notification)
+            # Czekamy, aż połączenie zostanie zerwane; wtedy łączymy się od nowa
+            while not connection.is_closed():
+                await asyncio.sleep(LIVE_HEARTBEAT_S)
+                await connection.execute("SELECT 1")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Live readings listener failed, reconnecting")
+            await asyncio.sleep(1)
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+
+
+_listener_task: Optional[asyncio.Task] = None
+
+
+def start_live_readings() -> None:
+    global _listener_task
+    hub.bind_loop(asyncio.get_running_loop())
+    if LIVE_READINGS_BACKEND == "postgres" and _listener_task is None:
+        _listener_task = asyncio.create_task(_listen())
+
+
+async def stop_live_readings() -> None:
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
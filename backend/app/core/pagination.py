@@ -0,0 +1,46 @@
+"""
+Stronicowanie kluczem (keyset) dla list szeregów czasowych.
+
+Zamiast OFFSET (który przy dalekich stronach czyta i odrzuca wszystkie
+wcześniejsze wiersze) kolejna strona zaczyna się za ostatnim zwróconym
+wierszem: WHERE (timestamp, id) > (:timestamp, :id) z indeksu. Kursor jest
+dla klienta nieprzezroczysty (base64 z JSON-a) i wraca w nagłówku
+X-Next-Cursor, gdy strona jest pełna.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> Tuple[Any, ...]:
+    """Dekoduje kursor do krotki wartości podanych typów; ValueError gdy niepoprawny."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value_type, value in zip(types, payload)
+        )
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor.")
+
+
+def next_cursor(
+    items: Sequence[Any], limit: int, key: Callable[[Any], Sequence[Any]]
+) -> Optional[str]:
+    """Kursor następnej strony albo None, jeśli to była ostatnia (niepełna) strona."""
+    if not items or len(items) < limit:
+        return None
+    return encode_cursor(key(items[-1]))
@@ -0,0 +1,167 @@
+"""
+Utrzymanie miesięcznych partycji tabel szeregów czasowych.
+
+Tabele sensor_readings, locations i ais_data są partycjonowane zakresowo po
+kolumnie timestamp (migracja d3b8e1f0a2c4). Ten moduł zakłada partycje na
+kolejne miesiące oraz usuwa całe partycje starszych danych (zamiast DELETE).
+
+Użycie:
+    python -m app.core.partitions --months-ahead 3
+    python -m app.core.partitions --drop-before 2024-01-01
+"""
+
+import argparse
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+PARTITIONED_TABLES = ("sensor_readings", "locations", "ais_data")
+DEFAULT_MONTHS_AHEAD = 3
+# Klucz blokady doradczej utrzymania partycji - jeden proces naraz
+_MAINTENANCE_LOCK_ID = 0x50415254
+
+
+def add_months(month_start: date, months: int) -> date:
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(table: str, month_start: date) -> str:
+    return f"{table}_y{month_start.year:04d}m{month_start.month:02d}"
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    return (
+        conn.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table pt "
+                "JOIN pg_class c ON c.oid = pt.partrelid "
+                "WHERE c.relname = :table"
+            ),
+            {"table": table},
+        ).scalar()
+        is not None
+    )
+
+
+def create_month_partition(conn: Connection, table: str, month_start: date) -> bool:
+    """
+    Tworzy partycję dla danego miesiąca, jeśli jeszcze nie istnieje.
+    Wiersze z tego zakresu, które trafiły wcześniej do partycji DEFAULT,
+    są do niej przenoszone (inaczej ATTACH PARTITION by się nie powiódł).
+    """
+    name = partition_name(table, month_start)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return False
+
+    range_start = month_start.isoformat()
+    range_end = add_months(month_start, 1).isoformat()
+    range_filter = f"timestamp >= '{range_start}' AND timestamp < '{range_end}'"
+
+    conn.execute(
+        text(
+            f"CREATE TABLE {name} "
+            f"(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    default_partition = f"{table}_default"
+    if conn.execute(
+        text("SELECT to_regclass(:name)"), {"name": default_partition}
+    ).scalar():
+        conn.execute(
+            text(f"INSERT INTO {name} SELECT * FROM {default_partition} WHERE {range_filter}")
+        )
+        conn.execute(text(f"DELETE FROM {default_partition} WHERE {range_filter}"))
+    conn.execute(
+        text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{range_start}') TO ('{range_end}')"
+        )
+    )
+    return True
+
+
+def ensure_partitions(
+    conn: Connection,
+    months_ahead: int = DEFAULT_MONTHS_AHEAD,
+    today: Optional[date] = None,
+) -> List[str]:
+    """Zakłada brakujące partycje od bieżącego miesiąca do months_ahead w przód."""
+    today = today or datetime.now(timezone.utc).date()
+    current_month = date(today.year, today.month, 1)
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            continue
+        for offset in range(months_ahead + 1):
+            month_start = add_months(current_month, offset)
+            if create_month_partition(conn, table, month_start):
+                created.append(partition_name(table, month_start))
+    return created
+
+
+def drop_partitions_before(conn: Connection, cutoff: date) -> List[str]:
+    """Usuwa partycje miesięcy, które w całości kończą się przed datą cutoff."""
+    dropped = []
+    for table in PARTITIONED_TABLES:
+        partitions = conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table"
+            ),
+            {"table": table},
+        ).scalars().all()
+        for name in partitions:
+            suffix = name[len(table) + 1 :]
+            try:
+                month_start = datetime.strptime(suffix, "y%Ym%m").date()
+            except ValueError:
+                continue  # np. partycja DEFAULT
+            if add_months(month_start, 1) <= cutoff:
+                conn.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+    return dropped
+
+
+def run_maintenance(
+    engine, months_ahead: int = DEFAULT_MONTHS_AHEAD, drop_before: Optional[date] = None
+):
+    with engine.begin() as conn:
+        # Kilka workerów startujących naraz czeka tu na siebie - kolejny widzi
+        # partycje założone przez poprzedni i nie tworzy ich drugi raz
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": _MAINTENANCE_LOCK_ID}
+        )
+        created = ensure_partitions(conn, months_ahead=months_ahead)
+        dropped = drop_partitions_before(conn, drop_before) if drop_before else []
+    return created, dropped
+
+
+def main() -> None:
+    from app.core.database import engine
+
+    parser = argparse.ArgumentParser(description="Partition maintenance")
+    parser.add_argument("--months-ahead", type=int, default=DEFAULT_MONTHS_AHEAD)
+    parser.add_argument(
+        "--drop-before",
+        type=date.fromisoformat,
+        default=None,
+        help="Drop whole monthly partitions ending before this date (YYYY-MM-DD)",
+    )
+    args = parser.parse_args()
+
+    created, dropped = run_maintenance(
+        engine, months_ahead=args.months_ahead, drop_before=args.drop_before
+    )
+    for name in created:
+        print(f"Created partition {name}")
+    for name in dropped:
+        print(f"Dropped partition {name}")
+
+
+if __name__ == "__main__":
+    main()
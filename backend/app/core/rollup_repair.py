@@ -0,0 +1,81 @@
+"""
+Zadanie naprawcze rollupów odczytów czujników.
+
+Rollupy są aktualizowane przyrostowo przy zapisie (także odczyty spóźnione),
+ale odczyty usunięte lub zgubione po drodze (np. przez bufor write-behind)
+rozjechałyby agregaty z danymi. Co ROLLUP_REPAIR_INTERVAL_S sekund okna
+z ostatnich ROLLUP_REPAIR_LOOKBACK_MINUTES minut są przeliczane od nowa.
+
+Ręczne przeliczenie dowolnego zakresu:
+    python -m app.core.rollup_repair --start 2025-06-01 --end 2025-06-02
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.core.database import AsyncSessionLocal
+from app.crud.sensor_rollups import rebuild_rollups_async
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_REPAIR_INTERVAL_S = int(os.getenv("ROLLUP_REPAIR_INTERVAL_S", "600"))
+ROLLUP_REPAIR_LOOKBACK_MINUTES = int(os.getenv("ROLLUP_REPAIR_LOOKBACK_MINUTES", "120"))
+
+_task: Optional[asyncio.Task] = None
+
+
+async def repair_range(
+    start_time: datetime, end_time: datetime, sensor_id: Optional[int] = None
+):
+    async with AsyncSessionLocal() as db:
+        rebuilt = await rebuild_rollups_async(db, start_time, end_time, sensor_id)
+        await db.commit()
+    return rebuilt
+
+
+async def _run() -> None:
+    while True:
+        await asyncio.sleep(ROLLUP_REPAIR_INTERVAL_S)
+        end_time = datetime.now(timezone.utc)
+        start_time = end_time - timedelta(minutes=ROLLUP_REPAIR_LOOKBACK_MINUTES)
+        try:
+            await repair_range(start_time, end_time)
+        except Exception:
+            logger.exception("Sensor reading rollup repair failed")
+
+
+def start_rollup_repair() -> None:
+    global _task
+    if _task is None and ROLLUP_REPAIR_INTERVAL_S > 0:
+        _task = asyncio.create_task(_run())
+
+
+async def stop_rollup_repair() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild sensor reading rollups")
+    parser.add_argument("--start", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--end", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--sensor-id", type=int, default=None)
+    args = parser.parse_args()
+
+    rebuilt = asyncio.run(repair_range(args.start, args.end, args.sensor_id))
+    for resolution, count in rebuilt.items():
+        print(f"Rebuilt {count} {resolution} buckets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Cache metadanych sensorów w pamięci procesu.
+
+Ścieżki ingestii walidują odczyty na podstawie tego cache'a zamiast odpytywać
+tabelę sensors przy każdym odczycie. Cache jest rozgrzewany przy starcie
+aplikacji i aktualizowany (write-through) przez crud/sensors.py. Sensor
+nieobecny w cache'u jest doładowywany z bazy przy pierwszym użyciu, więc sensory
+utworzone przez inny worker też są widoczne; usunięcie sensora w innym workerze
+zatrzyma dopiero klucz obcy przy zapisie odczytu.
+"""
+
+import threading
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Sensor
+
+
+class SensorMetadata(NamedTuple):
+    sensor_id: int
+    vessel_id: int
+    sensor_type_id: int
+    min_val: Optional[Decimal]
+    max_val: Optional[Decimal]
+    measurement_unit: Optional[str]
+
+
+_METADATA_COLUMNS = (
+    Sensor.id,
+    Sensor.vessel_id,
+    Sensor.sensor_type_id,
+    Sensor.min_val,
+    Sensor.max_val,
+    Sensor.measurement_unit,
+)
+
+
+class SensorMetadataCache:
+    def __init__(self):
+        self._entries: Dict[int, SensorMetadata] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.warmed_at: Optional[datetime] = None
+
+    def get(self, sensor_id: int) -> Optional[SensorMetadata]:
+        metadata = self._entries.get(sensor_id)
+        if metadata is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return metadata
+
+    def peek(self, sensor_id: int) -> Optional[SensorMetadata]:
+        """Odczyt bez liczenia trafień - dla ścieżek innych niż walidacja."""
+        return self._entries.get(sensor_id)
+
+    def put(self, sensor: Sensor) -> None:
+        metadata = SensorMetadata(
+            sensor_id=sensor.id,
+            vessel_id=sensor.vessel_id,
+            sensor_type_id=sensor.sensor_type_id,
+            min_val=sensor.min_val,
+            max_val=sensor.max_val,
+            measurement_unit=sensor.measurement_unit,
+        )
+        with self._lock:
+            self._entries[sensor.id] = metadata
+
+    def invalidate(self, sensor_id: int) -> None:
+        with self._lock:
+            self._entries.pop(sensor_id, None)
+
+    def invalidate_vessel(self, vessel_id: int) -> None:
+        """Usuwa sensory statku (kaskadowe usunięcie razem ze statkiem)."""
+        with self._lock:
+            for sensor_id in [
+                m.sensor_id for m in self._entries.values() if m.vessel_id == vessel_id
+            ]:
+                del self._entries[sensor_id]
+
+    async def warm_async(self, db: AsyncSession) -> int:
+        rows = (await db.execute(select(*_METADATA_COLUMNS))).all()
+        entries = {row[0]: SensorMetadata(*row) for row in rows}
+        with self._lock:
+            self._entries = entries
+            self.warmed_at = datetime.now(timezone.utc)
+        return len(entries)
+
+    async def get_or_load_async(
+        self, db: AsyncSession, sensor_id: int
+    ) -> Optional[SensorMetadata]:
+        metadata = self.get(sensor_id)
+        if metadata is not None:
+            return metadata
+        loaded = await self._load_async(db, [sensor_id])
+        return loaded.get(sensor_id)
+
+    async def get_many_or_load_async(
+        self, db: AsyncSession, sensor_ids: Iterable[int]
+    ) -> Dict[int, SensorMetadata]:
+        """Zwraca metadane istniejących sensorów; braki doładowuje jednym zapytaniem."""
+        found: Dict[int, SensorMetadata] = {}
+        missing = []
+        for sensor_id in set(sensor_ids):
+            metadata = self.get(sensor_id)
+            if metadata is None:
+                missing.append(sensor_id)
+            else:
+                found[sensor_id] = metadata
+        if missing:
+            found.update(await self._load_async(db, missing))
+        return found
+
+    async def _load_async(
+        self, db: AsyncSession, sensor_ids
+    ) -> Dict[int, SensorMetadata]:
+        rows = (
+            await db.execute(
+                select(*_METADATA_COLUMNS).where(Sensor.id.in_(sensor_ids))
+            )
+        ).all()
+        loaded = {row[0]: SensorMetadata(*row) for row in rows}
+        with self._lock:
+            self._entries.update(loaded)
+        return loaded
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "warmed_at": self.warmed_at,
+        }
+
+
+sensor_cache = SensorMetadataCache()
@@ -0,0 +1,112 @@
+"""
+Cache gotowych odpowiedzi (snapshotów) dla publicznych endpointów.
+
+Snapshot to zserializowana odpowiedź w dwóch wariantach (zwykłym i gzip)
+z silnym ETagiem liczonym z treści. Co najwyżej raz na ttl_s sekund jedno
+żądanie sprawdza tanim zapytaniem "wersję" danych (np. max(updated_at)
+i liczność tabel źródłowych); pełne przeliczenie następuje tylko wtedy, gdy
+wersja się zmieniła. Pozostałe żądania dostają bajty z pamięci bez
+połączenia z bazą, więc koszt nie rośnie z liczbą oglądających.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.core.etag import etag_matches
+
+GZIP_MIN_BYTES = 1024  # Krótszych odpowiedzi nie opłaca się kompresować
+
+
+class Snapshot(NamedTuple):
+    body: bytes
+    gzipped: Optional[bytes]
+    etag: str
+    version: Any
+    built_at: float
+
+
+class SnapshotCache:
+    def __init__(
+        self,
+        name: str,
+        load_version: Callable[[AsyncSession], Awaitable[Any]],
+        build: Callable[[AsyncSession], Awaitable[bytes]],
+        ttl_s: float,
+    ):
+        self.name = name
+        self.load_version = load_version
+        self.build = build
+        self.ttl_s = ttl_s
+        self._snapshot: Optional[Snapshot] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        # Liczniki do monitorowania
+        self.version_checks = 0
+        self.rebuilds = 0
+
+    def invalidate(self) -> None:
+        """Wymusza sprawdzenie wersji przy najbliższym żądaniu."""
+        self._checked_at = 0.0
+
+    async def get(self) -> Snapshot:
+        if self._snapshot is not None and time.monotonic() - self._checked_at < self.ttl_s:
+            return self._snapshot
+        # Jedno żądanie odświeża, pozostałe czekają na jego wynik
+        async with self._lock:
+            if self._snapshot is None or time.monotonic() - self._checked_at >= self.ttl_s:
+                await self._refresh()
+        return self._snapshot
+
+    async def _refresh(self) -> None:
+        async with AsyncSessionLocal() as db:
+            version = await self.load_version(db)
+            self.version_checks += 1
+            if self._snapshot is None or version != self._snapshot.version:
+                body = await self.build(db)
+                self._snapshot = make_snapshot(body, version)
+                self.rebuilds += 1
+        self._checked_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "ttl_s": self.ttl_s,
+            "version_checks": self.version_checks,
+            "rebuilds": self.rebuilds,
+            "built_at": self._snapshot.built_at if self._snapshot else None,
+            "size_bytes": len(self._snapshot.body) if self._snapshot else None,
+            "gzip_bytes": len(self._snapshot.gzipped)
+            if self._snapshot and self._snapshot.gzipped
+            else None,
+        }
+
+
+def make_snapshot(body: bytes, version: Any) -> Snapshot:
+    gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+    etag = '"' + hashlib.sha1(body).hexdigest()[:32] + '"'
+    return Snapshot(body, gzipped, etag, version, time.time())
+
+
+def snapshot_response(
+    snapshot: Snapshot, request: Request, media_type: str = "application/json"
+) -> Response:
+    """Odpowiedź 200 (gzip, jeśli klient akceptuje) albo 304 przy zgodnym ETagu."""
+    use_gzip = snapshot.gzipped is not None and "gzip" in request.headers.get(
+        "accept-encoding", ""
+    )
+    # Silny ETag jest osobny dla każdej reprezentacji (kodowania) odpowiedzi
+    etag = snapshot.etag[:-1] + '-gz"' if use_gzip else snapshot.etag
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzipped, media_type=media_type, headers=headers)
+    return Response(content=snapshot.body, media_type=media_type, headers=headers)
@@ -0,0 +1,132 @@
+"""
+Cache kafli wektorowych (MVT) w pamięci procesu.
+
+Kafel to gotowy Snapshot (bajty, wariant gzip, silny ETag) pod kluczem
+(warstwa, z, x, y), z ograniczoną liczbą wpisów (LRU). Każda warstwa ma
+licznik generacji: zapis danych warstwy zwiększa go po commit transakcji
+(invalidate_tiles_on_commit), co unieważnia naraz wszystkie kafle tej warstwy
+bez przeglądania cache. Kafel starszy niż TILE_CACHE_TTL_S jest liczony od
+nowa także bez zapisu - dotyczy to zmian z innych workerów i tras, z których
+punkty wypadają z okna czasowego.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.snapshot_cache import Snapshot, make_snapshot
+
+TILE_CACHE_MAX_ENTRIES = int(os.getenv("TILE_CACHE_MAX_ENTRIES", "4096"))
+TILE_CACHE_TTL_S = float(os.getenv("TILE_CACHE_TTL_S", "30"))
+
+TILE_LAYERS = ("vessels", "tracks", "routes")
+_PENDING_KEY = "tile_layers_pending"
+
+TileKey = Tuple[str, int, int, int]
+
+
+class TileCache:
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._tiles: "OrderedDict[TileKey, Snapshot]" = OrderedDict()
+        self._generations: Dict[str, int] = {layer: 0 for layer in TILE_LAYERS}
+        # Kafel liczony właśnie przez inne żądanie - czekamy na jego wynik
+        self._pending: Dict[TileKey, asyncio.Future] = {}
+        # Liczniki do monitorowania
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _fresh(self, key: TileKey, snapshot: Snapshot) -> bool:
+        return (
+            snapshot.version == self._generations[key[0]]
+            and time.time() - snapshot.built_at < self.ttl_s
+        )
+
+    async def get(
+        self, key: TileKey, build: Callable[[], Awaitable[bytes]]
+    ) -> Snapshot:
+        snapshot = self._tiles.get(key)
+        if snapshot is not None and self._fresh(key, snapshot):
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return snapshot
+        pending = self._pending.get(key)
+        if pending is not None:
+            snapshot = await asyncio.shield(pending)
+            if snapshot is not None:
+                return snapshot
+            # Żądanie liczące kafel zostało anulowane - próbujemy od nowa
+            return await self.get(key, build)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            # Generacja sprzed zapytania - zapis w trakcie liczenia unieważni kafel
+            generation = self._generations[key[0]]
+            snapshot = make_snapshot(await build(), generation)
+            self._tiles[key] = snapshot
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_entries:
+                self._tiles.popitem(last=False)
+            future.set_result(snapshot)
+            return snapshot
+        except asyncio.CancelledError:
+            # Anulowane jest tylko to żądanie (np. klient się rozłączył) - nie
+            # anulujemy wspólnej przyszłości, oczekujący policzą kafel sami
+            future.set_result(None)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Oczekujący dostaną wyjątek; bez ostrzeżenia w logu
+            raise
+        finally:
+            del self._pending[key]
+
+    def invalidate(self, layers: Iterable[str]) -> None:
+        for layer in layers:
+            self._generations[layer] += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._tiles),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "generations": dict(self._generations),
+        }
+
+
+tile_cache = TileCache(TILE_CACHE_MAX_ENTRIES, TILE_CACHE_TTL_S)
+
+
+def invalidate_tiles_on_commit(db, *layers: str) -> None:
+    """
+    Zapamiętuje w sesji (Session lub AsyncSession) warstwy zmienione w tej
+    transakcji; kafle tych warstw są unieważniane po commit, rollback je porzuca.
+    """
+    session = getattr(db, "sync_session", db)
+    session.info.setdefault(_PENDING_KEY, set()).update(layers)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    layers = session.info.pop(_PENDING_KEY, None)
+    if layers:
+        # Zwiększenie licznika jest bezpieczne także z wątku sesji synchronicznej
+        tile_cache.invalidate(layers)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
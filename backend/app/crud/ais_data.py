@@ -1,8 +1,27 @@
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session
+from app.core.export import GEOJSON_DEFAULT_PRECISION, geojson_select
+from app.core.geometry import point_wkt
+from app.crud.geofences import apply_geofences
 from app.models.models import AisData
 from app.schemas.ais_data import AisDataCreate
 from geoalchemy2 import WKTElement
-from geoalchemy2.shape import to_shape
+from typing import Optional, Tuple
+from datetime import datetime
+
+# Kolumny odpowiedzi JSON - pozycja jako WKT liczony w bazie, bez to_shape
+AIS_RESPONSE_COLUMNS = (
+    AisData.ais_data_id,
+    AisData.vessel_id,
+    point_wkt(AisData.position).label("position"),
+    AisData.course_over_ground,
+    AisData.speed_over_ground,
+    AisData.rate_of_turn,
+    AisData.navigation_status,
+    AisData.raw_data,
+    AisData.timestamp,
+)
+
 
 def create_ais_data(db: Session, ais_data: AisDataCreate):
     db_ais_data = AisData(
@@ -15,50 +34,123 @@ def create_ais_data(db: Session, ais_data: AisDataCreate):
         raw_data=ais_data.raw_data,
     )
     db.add(db_ais_data)
+    db.flush()  # timestamp (klucz główny) wraca z INSERT ... RETURNING
+    apply_geofences(
+        db,
+        [
+            {
+                "vessel_id": db_ais_data.vessel_id,
+                "timestamp": db_ais_data.timestamp,
+                "position": ais_data.position,
+            }
+        ],
+    )
     db.commit()
-    db.refresh(db_ais_data)
 
-    return {
-        "ais_data_id": db_ais_data.ais_data_id,
-        "vessel_id": db_ais_data.vessel_id,
-        "position": to_shape(db_ais_data.position).wkt,
-        "course_over_ground": float(db_ais_data.course_over_ground),
-        "speed_over_ground": float(db_ais_data.speed_over_ground),
-        "rate_of_turn": float(db_ais_data.rate_of_turn),
-        "navigation_status": db_ais_data.navigation_status,
-        "raw_data": db_ais_data.raw_data,
-        "timestamp": db_ais_data.timestamp,
-    }
+    # Zamiast refresh - odczyt od razu w postaci odpowiedzi
+    row = (
+        db.query(*AIS_RESPONSE_COLUMNS)
+        .filter(
+            AisData.ais_data_id == db_ais_data.ais_data_id,
+            AisData.timestamp == db_ais_data.timestamp,
+        )
+        .one()
+    )
+    return dict(row._mapping)
 
 def get_ais_data(db: Session, ais_data_id: int):
-    db_data = db.query(AisData).get(ais_data_id)
-    if not db_data:
+    # Klucz główny jest złożony (ais_data_id, timestamp) - szukamy po samym id
+    row = (
+        db.query(*AIS_RESPONSE_COLUMNS)
+        .filter(AisData.ais_data_id == ais_data_id)
+        .first()
+    )
+    if not row:
         return None
-    return {
-        "ais_data_id": db_data.ais_data_id,
-        "vessel_id": db_data.vessel_id,
-        "position": to_shape(db_data.position).wkt,
-        "course_over_ground": float(db_data.course_over_ground),
-        "speed_over_ground": float(db_data.speed_over_ground),
-        "rate_of_turn": float(db_data.rate_of_turn),
-        "navigation_status": db_data.navigation_status,
-        "raw_data": db_data.raw_data,
-        "timestamp": db_data.timestamp,
-    }
+    return dict(row._mapping)
+
+AIS_ROW_COLUMNS = (
+    AisData.ais_data_id,
+    AisData.vessel_id,
+    AisData.timestamp,
+    func.ST_X(AisData.position).label("longitude"),
+    func.ST_Y(AisData.position).label("latitude"),
+    AisData.course_over_ground,
+    AisData.speed_over_ground,
+    AisData.rate_of_turn,
+    AisData.navigation_status,
+)
+# Kolumny cech GeoJSON - geometria i właściwości składane w bazie
+AIS_GEOJSON_COLUMNS = (
+    AisData.ais_data_id,
+    AisData.vessel_id,
+    AisData.timestamp,
+    AisData.course_over_ground,
+    AisData.speed_over_ground,
+    AisData.rate_of_turn,
+    AisData.navigation_status,
+    AisData.position.label("geometry"),
+)
+AIS_COLUMNAR_FIELDS = {
+    "ids": "ais_data_id",
+    "vessel_ids": "vessel_id",
+    "timestamps": "timestamp",
+    "longitudes": "longitude",
+    "latitudes": "latitude",
+    "courses_over_ground": "course_over_ground",
+    "speeds_over_ground": "speed_over_ground",
+    "rates_of_turn": "rate_of_turn",
+    "navigation_statuses": "navigation_status",
+}
+
 
-def get_ais_datas(db: Session, skip: int = 0, limit: int = 100):
-    results = db.query(AisData).offset(skip).limit(limit).all()
-    return [
-        {
-            "ais_data_id": data.ais_data_id,
-            "vessel_id": data.vessel_id,
-            "position": to_shape(data.position).wkt,
-            "course_over_ground": float(data.course_over_ground),
-            "speed_over_ground": float(data.speed_over_ground),
-            "rate_of_turn": float(data.rate_of_turn),
-            "navigation_status": data.navigation_status,
-            "raw_data": data.raw_data,
-            "timestamp": data.timestamp,
-        }
-        for data in results
-    ]
+def _ais_page_query(
+    columns, skip: int, limit: int, after: Optional[Tuple[datetime, int]]
+):
+    query = select(*columns)
+    if after:
+        # Keyset: wpisy po (timestamp, ais_data_id) ostatniego z poprzedniej strony
+        after_timestamp, after_id = after
+        query = query.where(
+            AisData.timestamp >= after_timestamp,
+            tuple_(AisData.timestamp, AisData.ais_data_id)
+            > tuple_(after_timestamp, after_id),
+        )
+    return (
+        query.order_by(AisData.timestamp, AisData.ais_data_id)
+        .offset(skip)
+        .limit(limit)
+    )
+
+
+def get_ais_datas(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None,
+    as_rows: bool = False,
+):
+    # as_rows - krotki kolumn zamiast słowników (formaty kolumnowe/binarne)
+    columns = AIS_ROW_COLUMNS if as_rows else AIS_RESPONSE_COLUMNS
+    results = db.execute(_ais_page_query(columns, skip, limit, after)).all()
+    if as_rows:
+        return results
+    return [dict(row._mapping) for row in results]
+
+
+def get_ais_datas_geojson(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None,
+    precision: int = GEOJSON_DEFAULT_PRECISION,
+):
+    """Strona danych AIS jako FeatureCollection złożony w bazie."""
+    stmt = geojson_select(
+        _ais_page_query(AIS_GEOJSON_COLUMNS, skip, limit, after),
+        id_column="ais_data_id",
+        order=(("timestamp", False), ("ais_data_id", False)),
+        precision=precision,
+        cursor_columns=("timestamp", "ais_data_id"),
+    )
+    return db.execute(stmt).one()
@@ -0,0 +1,127 @@
+"""
+Ryzyko kolizji par łodzi (tabela collision_risks) i alerty.
+
+Tabela zawiera pary ryzykowne według ostatniej oceny (app/core/collision_risk.py):
+zapis scala bieżące pary przez INSERT ... ON CONFLICT DO UPDATE i usuwa pary,
+które przestały być ryzykowne. Para, której nie było w tabeli, dostaje alert
+collision_risk dla obu łodzi.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import AisData, Alert, CollisionRisk
+
+# Klucz blokady doradczej oceny - jeden worker naraz
+_EVALUATION_LOCK_ID = 0x43504131
+
+
+async def try_lock_evaluation_async(db: AsyncSession) -> bool:
+    """Blokada do końca transakcji; False, gdy trzyma ją inna sesja."""
+    return bool(await db.scalar(select(func.pg_try_advisory_xact_lock(_EVALUATION_LOCK_ID))))
+
+
+async def get_ais_snapshot_async(db: AsyncSession, since: datetime) -> List:
+    """Ostatni wpis AIS każdej łodzi nie starszy niż since (zakres pozwala pominąć partycje)."""
+    stmt = (
+        select(
+            AisData.vessel_id,
+            AisData.timestamp,
+            func.ST_X(AisData.position).label("lon"),
+            func.ST_Y(AisData.position).label("lat"),
+            AisData.course_over_ground.label("cog"),
+            AisData.speed_over_ground.label("sog"),
+        )
+        .distinct(AisData.vessel_id)
+        .where(
+            AisData.timestamp >= since,
+            AisData.position.isnot(None),
+            AisData.course_over_ground.isnot(None),
+            AisData.speed_over_ground.isnot(None),
+        )
+        .order_by(AisData.vessel_id, AisData.timestamp.desc())
+    )
+    return (await db.execute(stmt)).all()
+
+
+def _alert_message(other_vessel_id: int, cpa_meters: float, tcpa_seconds: float) -> str:
+    return (
+        f"Collision risk with vessel {other_vessel_id}: closest approach "
+        f"{cpa_meters:.0f} m in {tcpa_seconds / 60:.1f} min."
+    )
+
+
+async def store_collision_risks_async(db: AsyncSession, result, evaluated_at: datetime) -> int:
+    """
+    Zapisuje wynik oceny (CpaResult) jako bieżący stan tabeli i dodaje alerty
+    dla nowych par. Zwraca liczbę nowych par; commit wykonuje wywołujący.
+    """
+    rows = [
+        {
+            "vessel_id": int(vessel_id),
+            "other_vessel_id": int(other_vessel_id),
+            "cpa_meters": round(float(cpa), 2),
+            "tcpa_seconds": round(float(tcpa), 2),
+            "distance_meters": round(float(distance), 2),
+            "first_detected_at": evaluated_at,
+            "evaluated_at": evaluated_at,
+        }
+        for vessel_id, other_vessel_id, cpa, tcpa, distance in zip(*result)
+    ]
+    known = set(
+        (await db.execute(select(CollisionRisk.vessel_id, CollisionRisk.other_vessel_id))).all()
+    )
+    if rows:
+        stmt = pg_insert(CollisionRisk)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["vessel_id", "other_vessel_id"],
+                set_={
+                    "cpa_meters": stmt.excluded.cpa_meters,
+                    "tcpa_seconds": stmt.excluded.tcpa_seconds,
+                    "distance_meters": stmt.excluded.distance_meters,
+                    "evaluated_at": stmt.excluded.evaluated_at,
+                },
+            ),
+            rows,
+        )
+    await db.execute(delete(CollisionRisk).where(CollisionRisk.evaluated_at < evaluated_at))
+
+    new_rows = [row for row in rows if (row["vessel_id"], row["other_vessel_id"]) not in known]
+    alerts = [
+        {
+            "vessel_id": vessel_id,
+            "alert_type": "collision_risk",
+            "severity": "warning",
+            "timestamp": evaluated_at,
+            "message": _alert_message(other_vessel_id, row["cpa_meters"], row["tcpa_seconds"]),
+        }
+        for row in new_rows
+        for vessel_id, other_vessel_id in (
+            (row["vessel_id"], row["other_vessel_id"]),
+            (row["other_vessel_id"], row["vessel_id"]),
+        )
+    ]
+    if alerts:
+        await db.execute(insert(Alert), alerts)
+    return len(new_rows)
+
+
+async def get_collision_risks_async(
+    db: AsyncSession, vessel_id: Optional[int] = None
+) -> List[CollisionRisk]:
+    stmt = select(CollisionRisk).order_by(
+        CollisionRisk.tcpa_seconds, CollisionRisk.cpa_meters
+    )
+    if vessel_id is not None:
+        stmt = stmt.where(
+            or_(
+                CollisionRisk.vessel_id == vessel_id,
+                CollisionRisk.other_vessel_id == vessel_id,
+            )
+        )
+    return list((await db.scalars(stmt)).all())
@@ -1,6 +1,7 @@
 # app/crud/fleet.py
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from typing import List, Optional, Tuple
 from app.models.models import Fleet, Operator, Vessel  # Importuj modele
 from app.schemas.fleet import FleetCreate, FleetUpdate, FleetResponse
@@ -46,6 +47,10 @@ def get_fleets_with_vessel_counts(
     return results
 
 
+async def fleet_exists_async(db: AsyncSession, fleet_id: int) -> bool:
+    return (await db.scalar(select(Fleet.id).where(Fleet.id == fleet_id))) is not None
+
+
 def get_fleet(db: Session, fleet_id: int) -> Optional[Fleet]:
     return (
         db.query(Fleet)
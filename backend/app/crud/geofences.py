@@ -0,0 +1,142 @@
+"""
+Strefy geofencingu i alerty wejścia/wyjścia łodzi.
+
+Zapis strefy przeładowuje drzewo stref w pamięci (app/core/geofence.py) po
+commit; nieudane przeładowanie nie cofa zapisu - drzewo nadrobi okresowe
+przeładowanie. apply_geofences[_async] wywoływane jest w transakcji zapisu pozycji
+(Location, AisData) - dodaje wiersze alerts dla przejść łodzi przez granice
+stref; commit wykonuje wywołujący.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.geofence import evaluate_on_commit, geofence_index
+from app.models.models import Alert, GeofenceZone
+from app.schemas.geofence import GeofenceZoneCreate, GeofenceZoneUpdate
+
+logger = logging.getLogger(__name__)
+
+# Kolumny odpowiedzi - obszar jako WKT liczony w bazie
+GEOFENCE_ZONE_RESPONSE_COLUMNS = (
+    GeofenceZone.id,
+    GeofenceZone.name,
+    GeofenceZone.zone_type,
+    func.ST_AsText(GeofenceZone.area).label("area"),
+    GeofenceZone.severity,
+    GeofenceZone.alert_on_enter,
+    GeofenceZone.alert_on_exit,
+    GeofenceZone.active,
+    GeofenceZone.description,
+    GeofenceZone.created_at,
+    GeofenceZone.updated_at,
+)
+
+
+def _area_value(wkt: str):
+    # Kolumna przechowuje MULTIPOLYGON - pojedynczy wielokąt jest opakowywany
+    return func.ST_Multi(func.ST_GeomFromText(wkt, 4326))
+
+
+def _reload_index(db: Session) -> None:
+    # Strefa jest już zapisana - błąd przeładowania nie jest błędem żądania
+    try:
+        geofence_index.reload(db)
+    except Exception:
+        db.rollback()
+        logger.exception("Geofence index reload after zone change failed")
+
+
+def get_geofence_zone(db: Session, zone_id: int):
+    return (
+        db.execute(
+            select(*GEOFENCE_ZONE_RESPONSE_COLUMNS).where(GeofenceZone.id == zone_id)
+        )
+        .mappings()
+        .first()
+    )
+
+
+def get_geofence_zones(
+    db: Session, skip: int = 0, limit: int = 100, active_only: bool = False
+) -> List:
+    stmt = select(*GEOFENCE_ZONE_RESPONSE_COLUMNS).order_by(GeofenceZone.id)
+    if active_only:
+        stmt = stmt.where(GeofenceZone.active.is_(True))
+    return db.execute(stmt.offset(skip).limit(limit)).mappings().all()
+
+
+def create_geofence_zone(db: Session, zone_in: GeofenceZoneCreate):
+    db_zone = GeofenceZone(
+        **zone_in.model_dump(exclude={"area"}), area=_area_value(zone_in.area)
+    )
+    db.add(db_zone)
+    db.commit()
+    _reload_index(db)
+    return get_geofence_zone(db, db_zone.id)
+
+
+def update_geofence_zone(db: Session, zone_id: int, zone_in: GeofenceZoneUpdate):
+    db_zone = db.get(GeofenceZone, zone_id)
+    if db_zone is None:
+        return None
+    update_data = zone_in.model_dump(exclude_unset=True)
+    if update_data.get("area") is not None:
+        update_data["area"] = _area_value(update_data["area"])
+    for key, value in update_data.items():
+        if value is not None:
+            setattr(db_zone, key, value)
+    db.commit()
+    _reload_index(db)
+    return get_geofence_zone(db, zone_id)
+
+
+def delete_geofence_zone(db: Session, zone_id: int) -> bool:
+    db_zone = db.get(GeofenceZone, zone_id)
+    if db_zone is None:
+        return False
+    db.delete(db_zone)
+    db.commit()
+    _reload_index(db)
+    return True
+
+
+def _alert_rows(transitions: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    alerts = []
+    for transition in transitions:
+        zone = transition["zone"]
+        entered = transition["event"] == "enter"
+        if not (zone.alert_on_enter if entered else zone.alert_on_exit):
+            continue
+        alerts.append(
+            {
+                "vessel_id": transition["vessel_id"],
+                "alert_type": f"geofence_{transition['event']}",
+                "severity": zone.severity,
+                "timestamp": transition["timestamp"],
+                "message": (
+                    f"Vessel {'entered' if entered else 'left'} {zone.zone_type} "
+                    f"zone '{zone.name}' (zone id {zone.zone_id})."
+                ),
+            }
+        )
+    return alerts
+
+
+def apply_geofences(db: Session, rows: Iterable[Dict[str, Any]]) -> None:
+    """Alerty dla pozycji (słowniki z vessel_id, timestamp, position) w bieżącej transakcji."""
+    alerts = _alert_rows(evaluate_on_commit(db, rows))
+    if alerts:
+        db.execute(insert(Alert), alerts)
+
+
+async def apply_geofences_async(
+    db: AsyncSession, rows: Iterable[Dict[str, Any]]
+) -> None:
+    alerts = _alert_rows(evaluate_on_commit(db, rows))
+    if alerts:
+        await db.execute(insert(Alert), alerts)
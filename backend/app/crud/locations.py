@@ -1,13 +1,27 @@
 from sqlalchemy.orm import Session, aliased
-from sqlalchemy import func, desc, select, literal_column
-from app.models.models import Location, Vessel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import cast, func, desc, select, literal_column, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from app.models.models import Location, Vessel, VesselLatestPosition
+from app.crud.vessel_positions import (
+    apply_latest_positions,
+    apply_latest_positions_async,
+    location_row,
+    refresh_latest_position,
+)
+from app.core.export import GEOJSON_DEFAULT_PRECISION, geojson_select
+from app.core.geometry import envelope_filter, point_wkt
+from app.core.tile_cache import invalidate_tiles_on_commit
+from app.crud.geofences import apply_geofences, apply_geofences_async
 from sqlalchemy.exc import IntegrityError
-from app.schemas.location import LocationCreate, LocationUpdate
+from app.schemas.location import LocationCreate, LocationUpdate, VesselTrackResponse
 from app.schemas.vessel import VesselLatestLocationResponse
-from geoalchemy2 import WKTElement
+from geoalchemy2 import Geography, WKTElement
 from geoalchemy2.shape import to_shape
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import math
+import os
 
 
 def get_location_entry(
@@ -19,6 +33,65 @@ def get_location_entry(
     return query.first()
 
 
+# Pozycja jako lon/lat liczone w bazie - bez dekodowania WKB w Pythonie
+LOCATION_ROW_COLUMNS = (
+    Location.location_id,
+    Location.timestamp,
+    func.ST_X(Location.position).label("longitude"),
+    func.ST_Y(Location.position).label("latitude"),
+    Location.heading,
+    Location.accuracy_meters,
+    Location.source,
+)
+# Dopuszczalne odchylenie uproszczonego śladu w pikselach ekranu
+TRACK_SIMPLIFY_PIXELS = float(os.getenv("TRACK_SIMPLIFY_PIXELS", "1.0"))
+# Obwód równika w EPSG:3857 i rozmiar kafla mapy w pikselach
+_WEB_MERCATOR_WIDTH_M = 40075016.686
+_TILE_SIZE_PX = 256
+# Zasięg szerokości EPSG:3857 - ST_Transform zawodzi na biegunach (±90°)
+_WEB_MERCATOR_MAX_LAT = 85.0511287798
+
+# Kolumny odpowiedzi JSON (LocationResponse) - WKT pozycji liczony w bazie
+LOCATION_RESPONSE_COLUMNS = (
+    Location.location_id,
+    Location.vessel_id,
+    point_wkt(Location.position).label("position"),
+    Location.heading,
+    Location.accuracy_meters,
+    Location.timestamp,
+    Location.source,
+)
+# Kolumny cech GeoJSON - geometria i właściwości składane w bazie
+LOCATION_GEOJSON_COLUMNS = (
+    Location.location_id,
+    Location.timestamp,
+    Location.heading,
+    Location.accuracy_meters,
+    Location.source,
+    Location.position.label("geometry"),
+)
+LOCATION_GEOJSON_ORDER = (("timestamp", True), ("location_id", True))
+LOCATION_COLUMNAR_FIELDS = {
+    "ids": "location_id",
+    "timestamps": "timestamp",
+    "longitudes": "longitude",
+    "latitudes": "latitude",
+    "headings": "heading",
+    "accuracy_meters": "accuracy_meters",
+    "sources": "source",
+}
+
+
+def _before_location(before: Tuple[datetime, int]):
+    """Warunki keyset dla sortowania malejącego: wpisy starsze niż kursor."""
+    before_timestamp, before_id = before
+    return (
+        Location.timestamp <= before_timestamp,  # Przycinanie partycji
+        tuple_(Location.timestamp, Location.location_id)
+        < tuple_(before_timestamp, before_id),
+    )
+
+
 def get_location_entries_for_vessel(
     db: Session,
     vessel_id: int,
@@ -26,6 +99,7 @@ def get_location_entries_for_vessel(
     limit: int = 100,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
+    before: Optional[Tuple[datetime, int]] = None,
 ) -> List[Location]:
     db_vessel = db.query(Vessel).filter(Vessel.id == vessel_id).first()
     if not db_vessel:
@@ -37,9 +111,13 @@ def get_location_entries_for_vessel(
         query = query.filter(Location.timestamp >= start_time)
     if end_time:
         query = query.filter(Location.timestamp <= end_time)
+    if before:
+        query = query.filter(*_before_location(before))
 
     return (
-        query.order_by(Location.timestamp.desc())  # Najnowsze najpierw
+        query.order_by(
+            Location.timestamp.desc(), Location.location_id.desc()
+        )  # Najnowsze najpierw
         .offset(skip)
         .limit(limit)
         .all()
@@ -48,16 +126,9 @@ def get_location_entries_for_vessel(
 
 def get_latest_location_for_vessel(  # Funkcja pomocnicza, może być przydatna
     db: Session, vessel_id: int
-) -> Optional[Location]:
-    db_vessel = db.query(Vessel).filter(Vessel.id == vessel_id).first()
-    if not db_vessel:
-        return None
-    return (
-        db.query(Location)
-        .filter(Location.vessel_id == vessel_id)
-        .order_by(Location.timestamp.desc())
-        .first()
-    )
+) -> Optional[VesselLatestPosition]:
+    # Odczyt po kluczu z vessel_latest_position (te same pola co Location)
+    return db.get(VesselLatestPosition, vessel_id)
 
 
 def create_location_entry(  # Nazwa zmieniona dla spójności
@@ -82,6 +153,11 @@ def create_location_entry(  # Nazwa zmieniona dla spójności
 
     try:
         db.add(db_location)
+        db.flush()  # location_id potrzebne w vessel_latest_position
+        rows = [location_row(db_location)]
+        apply_latest_positions(db, rows)
+        apply_geofences(db, rows)
+        invalidate_tiles_on_commit(db, "vessels", "tracks")
         db.commit()
         db.refresh(db_location)
         return db_location
@@ -124,6 +200,9 @@ def update_location_entry(
         setattr(db_location, key, value)
 
     try:
+        db.flush()
+        refresh_latest_position(db, vessel_id)
+        invalidate_tiles_on_commit(db, "vessels", "tracks")
         db.commit()
         db.refresh(db_location)
         return db_location
@@ -157,6 +236,9 @@ def delete_location_entry(
             )
 
         db.delete(db_location)
+        db.flush()
+        refresh_latest_position(db, vessel_id)
+        invalidate_tiles_on_commit(db, "vessels", "tracks")
         db.commit()
         return db_location
     except ValueError:  # Przechwycenie naszego własnego błędu
@@ -172,3 +254,311 @@ def delete_location_entry(
     except Exception as e:
         db.rollback()
         raise RuntimeError(f"An unexpected error occurred during deletion: {str(e)}")
+
+
+# Wersje asynchroniczne (asyncpg) dla gorących ścieżek API
+
+
+def _location_entries_query(
+    columns,
+    vessel_id: int,
+    skip: int,
+    limit: int,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    before: Optional[Tuple[datetime, int]],
+):
+    query = select(*columns).where(Location.vessel_id == vessel_id)
+
+    if start_time:
+        query = query.where(Location.timestamp >= start_time)
+    if end_time:
+        query = query.where(Location.timestamp <= end_time)
+    if before:
+        query = query.where(*_before_location(before))
+
+    return (
+        query.order_by(Location.timestamp.desc(), Location.location_id.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+
+
+async def get_location_entries_for_vessel_async(
+    db: AsyncSession,
+    vessel_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    before: Optional[Tuple[datetime, int]] = None,
+    as_rows: bool = False,
+) -> List:
+    # Istnienie statku sprawdza route; as_rows - lon/lat dla formatów kolumnowych,
+    # w przeciwnym razie wiersze z pozycją jako WKT (bez obiektów ORM i to_shape)
+    columns = LOCATION_ROW_COLUMNS if as_rows else LOCATION_RESPONSE_COLUMNS
+    query = _location_entries_query(
+        columns, vessel_id, skip, limit, start_time, end_time, before
+    )
+    return (await db.execute(query)).all()
+
+
+async def get_location_entries_geojson_async(
+    db: AsyncSession,
+    vessel_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    before: Optional[Tuple[datetime, int]] = None,
+    precision: int = GEOJSON_DEFAULT_PRECISION,
+):
+    """Strona historii jako FeatureCollection złożony w bazie (wiersz z tekstem i kursorem)."""
+    page = _location_entries_query(
+        LOCATION_GEOJSON_COLUMNS, vessel_id, skip, limit, start_time, end_time, before
+    )
+    stmt = geojson_select(
+        page,
+        id_column="location_id",
+        order=LOCATION_GEOJSON_ORDER,
+        precision=precision,
+        cursor_columns=("timestamp", "location_id"),
+    )
+    return (await db.execute(stmt)).one()
+
+
+async def get_latest_location_for_vessel_async(
+    db: AsyncSession, vessel_id: int
+) -> Optional[VesselLatestPosition]:
+    return await db.get(VesselLatestPosition, vessel_id)
+
+
+async def create_location_entry_async(
+    db: AsyncSession, location_in: LocationCreate, vessel_id: int
+) -> Location:
+    db_vessel_id = await db.scalar(select(Vessel.id).where(Vessel.id == vessel_id))
+    if db_vessel_id is None:
+        raise ValueError(f"Vessel with id {vessel_id} not found.")
+
+    location_data = location_in.model_dump(exclude={"position"})
+    location_data["source"] = "manual"  # Zawsze ustawiamy source na manual
+
+    db_location = Location(
+        **location_data,
+        vessel_id=vessel_id,
+        position=location_in.position,
+    )
+
+    try:
+        db.add(db_location)
+        await db.flush()  # location_id wraca z INSERT ... RETURNING
+        rows = [location_row(db_location)]
+        await apply_latest_positions_async(db, rows)
+        await apply_geofences_async(db, rows)
+        invalidate_tiles_on_commit(db, "vessels", "tracks")
+        await db.commit()
+        return db_location
+    except IntegrityError as e:
+        await db.rollback()
+        orig_error = getattr(e, "orig", None)
+        error_detail = str(orig_error) if orig_error else str(e)
+        if "chk_location_heading_range" in error_detail.lower():
+            raise ValueError(
+                f"Invalid heading value. Must be between 0 and 359.99. Detail: {error_detail}"
+            )
+        raise ValueError(f"Database integrity error: {error_detail}")
+    except Exception as e:
+        await db.rollback()
+        raise RuntimeError(f"An unexpected error occurred: {str(e)}")
+
+
+def track_tolerance_meters(zoom: Optional[int]) -> float:
+    """Tolerancja uproszczenia (metry EPSG:3857) odpowiadająca pikselom przy danym zoomie."""
+    if zoom is None:
+        return 0.0
+    return TRACK_SIMPLIFY_PIXELS * _WEB_MERCATOR_WIDTH_M / (_TILE_SIZE_PX * 2**zoom)
+
+
+async def get_vessel_track_async(
+    db: AsyncSession,
+    vessel_id: int,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    zoom: Optional[int] = None,
+) -> VesselTrackResponse:
+    """
+    Cały ślad łodzi w zakresie czasu jako jedna linia, uproszczona w bazie
+    (ST_SimplifyPreserveTopology, Douglas-Peucker) w metrach EPSG:3857 -
+    tolerancja odpowiada rozmiarowi piksela przy danym zoomie, więc długi
+    rejs to kilkaset wierzchołków zamiast tysięcy punktów. Przy upraszczaniu
+    szerokość jest przycinana do zasięgu Web Mercatora (±85.05°), tak jak
+    na mapie - pozycje przy biegunach nie psują przekształcenia.
+    """
+    tolerance = track_tolerance_meters(zoom)
+    position = Location.position
+    if tolerance > 0:
+        position = func.ST_SetSRID(
+            func.ST_MakePoint(
+                func.ST_X(position),
+                func.greatest(
+                    func.least(func.ST_Y(position), _WEB_MERCATOR_MAX_LAT),
+                    -_WEB_MERCATOR_MAX_LAT,
+                ),
+            ),
+            4326,
+        )
+    conditions = [Location.vessel_id == vessel_id]
+    if start_time:
+        conditions.append(Location.timestamp >= start_time)
+    if end_time:
+        conditions.append(Location.timestamp <= end_time)
+    raw = (
+        select(
+            func.count().label("point_count"),
+            func.min(Location.timestamp).label("first_timestamp"),
+            func.max(Location.timestamp).label("last_timestamp"),
+            func.ST_MakeLine(
+                aggregate_order_by(position, Location.timestamp, Location.location_id)
+            ).label("line"),
+        )
+        .where(*conditions)
+        .subquery()
+    )
+
+    track = raw.c.line
+    if tolerance > 0:
+        track = func.ST_Transform(
+            func.ST_SimplifyPreserveTopology(func.ST_Transform(track, 3857), tolerance),
+            4326,
+        )
+    row = (
+        await db.execute(
+            select(
+                raw.c.point_count,
+                raw.c.first_timestamp,
+                raw.c.last_timestamp,
+                func.ST_AsText(track).label("track_wkt"),
+            )
+        )
+    ).one()
+
+    track_wkt = row.track_wkt
+    if row.point_count == 1:
+        # Linia z jednego punktu nie jest poprawną geometrią - zwracamy punkt
+        track_wkt = (
+            await db.execute(
+                select(point_wkt(Location.position)).where(*conditions)
+            )
+        ).scalar_one()
+    return VesselTrackResponse(
+        vessel_id=vessel_id,
+        zoom=zoom,
+        tolerance_meters=tolerance,
+        point_count=row.point_count,
+        vertex_count=track_wkt.count(",") + 1 if track_wkt else 0,
+        first_timestamp=row.first_timestamp,
+        last_timestamp=row.last_timestamp,
+        track_wkt=track_wkt,
+    )
+
+
+# Metry na stopień szerokości - wartość najmniejsza (na równiku), więc
+# prostokąt wokół okręgu wychodzi z zapasem
+_METERS_PER_DEGREE = 110_574.0
+
+
+def _circle_envelope(lon: float, lat: float, radius_m: float):
+    """Prostokąt (w stopniach) obejmujący okrąg - wstępny filtr && po indeksie."""
+    lat_delta = radius_m / _METERS_PER_DEGREE
+    min_lat, max_lat = max(lat - lat_delta, -90.0), min(lat + lat_delta, 90.0)
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat < 1e-6 or lat_delta / cos_lat >= 180:
+        return -180.0, min_lat, 180.0, max_lat  # Okrąg obejmuje biegun
+    lon_delta = lat_delta / cos_lat
+    # Po przekroczeniu antypołudnika min_lon > max_lon (envelope_filter dzieli prostokąt)
+    return (
+        (lon - lon_delta + 180) % 360 - 180,
+        min_lat,
+        (lon + lon_delta + 180) % 360 - 180,
+        max_lat,
+    )
+
+
+async def get_area_visits_async(
+    db: AsyncSession,
+    start_time: datetime,
+    end_time: datetime,
+    point: Optional[Tuple[float, float]] = None,
+    radius_m: Optional[float] = None,
+    polygon_wkt: Optional[str] = None,
+) -> List:
+    """
+    Statki, które w oknie [start_time, end_time] były w promieniu radius_m od
+    punktu (lon, lat) albo w wielokącie - jednym zapytaniem: pierwszy
+    i ostatni wpis w obszarze oraz najbliższe podejście na statek.
+
+    Filtr czasu przycina partycje locations, a && na prostokącie obszaru
+    pozwala użyć indeksu GiST (position, timestamp); dokładny warunek
+    (ST_DWithin na geography albo ST_Intersects) liczony jest tylko dla
+    kandydatów z indeksu.
+    """
+    position = Location.position
+    if polygon_wkt is not None:
+        area = func.ST_GeomFromText(polygon_wkt, 4326)
+        reference = func.ST_Centroid(area)
+        area_filter = (position.op("&&")(area), func.ST_Intersects(position, area))
+    else:
+        lon, lat = point
+        reference = func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326)
+        area_filter = (
+            envelope_filter(position, *_circle_envelope(lon, lat, radius_m)),
+            func.ST_DWithin(
+                cast(position, Geography), cast(reference, Geography), radius_m
+            ),
+        )
+
+    hits = (
+        select(
+            Location.vessel_id,
+            Location.location_id,
+            Location.timestamp,
+            point_wkt(position).label("position_wkt"),
+            func.ST_Distance(
+                cast(position, Geography), cast(reference, Geography)
+            ).label("distance_m"),
+        )
+        .where(
+            Location.timestamp >= start_time,
+            Location.timestamp <= end_time,
+            *area_filter,
+        )
+        .cte("hits")
+    )
+    chronological = (hits.c.timestamp, hits.c.location_id)
+    reverse_chronological = (hits.c.timestamp.desc(), hits.c.location_id.desc())
+    nearest = (hits.c.distance_m, hits.c.timestamp, hits.c.location_id)
+
+    def first_by(column, *order):
+        return func.array_agg(aggregate_order_by(column, *order))[1]
+
+    closest_distance = func.min(hits.c.distance_m)
+    stmt = (
+        select(
+            hits.c.vessel_id,
+            Vessel.name.label("vessel_name"),
+            func.count().label("entry_count"),
+            func.min(hits.c.timestamp).label("first_timestamp"),
+            first_by(hits.c.position_wkt, *chronological).label("first_position_wkt"),
+            func.max(hits.c.timestamp).label("last_timestamp"),
+            first_by(hits.c.position_wkt, *reverse_chronological).label(
+                "last_position_wkt"
+            ),
+            first_by(hits.c.timestamp, *nearest).label("closest_timestamp"),
+            first_by(hits.c.position_wkt, *nearest).label("closest_position_wkt"),
+            closest_distance.label("closest_distance_meters"),
+        )
+        .join(Vessel, Vessel.id == hits.c.vessel_id)
+        .group_by(hits.c.vessel_id, Vessel.name)
+        .order_by(closest_distance, hits.c.vessel_id)
+    )
+    return (await db.execute(stmt)).all()
@@ -1,47 +1,199 @@
-from sqlalchemy.orm import Session
-from typing import List
-from app.models.models import Vessel, Location, RoutePoint
-from app.schemas.public_map import PublicVesselMapData
-from app.schemas.route_point import RoutePointResponse  # Potrzebne do konwersji
-from geoalchemy2.shape import to_shape
-from sqlalchemy import desc
+import os
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from typing import List, Optional, Tuple
+from itertools import groupby
+from pydantic import TypeAdapter
+from app.models.models import Vessel, RoutePoint, VesselLatestPosition
+from app.schemas.public_map import (
+    PublicMapCluster,
+    PublicMapViewportResponse,
+    PublicVesselMapData,
+    PublicVesselViewportData,
+)
+from app.schemas.route_point import RoutePointResponse
+from app.core.geometry import envelope_filter, point_wkt
+from app.core.snapshot_cache import SnapshotCache
+from app.crud.route_points import ROUTE_POINT_RESPONSE_COLUMNS
 
+PUBLIC_MAP_SNAPSHOT_TTL_S = float(os.getenv("PUBLIC_MAP_SNAPSHOT_TTL_S", "5"))
+# Do tego zoomu włącznie widok zwraca klastry zamiast pojedynczych statków
+PUBLIC_MAP_CLUSTER_MAX_ZOOM = int(os.getenv("PUBLIC_MAP_CLUSTER_MAX_ZOOM", "6"))
+# Liczba komórek siatki klastrowania na szerokość kafla mapy (256 px)
+PUBLIC_MAP_CLUSTER_CELLS_PER_TILE = int(os.getenv("PUBLIC_MAP_CLUSTER_CELLS_PER_TILE", "4"))
 
-def get_public_map_initial_data(db: Session) -> List[PublicVesselMapData]:
-    results = []
+# Pozycje jako WKT liczone w bazie - bez dekodowania WKB i walidacji w Pythonie
+_VESSEL_COLUMNS = (
+    Vessel.id.label("vessel_id"),
+    Vessel.name,
+    point_wkt(VesselLatestPosition.position).label("latest_position_wkt"),
+    VesselLatestPosition.heading.label("latest_heading"),
+    VesselLatestPosition.timestamp.label("latest_timestamp"),
+)
+
+
+async def _planned_routes(
+    db: AsyncSession, vessel_ids: Optional[List[int]] = None
+) -> dict:
+    """Planowane trasy aktywnych statków (lub podanych) jednym zapytaniem."""
+    stmt = (
+        select(*ROUTE_POINT_RESPONSE_COLUMNS)
+        .join(Vessel, Vessel.id == RoutePoint.vessel_id)
+        .where(Vessel.status == "active", RoutePoint.status == "planned")
+        .order_by(RoutePoint.vessel_id, RoutePoint.sequence_number)
+    )
+    if vessel_ids is not None:
+        stmt = stmt.where(RoutePoint.vessel_id.in_(vessel_ids))
+    route_points = (await db.execute(stmt)).all()
+    # Wiersze pochodzą wprost z bazy - model_construct pomija ponowną walidację
+    return {
+        vessel_id: [RoutePointResponse.model_construct(**rp._mapping) for rp in points]
+        for vessel_id, points in groupby(route_points, key=lambda rp: rp.vessel_id)
+    }
+
+
+async def get_public_map_initial_data(db: AsyncSession) -> List[PublicVesselMapData]:
+    """
+    Aktywne statki z ostatnią pozycją i planowaną trasą - dwa zapytania
+    niezależnie od liczby statków: statki z vessel_latest_position oraz
+    wszystkie planowane punkty tras naraz, grupowane po statku w Pythonie.
+    """
     vessels = (
-        db.query(Vessel).filter(Vessel.status == "active").all()
-    )  # Tylko aktywne statki
-
-    for vessel in vessels:
-        latest_location = (
-            db.query(Location)
-            .filter(Location.vessel_id == vessel.id)
-            .order_by(desc(Location.timestamp))
-            .first()
+        await db.execute(
+            select(*_VESSEL_COLUMNS)
+            .outerjoin(
+                VesselLatestPosition, VesselLatestPosition.vessel_id == Vessel.id
+            )
+            .where(Vessel.status == "active")  # Tylko aktywne statki
+            .order_by(Vessel.id)
+        )
+    ).all()
+
+    planned_routes = await _planned_routes(db)
+
+    return [
+        PublicVesselMapData.model_construct(
+            **vessel._mapping, planned_route=planned_routes.get(vessel.vessel_id, [])
+        )
+        for vessel in vessels
+    ]
+
+
+def cluster_cell_size(zoom: int) -> float:
+    """Bok komórki siatki w stopniach - stała liczba komórek na kafel mapy."""
+    return 360.0 / (2 ** zoom) / PUBLIC_MAP_CLUSTER_CELLS_PER_TILE
+
+
+async def get_public_map_viewport_data(
+    db: AsyncSession,
+    bbox: Tuple[float, float, float, float],
+    zoom: int,
+    include_routes: bool = False,
+) -> PublicMapViewportResponse:
+    """
+    Aktywne statki w widocznym prostokącie. Przy małym zoomie statki są
+    grupowane w bazie po komórkach siatki (ST_SnapToGrid), więc rozmiar
+    odpowiedzi zależy od liczby komórek na ekranie, a nie od liczby statków.
+    Przy dużym zoomie - pojedyncze statki i opcjonalnie ich planowane trasy.
+    """
+    in_view = (
+        select()
+        .select_from(VesselLatestPosition)
+        .join(Vessel, Vessel.id == VesselLatestPosition.vessel_id)
+        .where(
+            Vessel.status == "active",
+            envelope_filter(VesselLatestPosition.position, *bbox),
         )
+    )
 
-        planned_route_db = (
-            db.query(RoutePoint)
-            .filter(RoutePoint.vessel_id == vessel.id)
-            .filter(RoutePoint.status == "planned")
-            .order_by(RoutePoint.sequence_number)
-            .all()
+    if zoom <= PUBLIC_MAP_CLUSTER_MAX_ZOOM:
+        cell = func.ST_SnapToGrid(VesselLatestPosition.position, cluster_cell_size(zoom))
+        centroid = func.ST_Centroid(func.ST_Collect(VesselLatestPosition.position))
+        rows = (
+            await db.execute(
+                in_view.add_columns(
+                    func.count().label("count"),
+                    func.ST_X(centroid).label("longitude"),
+                    func.ST_Y(centroid).label("latitude"),
+                ).group_by(cell)
+            )
+        ).all()
+        return PublicMapViewportResponse.model_construct(
+            zoom=zoom,
+            clustered=True,
+            clusters=[PublicMapCluster.model_construct(**row._mapping) for row in rows],
+            vessels=[],
         )
 
-        planned_route_pydantic: List[RoutePointResponse] = []
-        for rp_db in planned_route_db:
-            planned_route_pydantic.append(RoutePointResponse.model_validate(rp_db))
-
-        vessel_map_data = PublicVesselMapData(
-            vessel_id=vessel.id,
-            name=vessel.name,
-            latest_position_wkt=to_shape(latest_location.position).wkt
-            if latest_location and latest_location.position
-            else None,
-            latest_heading=latest_location.heading if latest_location else None,
-            latest_timestamp=latest_location.timestamp if latest_location else None,
-            planned_route=planned_route_pydantic,
+    vessels = (
+        await db.execute(
+            in_view.add_columns(
+                Vessel.id.label("vessel_id"),
+                Vessel.name,
+                func.ST_X(VesselLatestPosition.position).label("longitude"),
+                func.ST_Y(VesselLatestPosition.position).label("latitude"),
+                VesselLatestPosition.heading.label("latest_heading"),
+                VesselLatestPosition.timestamp.label("latest_timestamp"),
+            ).order_by(Vessel.id)
         )
-        results.append(vessel_map_data)
-    return results
+    ).all()
+    planned_routes = (
+        await _planned_routes(db, [vessel.vessel_id for vessel in vessels])
+        if include_routes and vessels
+        else None
+    )
+    return PublicMapViewportResponse.model_construct(
+        zoom=zoom,
+        clustered=False,
+        clusters=[],
+        vessels=[
+            PublicVesselViewportData.model_construct(
+                **vessel._mapping,
+                planned_route=planned_routes.get(vessel.vessel_id, [])
+                if planned_routes is not None
+                else None,
+            )
+            for vessel in vessels
+        ],
+    )
+
+
+_PUBLIC_MAP_ADAPTER = TypeAdapter(List[PublicVesselMapData])
+
+
+async def get_public_map_version(db: AsyncSession) -> Tuple:
+    """
+    Tani znacznik zmian danych mapy: max(updated_at) i liczność tabel
+    źródłowych (liczność wychwytuje usunięcia). Zmiana pozycji, punktu trasy
+    lub statusu statku zmienia wynik.
+    """
+    sources = (Vessel, VesselLatestPosition, RoutePoint)
+    row = (
+        await db.execute(
+            select(
+                *(
+                    column
+                    for model in sources
+                    for column in (
+                        select(func.max(model.updated_at)).scalar_subquery(),
+                        select(func.count()).select_from(model).scalar_subquery(),
+                    )
+                )
+            )
+        )
+    ).one()
+    return tuple(row)
+
+
+async def build_public_map_snapshot(db: AsyncSession) -> bytes:
+    """Dane mapy zserializowane do JSON-a raz na przebudowę snapshotu."""
+    data = await get_public_map_initial_data(db)
+    return _PUBLIC_MAP_ADAPTER.dump_json(data)
+
+
+public_map_snapshot = SnapshotCache(
+    "public_map",
+    load_version=get_public_map_version,
+    build=build_public_map_snapshot,
+    ttl_s=PUBLIC_MAP_SNAPSHOT_TTL_S,
+)
@@ -2,9 +2,37 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 
+from app.core.export import GEOJSON_DEFAULT_PRECISION, geojson_select
+from app.core.geometry import point_wkt
+from app.core.tile_cache import invalidate_tiles_on_commit
 from app.models.models import RoutePoint, Vessel
 from app.schemas.route_point import RoutePointCreate, RoutePointUpdate
-from sqlalchemy import func  # Dla WKT
+from sqlalchemy import func, select  # Dla WKT
+
+# Kolumny odpowiedzi (RoutePointResponse) - WKT pozycji liczony w bazie
+ROUTE_POINT_RESPONSE_COLUMNS = (
+    RoutePoint.route_point_id,
+    RoutePoint.vessel_id,
+    RoutePoint.sequence_number,
+    point_wkt(RoutePoint.planned_position).label("planned_position"),
+    RoutePoint.planned_arrival_time,
+    RoutePoint.planned_departure_time,
+    RoutePoint.actual_arrival_time,
+    RoutePoint.status,
+    RoutePoint.created_at,
+    RoutePoint.updated_at,
+)
+# Kolumny cech GeoJSON - geometria i właściwości składane w bazie
+ROUTE_POINT_GEOJSON_COLUMNS = (
+    RoutePoint.route_point_id,
+    RoutePoint.vessel_id,
+    RoutePoint.sequence_number,
+    RoutePoint.planned_arrival_time,
+    RoutePoint.planned_departure_time,
+    RoutePoint.actual_arrival_time,
+    RoutePoint.status,
+    RoutePoint.planned_position.label("geometry"),
+)
 
 
 def get_route_point(
@@ -18,14 +46,14 @@ def get_route_point(
 
 def get_route_points_for_vessel(
     db: Session, vessel_id: int, skip: int = 0, limit: int = 100
-) -> List[RoutePoint]:
+) -> List:
     # Sprawdź, czy statek istnieje
     db_vessel = db.query(Vessel).filter(Vessel.id == vessel_id).first()
     if not db_vessel:
         return []
 
     return (
-        db.query(RoutePoint)
+        db.query(*ROUTE_POINT_RESPONSE_COLUMNS)
         .filter(RoutePoint.vessel_id == vessel_id)
         .order_by(RoutePoint.sequence_number)
         .offset(skip)
@@ -34,6 +62,30 @@ def get_route_points_for_vessel(
     )
 
 
+def get_route_points_geojson(
+    db: Session,
+    vessel_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    precision: int = GEOJSON_DEFAULT_PRECISION,
+):
+    """Punkty trasy jako FeatureCollection złożony w bazie (istnienie statku sprawdza route)."""
+    page = (
+        select(*ROUTE_POINT_GEOJSON_COLUMNS)
+        .where(RoutePoint.vessel_id == vessel_id)
+        .order_by(RoutePoint.sequence_number)
+        .offset(skip)
+        .limit(limit)
+    )
+    stmt = geojson_select(
+        page,
+        id_column="route_point_id",
+        order=(("sequence_number", False),),
+        precision=precision,
+    )
+    return db.execute(stmt).one()
+
+
 def create_route_point_for_vessel(
     db: Session, route_point_in: RoutePointCreate, vessel_id: int
 ) -> RoutePoint:
@@ -54,6 +106,7 @@ def create_route_point_for_vessel(
 
     try:
         db.add(db_route_point)
+        invalidate_tiles_on_commit(db, "routes")
         db.commit()
         db.refresh(db_route_point)
         return db_route_point
@@ -95,6 +148,7 @@ def update_route_point(
         setattr(db_route_point, key, value)
 
     try:
+        invalidate_tiles_on_commit(db, "routes")
         db.commit()
         db.refresh(db_route_point)
         return db_route_point
@@ -127,6 +181,7 @@ def delete_route_point(
 
     try:
         db.delete(db_route_point)
+        invalidate_tiles_on_commit(db, "routes")
         db.commit()
         return db_route_point
     except IntegrityError as e:  # Na wypadek nieprzewidzianych ograniczeń FK
@@ -201,6 +256,7 @@ def update_route_points_order_for_vessel(
                 db.add(route_point)
                 updated_route_points_final.append(route_point)
 
+        invalidate_tiles_on_commit(db, "routes")
         db.commit()  # Commit obu faz naraz
 
         for rp in updated_route_points_final:
@@ -0,0 +1,157 @@
+"""
+Bieżący stan czujników (tabela sensor_latest).
+
+Wiersz sensora jest aktualizowany w tej samej transakcji co zapis odczytów
+(apply_latest / apply_latest_async): paczka jest najpierw redukowana w Pythonie
+do ostatniego odczytu i liczby odczytów na sensor, a potem scalana przez
+INSERT ... ON CONFLICT DO UPDATE. Odczyt spóźniony zwiększa licznik, ale nie
+nadpisuje nowszego ostatniego odczytu.
+
+Licznik odczytów i największe id odczytu są też znacznikiem zmian dla ETagów
+list odczytów: każdy zatwierdzony zapis zmienia licznik, także wtedy, gdy
+odczyt jest spóźniony albo ma id mniejsze niż odczyty zatwierdzone przed nim.
+
+Stan wszystkich sensorów statku lub floty to jedno zapytanie po kluczu
+głównym - bez szukania ORDER BY timestamp DESC LIMIT 1 w sensor_readings.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.crud.sensor_rollups import as_utc
+from app.models.models import Sensor, SensorLatest, Vessel
+
+
+def aggregate_latest(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Redukuje wiersze odczytów do ostatniego odczytu i liczby odczytów na sensor.
+    Wynik posortowany po sensor_id (stała kolejność blokad wierszy).
+    """
+    latest: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        timestamp = as_utc(row["timestamp"])
+        state = latest.get(row["sensor_id"])
+        if state is None:
+            latest[row["sensor_id"]] = {
+                "sensor_id": row["sensor_id"],
+                "last_value": row["value"],
+                "last_status": row.get("status") or "normal",
+                "last_timestamp": timestamp,
+                "reading_count": 1,
+                "last_reading_id": row.get("id"),
+            }
+            continue
+        state["reading_count"] += 1
+        if row.get("id") is not None:
+            state["last_reading_id"] = max(state["last_reading_id"] or 0, row["id"])
+        if timestamp >= state["last_timestamp"]:
+            state["last_value"] = row["value"]
+            state["last_status"] = row.get("status") or "normal"
+            state["last_timestamp"] = timestamp
+    return [latest[sensor_id] for sensor_id in sorted(latest)]
+
+
+def _upsert_statement():
+    stmt = pg_insert(SensorLatest)
+    current = SensorLatest.__table__.c
+    new = stmt.excluded
+    is_newer = new.last_timestamp >= current.last_timestamp
+    return stmt.on_conflict_do_update(
+        index_elements=["sensor_id"],
+        set_={
+            "last_value": case((is_newer, new.last_value), else_=current.last_value),
+            "last_status": case((is_newer, new.last_status), else_=current.last_status),
+            "last_timestamp": func.greatest(current.last_timestamp, new.last_timestamp),
+            "reading_count": current.reading_count + new.reading_count,
+            # greatest pomija NULL (wiersze bez id z RETURNING)
+            "last_reading_id": func.greatest(current.last_reading_id, new.last_reading_id),
+            "updated_at": func.now(),
+        },
+    )
+
+
+def apply_latest(db: Session, rows: Iterable[Dict[str, Any]]) -> None:
+    """Aktualizuje stan sensorów w bieżącej transakcji (commit wykonuje wywołujący)."""
+    states = aggregate_latest(rows)
+    if states:
+        db.execute(_upsert_statement(), states)
+
+
+async def apply_latest_async(db: AsyncSession, rows: Iterable[Dict[str, Any]]) -> None:
+    states = aggregate_latest(rows)
+    if states:
+        await db.execute(_upsert_statement(), states)
+
+
+async def get_change_marks_async(
+    db: AsyncSession, sensor_ids
+) -> Dict[int, Tuple[Optional[int], int]]:
+    """
+    (największe id odczytu, liczba odczytów) każdego sensora - tani znacznik
+    zmian do ETagów: jeden odczyt klucza głównego na sensor.
+    sensor_ids - lista id albo podzapytanie (np. sensory statku).
+    """
+    rows = (
+        await db.execute(
+            select(
+                SensorLatest.sensor_id,
+                SensorLatest.last_reading_id,
+                SensorLatest.reading_count,
+            ).where(SensorLatest.sensor_id.in_(sensor_ids))
+        )
+    ).all()
+    return {row.sensor_id: (row.last_reading_id, row.reading_count) for row in rows}
+
+
+async def get_vessel_change_marks_async(
+    db: AsyncSession, vessel_id: int
+) -> Dict[int, Tuple[Optional[int], int]]:
+    return await get_change_marks_async(
+        db, select(Sensor.id).where(Sensor.vessel_id == vessel_id)
+    )
+
+
+async def get_sensors_current_state_async(
+    db: AsyncSession,
+    vessel_id: Optional[int] = None,
+    fleet_id: Optional[int] = None,
+    silent_minutes: Optional[int] = None,
+) -> List:
+    """
+    Stan wszystkich sensorów statku lub floty (sensory bez odczytów z pustym
+    stanem). Z silent_minutes - tylko sensory bez odczytu od tylu minut.
+    """
+    stmt = (
+        select(
+            Sensor.id.label("sensor_id"),
+            Sensor.name.label("sensor_name"),
+            Sensor.vessel_id,
+            Sensor.measurement_unit,
+            SensorLatest.last_value,
+            SensorLatest.last_status,
+            SensorLatest.last_timestamp,
+            func.coalesce(SensorLatest.reading_count, 0).label("reading_count"),
+        )
+        .outerjoin(SensorLatest, SensorLatest.sensor_id == Sensor.id)
+        .order_by(Sensor.vessel_id, Sensor.id)
+    )
+    if vessel_id is not None:
+        stmt = stmt.where(Sensor.vessel_id == vessel_id)
+    if fleet_id is not None:
+        stmt = stmt.join(Vessel, Vessel.id == Sensor.vessel_id).where(
+            Vessel.fleet_id == fleet_id
+        )
+    if silent_minutes is not None:
+        silent_since = datetime.now(timezone.utc) - timedelta(minutes=silent_minutes)
+        stmt = stmt.where(
+            or_(
+                SensorLatest.last_timestamp.is_(None),
+                SensorLatest.last_timestamp < silent_since,
+            )
+        )
+    return (await db.execute(stmt)).all()
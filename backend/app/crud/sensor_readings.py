@@ -1,10 +1,27 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from sqlalchemy import and_, insert, select, tuple_
+from typing import AsyncIterator, List, Optional, Tuple
 from datetime import datetime
+from itertools import groupby
+import os
+
+from starlette.concurrency import run_in_threadpool
 
 from app.models.models import SensorReading, Sensor  # Importuj model Sensor
-from app.schemas.sensor_reading import SensorReadingCreate
+from app.core.database import AsyncSessionLocal
+from app.core.downsampling import downsample_readings
+from app.core.live_readings import publish_on_commit
+from app.core.sensor_cache import sensor_cache
+from app.crud.sensor_latest import apply_latest, apply_latest_async
+from app.crud.sensor_rollups import apply_rollups, apply_rollups_async
+from app.schemas.sensor_reading import (
+    SensorReadingCreate,
+    SensorReadingBatchItem,
+    SensorReadingBatchItemResult,
+    SensorReadingBatchResponse,
+)
 
 
 def create_sensor_reading(
@@ -20,6 +37,11 @@ def create_sensor_reading(
 
     try:
         db.add(db_reading)
+        db.flush()  # id odczytu potrzebny subskrybentom na żywo
+        row = {**reading_in.model_dump(), "sensor_id": sensor_id, "id": db_reading.id}
+        apply_rollups(db, [row])
+        apply_latest(db, [row])
+        publish_on_commit(db, [row], {sensor_id: db_sensor.vessel_id})
         db.commit()
         db.refresh(db_reading)
         return db_reading
@@ -39,6 +61,149 @@ def create_sensor_reading(
         )
 
 
+def _split_readings_batch(readings_in, existing_sensor_ids):
+    """Dzieli paczkę na wiersze do zapisu i wyniki odrzucone (nieznany sensor)."""
+    results: List[Optional[SensorReadingBatchItemResult]] = [None] * len(readings_in)
+    rows_to_insert = []
+    row_indexes = []  # Indeksy w paczce wejściowej odpowiadające rows_to_insert
+    for index, reading in enumerate(readings_in):
+        if reading.sensor_id not in existing_sensor_ids:
+            results[index] = SensorReadingBatchItemResult(
+                index=index,
+                sensor_id=reading.sensor_id,
+                accepted=False,
+                error=f"Sensor with id {reading.sensor_id} not found.",
+            )
+            continue
+        rows_to_insert.append(reading.model_dump())
+        row_indexes.append(index)
+    return results, rows_to_insert, row_indexes
+
+
+def _build_batch_response(
+    readings_in, results, row_indexes, inserted_ids
+) -> SensorReadingBatchResponse:
+    for index, reading_id in zip(row_indexes, inserted_ids):
+        results[index] = SensorReadingBatchItemResult(
+            index=index,
+            sensor_id=readings_in[index].sensor_id,
+            accepted=True,
+            id=reading_id,
+        )
+    return SensorReadingBatchResponse(
+        accepted=len(row_indexes),
+        rejected=len(readings_in) - len(row_indexes),
+        results=results,
+    )
+
+
+def _batch_insert_statement():
+    return insert(SensorReading).returning(
+        SensorReading.id, sort_by_parameter_order=True
+    )
+
+
+def create_sensor_readings_batch(
+    db: Session, readings_in: List[SensorReadingBatchItem]
+) -> SensorReadingBatchResponse:
+    """
+    Zapisuje paczkę odczytów z wielu sensorów w jednej transakcji.
+    Istnienie wszystkich sensorów sprawdzane jest jednym zapytaniem, a odczyty
+    dla nieistniejących sensorów są odrzucane (pozostałe zostają zapisane).
+    """
+    # 1. Jedno zapytanie o wszystkie sensory występujące w paczce
+    requested_sensor_ids = {reading.sensor_id for reading in readings_in}
+    # sensor_id -> vessel_id; statek potrzebny subskrybentom na żywo
+    existing_sensor_ids = dict(
+        db.execute(
+            select(Sensor.id, Sensor.vessel_id).where(
+                Sensor.id.in_(requested_sensor_ids)
+            )
+        ).all()
+    )
+    results, rows_to_insert, row_indexes = _split_readings_batch(
+        readings_in, existing_sensor_ids
+    )
+
+    # 2. Wielowierszowy INSERT ... RETURNING w jednej transakcji
+    inserted_ids = []
+    if rows_to_insert:
+        try:
+            inserted_ids = db.scalars(_batch_insert_statement(), rows_to_insert).all()
+            inserted = [{**row, "id": id_} for row, id_ in zip(rows_to_insert, inserted_ids)]
+            apply_rollups(db, inserted)
+            apply_latest(db, inserted)
+            publish_on_commit(db, inserted, existing_sensor_ids)
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            orig_error = getattr(e, "orig", None)
+            error_detail = str(orig_error) if orig_error else str(e)
+            raise ValueError(f"Database integrity error: {error_detail}")
+        except Exception as e:
+            db.rollback()
+            raise RuntimeError(
+                f"An unexpected error occurred while creating sensor readings batch: {str(e)}"
+            )
+
+    return _build_batch_response(readings_in, results, row_indexes, inserted_ids)
+
+
+# Kolumny odczytu pobierane jako krotki zamiast obiektów ORM (próbkowanie,
+# eksport, formaty kolumnowe)
+_READING_COLUMNS = (
+    SensorReading.id,
+    SensorReading.sensor_id,
+    SensorReading.value,
+    SensorReading.status,
+    SensorReading.timestamp,
+)
+READING_EXPORT_COLUMNS = tuple(column.key for column in _READING_COLUMNS)
+# Format kolumnowy: klucz wyniku -> kolumna krotki
+READING_COLUMNAR_FIELDS = {
+    "ids": "id",
+    "timestamps": "timestamp",
+    "values": "value",
+    "status": "status",
+}
+VESSEL_READING_COLUMNAR_FIELDS = {"sensor_ids": "sensor_id", **READING_COLUMNAR_FIELDS}
+# Zakładka after_id: id z sekwencji są nadawane przy INSERT, a transakcje
+# zatwierdzają się w dowolnej kolejności (paczki bufora write-behind, równoległe
+# zapisy paczek), więc odczyt z mniejszym id może stać się widoczny później
+DELTA_POLL_ID_OVERLAP = int(os.getenv("DELTA_POLL_ID_OVERLAP", "50000"))
+
+
+def _new_readings_conditions(after_id: Optional[int], since: Optional[datetime]):
+    """
+    Odpytywanie przyrostowe: odczyty o id większym niż after_id pomniejszone
+    o DELTA_POLL_ID_OVERLAP i/lub nowsze niż since. Zakładka zwraca ponownie
+    część znanych już odczytów (klient odrzuca je po id), ale nie gubi tych,
+    które zatwierdzono po odczycie z większym id.
+    """
+    conditions = []
+    if after_id is not None:
+        conditions.append(SensorReading.id > after_id - DELTA_POLL_ID_OVERLAP)
+    if since is not None:
+        conditions.append(SensorReading.timestamp > since)
+    return conditions
+
+
+def _after_reading(after: Tuple[datetime, int]):
+    """Warunki keyset: odczyty po (timestamp, id) ostatniego z poprzedniej strony."""
+    after_timestamp, after_id = after
+    return (
+        # Osobny warunek na samym timestamp pozwala przyciąć partycje
+        SensorReading.timestamp >= after_timestamp,
+        tuple_(SensorReading.timestamp, SensorReading.id) > tuple_(after_timestamp, after_id),
+    )
+
+
+def _after_vessel_reading(after: Tuple[int, datetime, int]):
+    return tuple_(
+        SensorReading.sensor_id, SensorReading.timestamp, SensorReading.id
+    ) > tuple_(*after)
+
+
 def get_sensor_readings(
     db: Session,
     sensor_id: int,
@@ -46,6 +211,7 @@ def get_sensor_readings(
     end_time: Optional[datetime] = None,
     skip: int = 0,
     limit: int = 1000,
+    after: Optional[Tuple[datetime, int]] = None,
 ) -> List[SensorReading]:
     db_sensor = db.query(Sensor).filter(Sensor.id == sensor_id).first()
     if not db_sensor:
@@ -57,9 +223,16 @@ def get_sensor_readings(
         query = query.filter(SensorReading.timestamp >= start_time)
     if end_time:
         query = query.filter(SensorReading.timestamp <= end_time)
+    if after:
+        query = query.filter(*_after_reading(after))
 
     # Zazwyczaj chcemy najnowsze odczyty, ale dla wykresu lepsze jest sortowanie rosnące po czasie
-    return query.order_by(SensorReading.timestamp.asc()).offset(skip).limit(limit).all()
+    return (
+        query.order_by(SensorReading.timestamp.asc(), SensorReading.id.asc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 
 def get_sensor_readings_for_vessel(
@@ -72,6 +245,7 @@ def get_sensor_readings_for_vessel(
     ] = None,  # Filtrowanie po konkretnych sensorach na statku
     skip: int = 0,
     limit: int = 10000,
+    after: Optional[Tuple[int, datetime, int]] = None,
 ) -> List[SensorReading]:
     query = db.query(SensorReading).join(Sensor).filter(Sensor.vessel_id == vessel_id)
 
@@ -81,10 +255,303 @@ def get_sensor_readings_for_vessel(
         query = query.filter(SensorReading.timestamp <= end_time)
     if sensor_ids:
         query = query.filter(SensorReading.sensor_id.in_(sensor_ids))
+    if after:
+        query = query.filter(_after_vessel_reading(after))
 
     return (
-        query.order_by(SensorReading.sensor_id, SensorReading.timestamp.asc())
+        query.order_by(
+            SensorReading.sensor_id, SensorReading.timestamp.asc(), SensorReading.id
+        )
         .offset(skip)
         .limit(limit)
         .all()
     )
+
+
+# Wersje asynchroniczne (asyncpg) dla gorących ścieżek API
+
+
+async def create_sensor_reading_async(
+    db: AsyncSession, reading_in: SensorReadingCreate, sensor_id: int
+) -> SensorReading:
+    # Istnienie sensora sprawdza route; wyścig z usunięciem sensora
+    # zatrzyma klucz obcy (IntegrityError), więc nie powtarzamy zapytania.
+    db_reading = SensorReading(**reading_in.model_dump(), sensor_id=sensor_id)
+
+    try:
+        db.add(db_reading)
+        await db.flush()  # id odczytu potrzebny subskrybentom na żywo
+        row = {**reading_in.model_dump(), "sensor_id": sensor_id, "id": db_reading.id}
+        await apply_rollups_async(db, [row])
+        await apply_latest_async(db, [row])
+        publish_on_commit(db, [row])
+        await db.commit()  # id wraca z INSERT ... RETURNING, refresh jest zbędny
+        return db_reading
+    except IntegrityError as e:
+        await db.rollback()
+        orig_error = getattr(e, "orig", None)
+        error_detail = str(orig_error) if orig_error else str(e)
+        if "chk_sensor_reading_status" in error_detail.lower():
+            raise ValueError(f"Invalid status value. Detail: {error_detail}")
+        raise ValueError(f"Database integrity error: {error_detail}")
+    except Exception as e:
+        await db.rollback()
+        raise RuntimeError(
+            f"An unexpected error occurred while creating sensor reading: {str(e)}"
+        )
+
+
+async def create_sensor_readings_batch_async(
+    db: AsyncSession, readings_in: List[SensorReadingBatchItem]
+) -> SensorReadingBatchResponse:
+    # Walidacja sensorów z cache'a metadanych - zapytanie tylko o brakujące
+    existing_sensor_ids = await sensor_cache.get_many_or_load_async(
+        db, (reading.sensor_id for reading in readings_in)
+    )
+    results, rows_to_insert, row_indexes = _split_readings_batch(
+        readings_in, existing_sensor_ids
+    )
+
+    inserted_ids = []
+    if rows_to_insert:
+        try:
+            inserted_ids = (
+                await db.scalars(_batch_insert_statement(), rows_to_insert)
+            ).all()
+            inserted = [{**row, "id": id_} for row, id_ in zip(rows_to_insert, inserted_ids)]
+            await apply_rollups_async(db, inserted)
+            await apply_latest_async(db, inserted)
+            publish_on_commit(
+                db,
+                inserted,
+                {
+                    sensor_id: metadata.vessel_id
+                    for sensor_id, metadata in existing_sensor_ids.items()
+                },
+            )
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            orig_error = getattr(e, "orig", None)
+            error_detail = str(orig_error) if orig_error else str(e)
+            raise ValueError(f"Database integrity error: {error_detail}")
+        except Exception as e:
+            await db.rollback()
+            raise RuntimeError(
+                f"An unexpected error occurred while creating sensor readings batch: {str(e)}"
+            )
+
+    return _build_batch_response(readings_in, results, row_indexes, inserted_ids)
+
+
+async def get_sensor_readings_async(
+    db: AsyncSession,
+    sensor_id: int,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = 1000,
+    after: Optional[Tuple[datetime, int]] = None,
+    as_rows: bool = False,
+    after_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+) -> List[SensorReading]:
+    # as_rows - krotki kolumn zamiast obiektów ORM (formaty kolumnowe/binarne)
+    entities = _READING_COLUMNS if as_rows else (SensorReading,)
+    query = select(*entities).where(SensorReading.sensor_id == sensor_id)
+
+    if start_time:
+        query = query.where(SensorReading.timestamp >= start_time)
+    if end_time:
+        query = query.where(SensorReading.timestamp <= end_time)
+    if after:
+        query = query.where(*_after_reading(after))
+    query = query.where(*_new_readings_conditions(after_id, since))
+
+    query = (
+        query.order_by(SensorReading.timestamp.asc(), SensorReading.id.asc())
+        .offset(skip)
+        .limit(limit)
+    )
+    if as_rows:
+        return (await db.execute(query)).all()
+    return (await db.scalars(query)).all()
+
+
+async def get_sensor_readings_for_vessel_async(
+    db: AsyncSession,
+    vessel_id: int,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    sensor_ids: Optional[List[int]] = None,
+    skip: int = 0,
+    limit: int = 10000,
+    after: Optional[Tuple[int, datetime, int]] = None,
+    as_rows: bool = False,
+) -> List[SensorReading]:
+    entities = _READING_COLUMNS if as_rows else (SensorReading,)
+    query = (
+        select(*entities)
+        .join(Sensor)
+        .where(Sensor.vessel_id == vessel_id)
+    )
+
+    if start_time:
+        query = query.where(SensorReading.timestamp >= start_time)
+    if end_time:
+        query = query.where(SensorReading.timestamp <= end_time)
+    if sensor_ids:
+        query = query.where(SensorReading.sensor_id.in_(sensor_ids))
+    if after:
+        query = query.where(_after_vessel_reading(after))
+
+    query = (
+        query.order_by(
+            SensorReading.sensor_id, SensorReading.timestamp.asc(), SensorReading.id
+        )
+        .offset(skip)
+        .limit(limit)
+    )
+    if as_rows:
+        return (await db.execute(query)).all()
+    return (await db.scalars(query)).all()
+
+
+async def get_sensor_readings_downsampled_async(
+    db: AsyncSession,
+    sensor_id: int,
+    max_points: int,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+) -> List:
+    """Cały zakres czasu sprowadzony LTTB do co najwyżej max_points odczytów."""
+    query = select(*_READING_COLUMNS).where(SensorReading.sensor_id == sensor_id)
+    if start_time:
+        query = query.where(SensorReading.timestamp >= start_time)
+    if end_time:
+        query = query.where(SensorReading.timestamp <= end_time)
+
+    rows = (await db.execute(query.order_by(SensorReading.timestamp.asc()))).all()
+    # Pętla po kubełkach LTTB nie powinna blokować pętli zdarzeń
+    return await run_in_threadpool(downsample_readings, rows, max_points)
+
+
+def _downsample_per_sensor(rows, max_points: int) -> List:
+    downsampled = []
+    for _, sensor_rows in groupby(rows, key=lambda row: row.sensor_id):
+        downsampled.extend(downsample_readings(list(sensor_rows), max_points))
+    return downsampled
+
+
+async def get_sensor_readings_for_vessel_downsampled_async(
+    db: AsyncSession,
+    vessel_id: int,
+    max_points: int,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    sensor_ids: Optional[List[int]] = None,
+) -> List:
+    """Jak wyżej, ale dla każdego sensora statku osobno (max_points na sensor)."""
+    query = _vessel_readings_columns_query(vessel_id, start_time, end_time, sensor_ids)
+    rows = (await db.execute(query)).all()
+    return await run_in_threadpool(_downsample_per_sensor, rows, max_points)
+
+
+def _vessel_readings_columns_query(vessel_id, start_time, end_time, sensor_ids):
+    query = select(*_READING_COLUMNS).join(Sensor).where(Sensor.vessel_id == vessel_id)
+    if start_time:
+        query = query.where(SensorReading.timestamp >= start_time)
+    if end_time:
+        query = query.where(SensorReading.timestamp <= end_time)
+    if sensor_ids:
+        query = query.where(SensorReading.sensor_id.in_(sensor_ids))
+    return query.order_by(SensorReading.sensor_id, SensorReading.timestamp.asc())
+
+
+async def stream_sensor_readings_for_vessel_async(
+    vessel_id: int,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    sensor_ids: Optional[List[int]] = None,
+    chunk_size: int = 5000,
+) -> AsyncIterator[list]:
+    """
+    Odczyty statku paczkami po chunk_size wierszy, czytane kursorem po stronie
+    serwera - w pamięci jest naraz tylko jedna paczka, bez limitu liczby wierszy.
+    Otwiera własną sesję, bo StreamingResponse wysyła dane już po zamknięciu
+    sesji z zależności endpointu.
+    """
+    query = _vessel_readings_columns_query(
+        vessel_id, start_time, end_time, sensor_ids
+    ).execution_options(yield_per=chunk_size)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for chunk in result.partitions():
+            yield chunk
+
+
+async def get_sensor_readings_grouped_for_vessel_async(
+    db: AsyncSession,
+    vessel_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    max_points: Optional[int] = None,
+    after_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+) -> List[dict]:
+    """
+    Odczyty wszystkich sensorów statku w oknie czasu, pogrupowane po sensorze.
+    Jedno zapytanie: sensors LEFT JOIN sensor_readings po indeksie
+    (sensor_id, timestamp), więc sensory bez odczytów też są w wyniku.
+    """
+    query = (
+        select(
+            Sensor.id.label("sensor_id"),
+            Sensor.name,
+            Sensor.measurement_unit,
+            SensorReading.id,
+            SensorReading.value,
+            SensorReading.status,
+            SensorReading.timestamp,
+        )
+        .outerjoin(
+            SensorReading,
+            and_(
+                SensorReading.sensor_id == Sensor.id,
+                SensorReading.timestamp >= start_time,
+                SensorReading.timestamp <= end_time,
+                *_new_readings_conditions(after_id, since),
+            ),
+        )
+        .where(Sensor.vessel_id == vessel_id)
+        .order_by(Sensor.id, SensorReading.timestamp.asc(), SensorReading.id)
+    )
+    rows = (await db.execute(query)).all()
+    return await run_in_threadpool(_group_readings_by_sensor, rows, max_points)
+
+
+def _group_readings_by_sensor(rows, max_points: Optional[int]) -> List[dict]:
+    groups = []
+    for _, sensor_rows in groupby(rows, key=lambda row: row.sensor_id):
+        sensor_rows = list(sensor_rows)
+        first = sensor_rows[0]
+        readings = [row for row in sensor_rows if row.id is not None]
+        if max_points is not None:
+            readings = downsample_readings(readings, max_points)
+        groups.append(
+            {
+                "sensor_id": first.sensor_id,
+                "sensor_name": first.name,
+                "measurement_unit": first.measurement_unit,
+                "readings": [
+                    {
+                        "id": row.id,
+                        "value": row.value,
+                        "status": row.status,
+                        "timestamp": row.timestamp,
+                    }
+                    for row in readings
+                ],
+            }
+        )
+    return groups
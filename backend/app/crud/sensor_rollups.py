@@ -0,0 +1,340 @@
+"""
+Agregaty (rollupy) odczytów czujników w oknach 1 minuty, 1 godziny i 1 dnia.
+
+Rollupy są aktualizowane przyrostowo w tej samej transakcji co zapis odczytów
+(apply_rollups / apply_rollups_async): paczka jest najpierw agregowana w Pythonie,
+a potem scalana z istniejącymi wierszami przez INSERT ... ON CONFLICT DO UPDATE.
+Odczyty spóźnione trafiają w ten sposób do właściwego, starszego okna.
+rebuild_rollups_async przelicza okna od nowa z danych źródłowych (1m z odczytów,
+1h z 1m, 1d z 1h) - używa go zadanie naprawcze (app.core.rollup_repair).
+
+Granice okien liczone są w UTC.
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, select, text
+from sqlalchemy.dialects.postgresql import array, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.models import SensorReading, SensorReadingRollup
+
+RESOLUTIONS = {
+    "1m": timedelta(minutes=1),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+# Od najgrubszej - wybierana jest pierwsza, która daje wystarczająco dużo punktów
+_RESOLUTIONS_COARSE_FIRST = ("1d", "1h", "1m")
+_DATE_TRUNC_UNITS = {"1m": "minute", "1h": "hour", "1d": "day"}
+# Źródło przeliczenia danej rozdzielczości: None = surowe odczyty
+_REBUILD_SOURCES = {"1m": None, "1h": "1m", "1d": "1h"}
+
+# Statusy od najmniej do najbardziej istotnego
+STATUS_SEVERITY = ("normal", "warning", "critical", "error")
+_STATUS_RANK = {status: rank for rank, status in enumerate(STATUS_SEVERITY)}
+_STATUS_ARRAY_SQL = "ARRAY[" + ", ".join(f"'{s}'" for s in STATUS_SEVERITY) + "]"
+
+RAW_SERIES_LIMIT = 10000
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    # Znaczniki bez strefy (domyślne datetime.utcnow ze schematu) traktujemy jako UTC
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+def truncate_timestamp(timestamp: datetime, resolution: str) -> datetime:
+    timestamp = as_utc(timestamp)
+    if resolution == "1m":
+        return timestamp.replace(second=0, microsecond=0)
+    if resolution == "1h":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if resolution == "1d":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown rollup resolution '{resolution}'.")
+
+
+def aggregate_readings(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Agreguje wiersze odczytów (sensor_id, value, status, timestamp) do okien
+    wszystkich rozdzielczości. Wynik jest posortowany po kluczu, żeby równoległe
+    transakcje blokowały wiersze rollupów w tej samej kolejności.
+    """
+    buckets: Dict[Tuple[int, str, datetime], Dict[str, Any]] = {}
+    for row in rows:
+        timestamp = as_utc(row["timestamp"])
+        value = Decimal(row["value"])
+        status = row.get("status") or "normal"
+        for resolution in RESOLUTIONS:
+            key = (row["sensor_id"], resolution, truncate_timestamp(timestamp, resolution))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = {
+                    "sensor_id": key[0],
+                    "resolution": resolution,
+                    "bucket_start": key[2],
+                    "min_value": value,
+                    "max_value": value,
+                    "sum_value": value,
+                    "reading_count": 1,
+                    "first_value": value,
+                    "first_timestamp": timestamp,
+                    "last_value": value,
+                    "last_timestamp": timestamp,
+                    "worst_status": status,
+                }
+                continue
+            bucket["min_value"] = min(bucket["min_value"], value)
+            bucket["max_value"] = max(bucket["max_value"], value)
+            bucket["sum_value"] += value
+            bucket["reading_count"] += 1
+            if timestamp < bucket["first_timestamp"]:
+                bucket["first_value"] = value
+                bucket["first_timestamp"] = timestamp
+            if timestamp >= bucket["last_timestamp"]:
+                bucket["last_value"] = value
+                bucket["last_timestamp"] = timestamp
+            if _STATUS_RANK.get(status, 0) > _STATUS_RANK.get(bucket["worst_status"], 0):
+                bucket["worst_status"] = status
+    return [buckets[key] for key in sorted(buckets)]
+
+
+def _status_rank(column):
+    return func.array_position(array(STATUS_SEVERITY), column)
+
+
+def _upsert_statement():
+    """INSERT ... ON CONFLICT scalający nowe agregaty z istniejącym oknem."""
+    stmt = pg_insert(SensorReadingRollup)
+    current = SensorReadingRollup.__table__.c
+    new = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=["sensor_id", "resolution", "bucket_start"],
+        set_={
+            "min_value": func.least(current.min_value, new.min_value),
+            "max_value": func.greatest(current.max_value, new.max_value),
+            "sum_value": current.sum_value + new.sum_value,
+            "reading_count": current.reading_count + new.reading_count,
+            "first_value": case(
+                (new.first_timestamp < current.first_timestamp, new.first_value),
+                else_=current.first_value,
+            ),
+            "first_timestamp": func.least(current.first_timestamp, new.first_timestamp),
+            "last_value": case(
+                (new.last_timestamp >= current.last_timestamp, new.last_value),
+                else_=current.last_value,
+            ),
+            "last_timestamp": func.greatest(current.last_timestamp, new.last_timestamp),
+            "worst_status": case(
+                (
+                    _status_rank(new.worst_status) > _status_rank(current.worst_status),
+                    new.worst_status,
+                ),
+                else_=current.worst_status,
+            ),
+            "updated_at": func.now(),
+        },
+    )
+
+
+def apply_rollups(db: Session, rows: Iterable[Dict[str, Any]]) -> None:
+    """Aktualizuje rollupy w bieżącej transakcji (commit wykonuje wywołujący)."""
+    aggregated = aggregate_readings(rows)
+    if aggregated:
+        db.execute(_upsert_statement(), aggregated)
+
+
+async def apply_rollups_async(db: AsyncSession, rows: Iterable[Dict[str, Any]]) -> None:
+    aggregated = aggregate_readings(rows)
+    if aggregated:
+        await db.execute(_upsert_statement(), aggregated)
+
+
+def _rebuild_statement(resolution: str, sensor_filter: bool):
+    unit = _DATE_TRUNC_UNITS[resolution]
+    source = _REBUILD_SOURCES[resolution]
+    bucket_expr = f"date_trunc('{unit}', s.ts AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'"
+    if source is None:
+        source_sql = (
+            "SELECT sensor_id, value AS min_v, value AS max_v, value AS sum_v, "
+            "1 AS cnt, value AS first_v, timestamp AS first_ts, value AS last_v, "
+            "timestamp AS last_ts, coalesce(status, 'normal') AS status, "
+            "timestamp AS ts FROM sensor_readings "
+            "WHERE timestamp >= :start AND timestamp < :end"
+        )
+    else:
+        source_sql = (
+            "SELECT sensor_id, min_value AS min_v, max_value AS max_v, "
+            "sum_value AS sum_v, reading_count AS cnt, first_value AS first_v, "
+            "first_timestamp AS first_ts, last_value AS last_v, "
+            "last_timestamp AS last_ts, worst_status AS status, "
+            "bucket_start AS ts FROM sensor_reading_rollups "
+            f"WHERE resolution = '{source}' "
+            "AND bucket_start >= :start AND bucket_start < :end"
+        )
+    if sensor_filter:
+        source_sql += " AND sensor_id = :sensor_id"
+
+    return text(
+        f"""
+        INSERT INTO sensor_reading_rollups (
+            sensor_id, resolution, bucket_start, min_value, max_value, sum_value,
+            reading_count, first_value, first_timestamp, last_value,
+            last_timestamp, worst_status, updated_at
+        )
+        SELECT
+            s.sensor_id, '{resolution}', {bucket_expr},
+            min(s.min_v), max(s.max_v), sum(s.sum_v), sum(s.cnt),
+            (array_agg(s.first_v ORDER BY s.first_ts))[1], min(s.first_ts),
+            (array_agg(s.last_v ORDER BY s.last_ts DESC))[1], max(s.last_ts),
+            ({_STATUS_ARRAY_SQL})[max(array_position({_STATUS_ARRAY_SQL}, s.status))],
+            now()
+        FROM ({source_sql}) s
+        GROUP BY s.sensor_id, {bucket_expr}
+        ON CONFLICT (sensor_id, resolution, bucket_start) DO UPDATE SET
+            min_value = EXCLUDED.min_value,
+            max_value = EXCLUDED.max_value,
+            sum_value = EXCLUDED.sum_value,
+            reading_count = EXCLUDED.reading_count,
+            first_value = EXCLUDED.first_value,
+            first_timestamp = EXCLUDED.first_timestamp,
+            last_value = EXCLUDED.last_value,
+            last_timestamp = EXCLUDED.last_timestamp,
+            worst_status = EXCLUDED.worst_status,
+            updated_at = EXCLUDED.updated_at
+        """
+    )
+
+
+async def rebuild_rollups_async(
+    db: AsyncSession,
+    start_time: datetime,
+    end_time: datetime,
+    sensor_id: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Przelicza od nowa okna obejmujące zakres [start_time, end_time) - naprawia
+    rollupy po odczytach pominiętych przez zapis przyrostowy (np. zgubionych
+    przez bufor) lub usuniętych. Zwraca liczbę przeliczonych okien na
+    rozdzielczość; commit wykonuje wywołujący.
+    """
+    rebuilt = {}
+    for resolution in ("1m", "1h", "1d"):  # Kolejność ważna - 1h liczone z 1m, 1d z 1h
+        window_start = truncate_timestamp(start_time, resolution)
+        window_end = truncate_timestamp(end_time, resolution) + RESOLUTIONS[resolution]
+        params = {"start": window_start, "end": window_end}
+        delete_sql = (
+            "DELETE FROM sensor_reading_rollups WHERE resolution = :resolution "
+            "AND bucket_start >= :start AND bucket_start < :end"
+        )
+        if sensor_id is not None:
+            params["sensor_id"] = sensor_id
+            delete_sql += " AND sensor_id = :sensor_id"
+
+        await db.execute(text(delete_sql), {**params, "resolution": resolution})
+        result = await db.execute(
+            _rebuild_statement(resolution, sensor_id is not None), params
+        )
+        rebuilt[resolution] = result.rowcount
+    return rebuilt
+
+
+def choose_rollup_resolution(
+    start_time: datetime, end_time: datetime, points: int
+) -> Optional[str]:
+    """
+    Najgrubsza rozdzielczość, która na zakresie daje co najmniej `points` okien.
+    None oznacza, że nawet okna minutowe są za rzadkie - zwracamy surowe odczyty.
+    """
+    span = as_utc(end_time) - as_utc(start_time)
+    for resolution in _RESOLUTIONS_COARSE_FIRST:
+        if span / RESOLUTIONS[resolution] >= points:
+            return resolution
+    return None
+
+
+def _rollup_point(rollup: SensorReadingRollup) -> Dict[str, Any]:
+    return {
+        "bucket_start": rollup.bucket_start,
+        "min_value": rollup.min_value,
+        "max_value": rollup.max_value,
+        "avg_value": rollup.sum_value / rollup.reading_count,
+        "reading_count": rollup.reading_count,
+        "first_value": rollup.first_value,
+        "last_value": rollup.last_value,
+        "worst_status": rollup.worst_status,
+    }
+
+
+def _raw_point(reading: SensorReading) -> Dict[str, Any]:
+    return {
+        "bucket_start": reading.timestamp,
+        "min_value": reading.value,
+        "max_value": reading.value,
+        "avg_value": reading.value,
+        "reading_count": 1,
+        "first_value": reading.value,
+        "last_value": reading.value,
+        "worst_status": reading.status or "normal",
+    }
+
+
+async def get_sensor_reading_rollups_async(
+    db: AsyncSession,
+    sensor_id: int,
+    resolution: str,
+    start_time: datetime,
+    end_time: datetime,
+) -> List[SensorReadingRollup]:
+    query = (
+        select(SensorReadingRollup)
+        .where(
+            SensorReadingRollup.sensor_id == sensor_id,
+            SensorReadingRollup.resolution == resolution,
+            SensorReadingRollup.bucket_start >= truncate_timestamp(start_time, resolution),
+            SensorReadingRollup.bucket_start <= end_time,
+        )
+        .order_by(SensorReadingRollup.bucket_start.asc())
+    )
+    return (await db.scalars(query)).all()
+
+
+async def get_sensor_reading_series_async(
+    db: AsyncSession,
+    sensor_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    points: int,
+    resolution: Optional[str] = None,
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Zwraca (rozdzielczość, punkty) dla wykresu. Bez jawnej rozdzielczości
+    wybierana jest najgrubsza, która daje co najmniej `points` punktów; dla
+    krótkich zakresów ("raw") punktami są surowe odczyty.
+    """
+    if resolution is None:
+        resolution = choose_rollup_resolution(start_time, end_time, points) or "raw"
+
+    if resolution == "raw":
+        query = (
+            select(SensorReading)
+            .where(
+                SensorReading.sensor_id == sensor_id,
+                SensorReading.timestamp >= start_time,
+                SensorReading.timestamp <= end_time,
+            )
+            .order_by(SensorReading.timestamp.asc())
+            .limit(RAW_SERIES_LIMIT)
+        )
+        readings = (await db.scalars(query)).all()
+        return resolution, [_raw_point(reading) for reading in readings]
+
+    rollups = await get_sensor_reading_rollups_async(
+        db, sensor_id, resolution, start_time, end_time
+    )
+    return resolution, [_rollup_point(rollup) for rollup in rollups]
@@ -3,6 +3,7 @@ from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 
 from app.models.models import Sensor, Vessel, SensorType
+from app.core.sensor_cache import sensor_cache
 from app.schemas.sensor import SensorCreate, SensorUpdate
 
 
@@ -54,6 +55,7 @@ def create_sensor_for_vessel(
         db.add(db_sensor)
         db.commit()
         db.refresh(db_sensor)
+        sensor_cache.put(db_sensor)
         return db_sensor
     except IntegrityError as e:
         db.rollback()
@@ -99,6 +101,7 @@ def update_sensor(
     try:
         db.commit()
         db.refresh(db_sensor)
+        sensor_cache.put(db_sensor)
         return db_sensor
     except IntegrityError as e:
         db.rollback()
@@ -127,6 +130,7 @@ def delete_sensor(db: Session, sensor_id: int, vessel_id: int) -> Optional[Senso
         # Usunięcie sensora spowoduje ustawienie sensor_id na NULL w powiązanych alertach.
         db.delete(db_sensor)
         db.commit()
+        sensor_cache.invalidate(sensor_id)
         return db_sensor
     except IntegrityError as e:  # Np. jeśli jakaś inna tabela miałaby RESTRICT
         db.rollback()
@@ -0,0 +1,122 @@
+"""
+Kafle wektorowe (Mapbox Vector Tile) liczone w PostGIS.
+
+Każda warstwa to jedno zapytanie: obiekty wybierane są operatorem && po
+indeksie GiST (prostokąt kafla z marginesem, w EPSG:4326), geometria
+przycinana i kwantowana do siatki kafla przez ST_AsMVTGeom, a całość kodowana
+do protobuf przez ST_AsMVT. Klient dostaje gotowe bajty - bez WKT i bez
+parsowania współrzędnych po stronie przeglądarki.
+
+Warstwy:
+- vessels - ostatnie pozycje aktywnych statków (vessel_latest_position),
+- tracks - ślady z ostatnich TILE_TRACK_HOURS godzin (locations); do kafla
+  trafiają statki, które mają w nim (z marginesem) choć jeden punkt,
+- routes - planowane trasy (route_points o statusie planned) jako linie;
+  podobnie jak przy śladach do kafla trafiają statki, które mają w nim
+  (z marginesem) choć jeden punkt trasy.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+TILE_EXTENT = 4096  # Rozdzielczość siatki kafla (standard MVT)
+TILE_BUFFER = 64  # Margines w jednostkach siatki - symbole na krawędzi nie są ucinane
+TILE_TRACK_HOURS = int(os.getenv("TILE_TRACK_HOURS", "24"))
+# Poniżej tego zoomu kafel śladów obejmowałby zbyt wiele punktów - jest pusty
+TILE_TRACKS_MIN_ZOOM = int(os.getenv("TILE_TRACKS_MIN_ZOOM", "5"))
+
+_BOUNDS_CTE = f"""
+    bounds AS (
+        SELECT
+            env AS geom,
+            ST_Transform(
+                ST_Expand(env, (ST_XMax(env) - ST_XMin(env)) * {TILE_BUFFER} / {TILE_EXTENT}),
+                4326
+            ) AS filter_geom
+        FROM (SELECT ST_TileEnvelope(:z, :x, :y) AS env) AS tile
+    )
+"""
+
+
+def _mvt_geom(column: str) -> str:
+    # Przycięcie do prostokąta kafla z marginesem jeszcze w EPSG:4326 - całe
+    # linie śladów i tras mogą mieć wierzchołki przy biegunach, na których
+    # ST_Transform do EPSG:3857 zawodzi; ST_AsMVTGeom i tak ucina je na marginesie.
+    return (
+        f"ST_AsMVTGeom(ST_Transform(ST_ClipByBox2D({column}, b.filter_geom), 3857), "
+        f"b.geom, {TILE_EXTENT}, {TILE_BUFFER}, true)"
+    )
+
+
+_LAYER_QUERIES = {
+    "vessels": f"""
+        WITH {_BOUNDS_CTE}
+        SELECT ST_AsMVT(mvt.*, 'vessels', {TILE_EXTENT}, 'geom') FROM (
+            SELECT
+                v.id AS vessel_id,
+                v.name,
+                p.heading::float8 AS heading,
+                extract(epoch FROM p.timestamp)::bigint AS timestamp,
+                {_mvt_geom("p.position")} AS geom
+            FROM vessel_latest_position p
+            JOIN vessels v ON v.id = p.vessel_id
+            CROSS JOIN bounds b
+            WHERE v.status = 'active' AND p.position && b.filter_geom
+        ) AS mvt
+    """,
+    "tracks": f"""
+        WITH {_BOUNDS_CTE}
+        SELECT ST_AsMVT(mvt.*, 'tracks', {TILE_EXTENT}, 'geom') FROM (
+            SELECT
+                l.vessel_id,
+                {_mvt_geom("ST_MakeLine(l.position ORDER BY l.timestamp)")} AS geom
+            FROM locations l
+            CROSS JOIN bounds b
+            WHERE l.timestamp >= :since
+              AND l.vessel_id IN (
+                  SELECT c.vessel_id
+                  FROM locations c
+                  JOIN vessels v ON v.id = c.vessel_id
+                  WHERE v.status = 'active'
+                    AND c.timestamp >= :since
+                    AND c.position && b.filter_geom
+              )
+            GROUP BY l.vessel_id, b.geom, b.filter_geom
+        ) AS mvt
+    """,
+    "routes": f"""
+        WITH {_BOUNDS_CTE}
+        SELECT ST_AsMVT(mvt.*, 'routes', {TILE_EXTENT}, 'geom') FROM (
+            SELECT
+                rp.vessel_id,
+                count(*) AS point_count,
+                {_mvt_geom("ST_MakeLine(rp.planned_position ORDER BY rp.sequence_number)")} AS geom
+            FROM route_points rp
+            CROSS JOIN bounds b
+            WHERE rp.status = 'planned'
+              AND rp.vessel_id IN (
+                  SELECT c.vessel_id
+                  FROM route_points c
+                  JOIN vessels v ON v.id = c.vessel_id
+                  WHERE v.status = 'active'
+                    AND c.status = 'planned'
+                    AND c.planned_position && b.filter_geom
+              )
+            GROUP BY rp.vessel_id, b.geom, b.filter_geom
+        ) AS mvt
+    """,
+}
+
+
+async def get_tile(db: AsyncSession, layer: str, z: int, x: int, y: int) -> bytes:
+    """Zakodowany kafel MVT warstwy; pusty kafel to pusta odpowiedź."""
+    params = {"z": z, "x": x, "y": y}
+    if layer == "tracks":
+        if z < TILE_TRACKS_MIN_ZOOM:
+            return b""
+        params["since"] = datetime.now(timezone.utc) - timedelta(hours=TILE_TRACK_HOURS)
+    tile = await db.scalar(text(_LAYER_QUERIES[layer]), params)
+    return bytes(tile) if tile else b""
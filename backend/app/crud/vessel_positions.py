@@ -0,0 +1,129 @@
+"""
+Ostatnia znana pozycja łodzi (tabela vessel_latest_position).
+
+Tabela jest utrzymywana w tej samej transakcji co zmiany w locations:
+- zapis (pojedynczy, bufor write-behind) - paczka redukowana w Pythonie do
+  najnowszego wpisu na łódź i scalana przez INSERT ... ON CONFLICT DO UPDATE
+  tylko wtedy, gdy wpis jest nowszy od zapamiętanego (wpisy spóźnione nie
+  cofają pozycji),
+- zmiana i usunięcie wpisu - pozycja łodzi wyliczana od nowa z locations.
+
+Pytanie "gdzie są teraz wszystkie łodzie" to jeden odczyt co najwyżej kilku
+tysięcy wierszy, niezależnie od długości historii lokalizacji.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.geometry import point_wkt
+from app.crud.sensor_rollups import as_utc
+from app.models.models import Location, Vessel, VesselLatestPosition
+
+_POSITION_FIELDS = (
+    "vessel_id",
+    "location_id",
+    "timestamp",
+    "position",
+    "heading",
+    "accuracy_meters",
+    "source",
+)
+
+
+def location_row(db_location: Location) -> Dict[str, Any]:
+    """Słownik pól pozycji z zapisanego (po flush) obiektu Location."""
+    return {field: getattr(db_location, field) for field in _POSITION_FIELDS}
+
+
+def aggregate_latest_positions(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Najnowszy wpis na łódź; wynik posortowany po vessel_id (kolejność blokad)."""
+    latest: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        current = latest.get(row["vessel_id"])
+        if current is None or (as_utc(row["timestamp"]), row["location_id"]) >= (
+            as_utc(current["timestamp"]),
+            current["location_id"],
+        ):
+            latest[row["vessel_id"]] = {field: row.get(field) for field in _POSITION_FIELDS}
+    return [latest[vessel_id] for vessel_id in sorted(latest)]
+
+
+def _upsert_statement():
+    stmt = pg_insert(VesselLatestPosition)
+    current = VesselLatestPosition.__table__.c
+    new = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=["vessel_id"],
+        set_={
+            **{field: new[field] for field in _POSITION_FIELDS if field != "vessel_id"},
+            "updated_at": func.now(),
+        },
+        # Wpis spóźniony (starszy od zapamiętanego) nie zmienia pozycji
+        where=tuple_(new.timestamp, new.location_id)
+        >= tuple_(current.timestamp, current.location_id),
+    )
+
+
+def apply_latest_positions(db: Session, rows: Iterable[Dict[str, Any]]) -> None:
+    """Aktualizuje pozycje w bieżącej transakcji (commit wykonuje wywołujący)."""
+    positions = aggregate_latest_positions(rows)
+    if positions:
+        db.execute(_upsert_statement(), positions)
+
+
+async def apply_latest_positions_async(
+    db: AsyncSession, rows: Iterable[Dict[str, Any]]
+) -> None:
+    positions = aggregate_latest_positions(rows)
+    if positions:
+        await db.execute(_upsert_statement(), positions)
+
+
+def refresh_latest_position(db: Session, vessel_id: int) -> None:
+    """Wylicza pozycję łodzi od nowa z locations (po zmianie lub usunięciu wpisu)."""
+    latest = (
+        select(*(getattr(Location, field) for field in _POSITION_FIELDS))
+        .where(Location.vessel_id == vessel_id)
+        .order_by(Location.timestamp.desc(), Location.location_id.desc())
+        .limit(1)
+    )
+    db.execute(
+        delete(VesselLatestPosition).where(VesselLatestPosition.vessel_id == vessel_id)
+    )
+    db.execute(
+        insert(VesselLatestPosition).from_select(list(_POSITION_FIELDS), latest)
+    )
+
+
+async def get_latest_position_async(
+    db: AsyncSession, vessel_id: int
+) -> Optional[VesselLatestPosition]:
+    return await db.get(VesselLatestPosition, vessel_id)
+
+
+async def get_latest_positions_async(
+    db: AsyncSession,
+    fleet_id: Optional[int] = None,
+    active_only: bool = False,
+) -> List:
+    """Ostatnie pozycje łodzi (z nazwą i pozycją jako WKT liczonym w bazie)."""
+    stmt = (
+        select(
+            Vessel.id.label("vessel_id"),
+            Vessel.name,
+            point_wkt(VesselLatestPosition.position).label("latest_position_wkt"),
+            VesselLatestPosition.heading.label("latest_heading"),
+            VesselLatestPosition.timestamp.label("latest_timestamp"),
+        )
+        .join(VesselLatestPosition, VesselLatestPosition.vessel_id == Vessel.id)
+        .order_by(Vessel.id)
+    )
+    if fleet_id is not None:
+        stmt = stmt.where(Vessel.fleet_id == fleet_id)
+    if active_only:
+        stmt = stmt.where(Vessel.status == "active")
+    return (await db.execute(stmt)).all()
@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select
 from typing import List, Optional, Dict
 from app.models.models import (
     Vessel,
@@ -9,6 +11,8 @@ from app.models.models import (
     SensorClass,
     vessel_type_required_sensor_types,
 )
+from app.core.sensor_cache import sensor_cache
+from app.core.tile_cache import TILE_LAYERS, invalidate_tiles_on_commit
 from app.schemas.vessel import (
     VesselCreate,
     VesselUpdate,
@@ -21,6 +25,10 @@ def get_vessel(db: Session, vessel_id: int) -> Optional[Vessel]:
     return db.query(Vessel).filter(Vessel.id == vessel_id).first()
 
 
+async def vessel_exists_async(db: AsyncSession, vessel_id: int) -> bool:
+    return (await db.scalar(select(Vessel.id).where(Vessel.id == vessel_id))) is not None
+
+
 def get_vessels(db: Session, skip: int = 0, limit: int = 100) -> List[Vessel]:
     return db.query(Vessel).order_by(Vessel.name).offset(skip).limit(limit).all()
 
@@ -147,6 +155,8 @@ def update_vessel(
         setattr(db_vessel, key, value)
 
     try:
+        # Nazwa i status statku są w warstwach kafli
+        invalidate_tiles_on_commit(db, *TILE_LAYERS)
         db.commit()
         db.refresh(db_vessel)
         return db_vessel
@@ -177,7 +187,9 @@ def delete_vessel(db: Session, vessel_id: int) -> Optional[Vessel]:
         # Jeśli są RESTRICT, usuwanie może się nie udać.
         try:
             db.delete(db_vessel)
+            invalidate_tiles_on_commit(db, *TILE_LAYERS)
             db.commit()
+            sensor_cache.invalidate_vessel(vessel_id)  # Sensory usunięte kaskadowo
             return db_vessel
         except IntegrityError as e:
             db.rollback()
@@ -1,6 +1,16 @@
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from app.models.models import Base
-from app.core.database import engine
+from app.core.database import engine, async_engine, AsyncSessionLocal
+from app.core import (
+    collision_risk,
+    geofence,
+    ingest_buffer,
+    live_readings,
+    partitions,
+    rollup_repair,
+)
+from app.core.sensor_cache import sensor_cache
 
 # Import routerów
 from app.routes import (
@@ -21,6 +31,10 @@ from app.routes import (
     vessel_parameter,
     weather,
     public,
+    tiles,
+    geofences,
+    collision_risks,
+    metrics,
 )
 
 Base.metadata.create_all(bind=engine)
@@ -38,12 +52,44 @@ app.include_router(sensor_classes.router)
 app.include_router(sensor_types.router)
 app.include_router(sensors.router)
 app.include_router(sensor_readings.router)
+app.include_router(sensor_readings.batch_router)
 app.include_router(ais_data.router)
 app.include_router(locations.router)
+app.include_router(locations.area_router)
 app.include_router(route_points.router)
 app.include_router(alert.router)
 app.include_router(weather.router)
 app.include_router(public.router)
+app.include_router(tiles.router)
+app.include_router(geofences.router)
+app.include_router(collision_risks.router)
+app.include_router(metrics.router)
+
+
+@app.on_event("startup")
+async def startup_event():
+    # Partycje na bieżący i kolejne miesiące (idempotentne)
+    await run_in_threadpool(partitions.run_maintenance, engine)
+    async with AsyncSessionLocal() as db:
+        await sensor_cache.warm_async(db)
+        await geofence.geofence_index.warm_async(db)
+    live_readings.start_live_readings()
+    if ingest_buffer.INGEST_BUFFER_ENABLED:
+        ingest_buffer.start_ingest_buffers()
+    rollup_repair.start_rollup_repair()
+    geofence.start_geofence_reload()
+    collision_risk.start_collision_risk()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await collision_risk.stop_collision_risk()
+    await geofence.stop_geofence_reload()
+    await rollup_repair.stop_rollup_repair()
+    if ingest_buffer.INGEST_BUFFER_ENABLED:
+        await ingest_buffer.stop_ingest_buffers()
+    await live_readings.stop_live_readings()
+    await async_engine.dispose()
 
 
 @app.get("/")
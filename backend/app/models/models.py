@@ -14,6 +14,7 @@ from sqlalchemy import (
     Index,
     Date,
     JSON,
+    DDL,
     event,
     or_,
     and_,
@@ -344,9 +345,11 @@ class Sensor(Base):
 
 
 class SensorReading(Base):
+    """Odczyty czujników (tabela partycjonowana miesięcznie po timestamp)"""
+
     __tablename__ = "sensor_readings"
 
-    id = Column(BigInteger, primary_key=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     sensor_id = Column(
         Integer, ForeignKey("sensors.id", ondelete="CASCADE"), nullable=False
     )
@@ -356,13 +359,63 @@ class SensorReading(Base):
         CheckConstraint("status IN ('normal', 'warning', 'critical', 'error')"),
         default="normal",
     )
-    timestamp = Column(DateTime(timezone=True), default=func.now())
+    # Klucz partycjonowania - musi być częścią klucza głównego
+    timestamp = Column(DateTime(timezone=True), primary_key=True, default=func.now())
 
     sensor = relationship("Sensor", back_populates="readings")
 
     __table_args__ = (
         Index("idx_sensor_readings_timestamp", timestamp),
         Index("idx_sensor_readings_sensor_timestamp", sensor_id, timestamp),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+
+class SensorReadingRollup(Base):
+    """Agregaty odczytów czujnika w oknach 1 minuty, 1 godziny i 1 dnia"""
+
+    __tablename__ = "sensor_reading_rollups"
+
+    sensor_id = Column(
+        Integer, ForeignKey("sensors.id", ondelete="CASCADE"), primary_key=True
+    )
+    resolution = Column(
+        String(2),
+        CheckConstraint("resolution IN ('1m', '1h', '1d')"),
+        primary_key=True,
+    )
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    min_value = Column(Numeric, nullable=False)
+    max_value = Column(Numeric, nullable=False)
+    sum_value = Column(Numeric, nullable=False)  # Średnia = sum_value / reading_count
+    reading_count = Column(Integer, nullable=False)
+    first_value = Column(Numeric, nullable=False)
+    first_timestamp = Column(DateTime(timezone=True), nullable=False)
+    last_value = Column(Numeric, nullable=False)
+    last_timestamp = Column(DateTime(timezone=True), nullable=False)
+    worst_status = Column(String(20), nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
+
+
+class SensorLatest(Base):
+    """Bieżący stan czujnika: ostatni odczyt i liczba odczytów (utrzymywane przy zapisie)"""
+
+    __tablename__ = "sensor_latest"
+
+    sensor_id = Column(
+        Integer, ForeignKey("sensors.id", ondelete="CASCADE"), primary_key=True
+    )
+    last_value = Column(Numeric, nullable=False)
+    last_status = Column(String(20), nullable=False)
+    last_timestamp = Column(DateTime(timezone=True), nullable=False)
+    reading_count = Column(BigInteger, nullable=False)
+    # Największe id zapisanego odczytu - wraz z reading_count znacznik zmian do ETagów
+    last_reading_id = Column(BigInteger)
+    updated_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # "Które sensory milczą od N minut" - zakres po last_timestamp
+        Index("idx_sensor_latest_last_timestamp", last_timestamp),
     )
 
 
@@ -371,11 +424,12 @@ class AisData(Base):
 
     __tablename__ = "ais_data"
 
-    ais_data_id = Column(BigInteger, primary_key=True)
+    ais_data_id = Column(BigInteger, primary_key=True, autoincrement=True)
     vessel_id = Column(
         Integer, ForeignKey("vessels.id", ondelete="CASCADE"), nullable=False
     )
-    timestamp = Column(DateTime(timezone=True), default=func.now())
+    # Klucz partycjonowania - musi być częścią klucza głównego
+    timestamp = Column(DateTime(timezone=True), primary_key=True, default=func.now())
     position = Column(Geometry("POINT", srid=4326))  # Standard WGS84
     course_over_ground = Column(Numeric(5, 2))  # Kurs nad ziemią w stopniach
     speed_over_ground = Column(Numeric(5, 2))  # Prędkość nad ziemią w węzłach
@@ -389,6 +443,7 @@ class AisData(Base):
         Index("idx_ais_data_vessel_timestamp", vessel_id, timestamp),
         Index("idx_ais_data_timestamp", timestamp),
         Index("idx_ais_data_position", position, postgresql_using="gist"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
     )
 
 
@@ -397,11 +452,12 @@ class Location(Base):
 
     __tablename__ = "locations"
 
-    location_id = Column(BigInteger, primary_key=True)
+    location_id = Column(BigInteger, primary_key=True, autoincrement=True)
     vessel_id = Column(
         Integer, ForeignKey("vessels.id", ondelete="CASCADE"), nullable=False
     )
-    timestamp = Column(DateTime(timezone=True), default=func.now())
+    # Klucz partycjonowania - musi być częścią klucza głównego
+    timestamp = Column(DateTime(timezone=True), primary_key=True, default=func.now())
     position = Column(Geometry("POINT", srid=4326), nullable=False)  # Standard WGS84
     heading = Column(Numeric(5, 2), nullable=False)
     accuracy_meters = Column(Numeric(7, 2))
@@ -412,15 +468,51 @@ class Location(Base):
     )
 
     vessel = relationship("Vessel", backref="locations")
-    weather_data = relationship("WeatherData", back_populates="location_entry")
+    # Bez klucza obcego w bazie (tabela partycjonowana), złączenie definiujemy jawnie
+    weather_data = relationship(
+        "WeatherData",
+        primaryjoin="Location.location_id == foreign(WeatherData.location_id)",
+        back_populates="location_entry",
+    )
 
     __table_args__ = (
         Index("idx_locations_timestamp", timestamp),
         Index("idx_locations_vessel_timestamp", vessel_id, timestamp),
         Index("idx_locations_position", position, postgresql_using="gist"),
+        # Przestrzeń i czas naraz (wymaga btree_gist) - zapytania "kto był w obszarze"
+        Index(
+            "idx_locations_position_timestamp",
+            position,
+            timestamp,
+            postgresql_using="gist",
+        ),
         CheckConstraint(
             "heading >= 0 AND heading < 360", name="chk_location_heading_range"
         ),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+
+class VesselLatestPosition(Base):
+    """Ostatnia znana pozycja łodzi (kopia najnowszego wpisu z locations)"""
+
+    __tablename__ = "vessel_latest_position"
+
+    vessel_id = Column(
+        Integer, ForeignKey("vessels.id", ondelete="CASCADE"), primary_key=True
+    )
+    location_id = Column(BigInteger, nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    position = Column(Geometry("POINT", srid=4326), nullable=False)
+    heading = Column(Numeric(5, 2), nullable=False)
+    accuracy_meters = Column(Numeric(7, 2))
+    source = Column(String(50))
+    updated_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index(
+            "idx_vessel_latest_position_position", position, postgresql_using="gist"
+        ),
     )
 
 
@@ -464,7 +556,9 @@ class WeatherData(Base):
     __tablename__ = "weather_data"
 
     weather_data_id = Column(BigInteger, primary_key=True)
-    location_id = Column(BigInteger, ForeignKey("locations.location_id"))
+    # Odwołanie do locations.location_id bez klucza obcego - klucz główny
+    # partycjonowanej tabeli locations to (location_id, timestamp)
+    location_id = Column(BigInteger)
     location = Column(Geometry("POINT", srid=4326))  # Standard WGS84
     timestamp = Column(DateTime(timezone=True), default=func.now())
     temperature_celsius = Column(Numeric(4, 1))
@@ -479,7 +573,11 @@ class WeatherData(Base):
     wave_direction_degrees = Column(Numeric(5, 1))
     data_source = Column(String(100))
 
-    location_entry = relationship("Location", back_populates="weather_data")
+    location_entry = relationship(
+        "Location",
+        primaryjoin="foreign(WeatherData.location_id) == Location.location_id",
+        back_populates="weather_data",
+    )
 
     __table_args__ = (
         Index("idx_weather_data_timestamp", timestamp),
@@ -604,6 +702,79 @@ class Alert(Base):
     )
 
 
+class GeofenceZone(Base):
+    """Strefy geofencingu (porty, obszary zastrzeżone) - alerty przy wejściu i wyjściu łodzi"""
+
+    __tablename__ = "geofence_zones"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    zone_type = Column(
+        String(20),
+        CheckConstraint("zone_type IN ('port', 'restricted', 'anchorage', 'other')"),
+        nullable=False,
+    )
+    area = Column(Geometry("MULTIPOLYGON", srid=4326), nullable=False)
+    # Waga alertów wejścia/wyjścia (te same wartości co alerts.severity)
+    severity = Column(
+        String(20),
+        CheckConstraint("severity IN ('info', 'warning', 'critical', 'emergency')"),
+        nullable=False,
+        default="info",
+    )
+    alert_on_enter = Column(Boolean, nullable=False, default=True)
+    alert_on_exit = Column(Boolean, nullable=False, default=True)
+    active = Column(Boolean, nullable=False, default=True)
+    description = Column(Text)
+    created_at = Column(DateTime(timezone=True), default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        Index("idx_geofence_zones_area", area, postgresql_using="gist"),
+    )
+
+
+class CollisionRisk(Base):
+    """Pary łodzi z ryzykiem kolizji według ostatniej oceny CPA/TCPA"""
+
+    __tablename__ = "collision_risks"
+
+    # Para zapisywana raz - vessel_id < other_vessel_id
+    vessel_id = Column(
+        Integer, ForeignKey("vessels.id", ondelete="CASCADE"), primary_key=True
+    )
+    other_vessel_id = Column(
+        Integer, ForeignKey("vessels.id", ondelete="CASCADE"), primary_key=True
+    )
+    cpa_meters = Column(Numeric(10, 2), nullable=False)  # Najmniejsza odległość
+    tcpa_seconds = Column(Numeric(10, 2), nullable=False)  # Czas do niej
+    distance_meters = Column(Numeric(10, 2), nullable=False)  # Odległość w chwili oceny
+    first_detected_at = Column(DateTime(timezone=True), nullable=False)
+    evaluated_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        CheckConstraint(
+            "vessel_id < other_vessel_id", name="chk_collision_risk_pair_order"
+        ),
+        Index("idx_collision_risks_other_vessel", other_vessel_id),
+    )
+
+
+# Partycja DEFAULT dla tabel tworzonych przez metadata.create_all (bez migracji),
+# aby zapis działał zanim app.core.partitions założy partycje miesięczne.
+for _partitioned_table in (SensorReading.__table__, AisData.__table__, Location.__table__):
+    event.listen(
+        _partitioned_table,
+        "after_create",
+        DDL(
+            "CREATE TABLE IF NOT EXISTS %(table)s_default "
+            "PARTITION OF %(table)s DEFAULT"
+        ),
+    )
+
+
 @event.listens_for(Vessel, "before_insert")
 @event.listens_for(Vessel, "before_update")
 def check_vessel_fleet_operator_consistency(mapper, connection, vessel):
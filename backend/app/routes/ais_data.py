@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
 from app.schemas.ais_data import AisDataCreate, AisDataResponse
 from app.crud import ais_data as crud
-from typing import List
+from app.core.export import (
+    COLUMNAR_MEDIA_TYPES,
+    GEOJSON_DEFAULT_PRECISION,
+    GEOJSON_MEDIA_TYPE,
+    columnar_response,
+    geojson_response,
+)
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from typing import List, Literal, Optional
+from datetime import datetime
 
 router = APIRouter(prefix="/ais_data", tags=["ais_data"])
 
@@ -25,6 +34,59 @@ def read_ais_data(ais_data_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="AIS data not found")
     return data
 
-@router.get("/", response_model=List[AisDataResponse])
-def read_all_ais_data(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_ais_datas(db, skip=skip, limit=limit)
+@router.get(
+    "/",
+    response_model=List[AisDataResponse],
+    responses={
+        200: {
+            "content": {
+                media_type: {}
+                for media_type in (*COLUMNAR_MEDIA_TYPES.values(), GEOJSON_MEDIA_TYPE)
+            },
+            "description": "List of objects, arrays per field for format=columnar|msgpack, "
+            "or a FeatureCollection for format=geojson",
+        }
+    },
+)
+def read_all_ais_data(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor from the X-Next-Cursor header (replaces skip)"
+    ),
+    format: Literal["json", "columnar", "msgpack", "geojson"] = Query(
+        "json",
+        description="columnar/msgpack return one array per field (lon/lat), "
+        "geojson a FeatureCollection built by the database",
+    ),
+    precision: int = Query(
+        GEOJSON_DEFAULT_PRECISION,
+        ge=0,
+        le=15,
+        description="Coordinate decimal places for format=geojson",
+    ),
+    db: Session = Depends(get_db),
+):
+    try:
+        after = decode_cursor(cursor, (datetime, int)) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "geojson":
+        row = crud.get_ais_datas_geojson(
+            db, skip=0 if after else skip, limit=limit, after=after, precision=precision
+        )
+        return geojson_response(row, limit)
+    if format != "json":
+        rows = crud.get_ais_datas(
+            db, skip=0 if after else skip, limit=limit, after=after, as_rows=True
+        )
+        cursor_out = next_cursor(rows, limit, lambda r: (r.timestamp, r.ais_data_id))
+        headers = {NEXT_CURSOR_HEADER: cursor_out} if cursor_out else {}
+        return columnar_response(format, rows, crud.AIS_COLUMNAR_FIELDS, headers)
+
+    data = crud.get_ais_datas(db, skip=0 if after else skip, limit=limit, after=after)
+    cursor_out = next_cursor(data, limit, lambda d: (d["timestamp"], d["ais_data_id"]))
+    if cursor_out:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_out
+    return data
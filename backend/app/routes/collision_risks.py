@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core.database import AsyncSessionLocal
+from app.schemas.collision_risk import CollisionRiskResponse
+from app.crud import collision_risks as crud_collision_risk
+
+router = APIRouter(prefix="/collision-risks", tags=["Collision Risks"])
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@router.get(
+    "/",
+    response_model=List[CollisionRiskResponse],
+    summary="List vessel pairs at risk of collision (CPA/TCPA from the latest evaluation)",
+)
+async def read_collision_risks(
+    vessel_id: Optional[int] = Query(None, description="Only pairs involving this vessel"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await crud_collision_risk.get_collision_risks_async(db, vessel_id=vessel_id)
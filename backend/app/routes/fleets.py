@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core.database import SessionLocal, AsyncSessionLocal
 from app.schemas.fleet import FleetCreate, FleetUpdate, FleetResponse
+from app.schemas.sensor import SensorCurrentState
+from app.schemas.vessel import VesselLatestLocationResponse
 from app.crud import fleets as crud_fleet
+from app.crud import sensor_latest as crud_sensor_latest
+from app.crud import vessel_positions as crud_vessel_position
 from app.crud import (
     operators as crud_operator,
 )  # Potrzebne do pobrania listy operatorów
@@ -20,6 +25,11 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 @router.post("/", response_model=FleetResponse, status_code=status.HTTP_201_CREATED)
 def create_new_fleet(fleet_data: FleetCreate, db: Session = Depends(get_db)):
     try:
@@ -82,6 +92,43 @@ def delete_existing_fleet(fleet_id: int, db: Session = Depends(get_db)):
     return None
 
 
+@router.get(
+    "/{fleet_id}/sensor-states",
+    response_model=List[SensorCurrentState],
+    summary="Get the latest value and status of every sensor in a fleet",
+)
+async def get_fleet_sensor_states(
+    fleet_id: int,
+    silent_minutes: Optional[int] = Query(
+        None, ge=1, description="Only sensors without a reading for this many minutes"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not await crud_fleet.fleet_exists_async(db, fleet_id=fleet_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Fleet not found"
+        )
+    return await crud_sensor_latest.get_sensors_current_state_async(
+        db, fleet_id=fleet_id, silent_minutes=silent_minutes
+    )
+
+
+@router.get(
+    "/{fleet_id}/latest-positions",
+    response_model=List[VesselLatestLocationResponse],
+    summary="Get the latest known position of every vessel in a fleet",
+)
+async def get_fleet_latest_positions(
+    fleet_id: int,
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not await crud_fleet.fleet_exists_async(db, fleet_id=fleet_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Fleet not found"
+        )
+    return await crud_vessel_position.get_latest_positions_async(db, fleet_id=fleet_id)
+
+
 # Dodatkowy endpoint do pobierania listy operatorów dla formularza
 @router.get(
     "/utils/operators-for-select",
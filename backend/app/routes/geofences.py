@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from app.core.database import SessionLocal
+from app.schemas.geofence import (
+    GeofenceZoneCreate,
+    GeofenceZoneUpdate,
+    GeofenceZoneResponse,
+)
+from app.crud import geofences as crud_geofence
+
+router = APIRouter(prefix="/geofences", tags=["Geofences"])
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@router.post(
+    "/", response_model=GeofenceZoneResponse, status_code=status.HTTP_201_CREATED
+)
+def create_geofence_zone(zone_in: GeofenceZoneCreate, db: Session = Depends(get_db)):
+    return crud_geofence.create_geofence_zone(db=db, zone_in=zone_in)
+
+
+@router.get("/", response_model=List[GeofenceZoneResponse])
+def read_geofence_zones(
+    skip: int = 0,
+    limit: int = 100,
+    active_only: bool = False,
+    db: Session = Depends(get_db),
+):
+    return crud_geofence.get_geofence_zones(
+        db, skip=skip, limit=limit, active_only=active_only
+    )
+
+
+@router.get("/{zone_id}", response_model=GeofenceZoneResponse)
+def read_geofence_zone(zone_id: int, db: Session = Depends(get_db)):
+    db_zone = crud_geofence.get_geofence_zone(db, zone_id=zone_id)
+    if db_zone is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Geofence zone not found"
+        )
+    return db_zone
+
+
+@router.put("/{zone_id}", response_model=GeofenceZoneResponse)
+def update_geofence_zone(
+    zone_id: int, zone_in: GeofenceZoneUpdate, db: Session = Depends(get_db)
+):
+    db_zone = crud_geofence.update_geofence_zone(db=db, zone_id=zone_id, zone_in=zone_in)
+    if db_zone is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Geofence zone not found"
+        )
+    return db_zone
+
+
+@router.delete("/{zone_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_geofence_zone(zone_id: int, db: Session = Depends(get_db)):
+    if not crud_geofence.delete_geofence_zone(db, zone_id=zone_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Geofence zone not found"
+        )
+    return None
@@ -1,14 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
-from app.schemas.location import LocationCreate, LocationResponse, LocationUpdate
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import SessionLocal, AsyncSessionLocal
+from app.core import ingest_buffer
+from app.core.export import (
+    COLUMNAR_MEDIA_TYPES,
+    GEOJSON_DEFAULT_PRECISION,
+    GEOJSON_MEDIA_TYPE,
+    columnar_response,
+    geojson_response,
+)
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from app.schemas.location import (
+    AreaVisitResponse,
+    LocationCreate,
+    LocationResponse,
+    LocationUpdate,
+    VesselTrackResponse,
+)
 from app.schemas.vessel import VesselLatestLocationResponse
+from app.schemas.ingest import IngestQueuedResponse
+from app.schemas.geofence import validate_area_wkt
 from app.crud import locations as crud_location
 from app.crud import vessels as crud_vessel
-from typing import List, Optional
-from datetime import datetime
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta
+import os
+from geoalchemy2 import WKTElement
 
 router = APIRouter(prefix="/vessels/{vessel_id}/locations", tags=["Vessel Locaions"])
+# Zapytania po lokalizacjach wszystkich statków (bez vessel_id w ścieżce)
+area_router = APIRouter(prefix="/locations", tags=["Vessel Locaions"])
+
+WHO_WAS_HERE_MAX_WINDOW_DAYS = int(os.getenv("WHO_WAS_HERE_MAX_WINDOW_DAYS", "31"))
+WHO_WAS_HERE_MAX_RADIUS_KM = 500
 
 
 def get_db():
@@ -19,6 +45,11 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def check_vessel_exists_for_location(
     db: Session, vessel_id: int
 ):  # Inna nazwa, aby uniknąć konfliktu
@@ -31,20 +62,57 @@ def check_vessel_exists_for_location(
     return db_vessel
 
 
+async def check_vessel_exists_for_location_async(db: AsyncSession, vessel_id: int):
+    if not await crud_vessel.vessel_exists_async(db, vessel_id=vessel_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Vessel with id {vessel_id} not found.",
+        )
+
+
 @router.post(
     "/",
     response_model=LocationResponse,
     status_code=status.HTTP_201_CREATED,
     summary="Create a new location entry for a specific vessel (source will be set to 'manual')",
+    responses={
+        202: {
+            "model": IngestQueuedResponse,
+            "description": "Location queued for write-behind (INGEST_BUFFER_ENABLED)",
+        },
+        503: {"description": "Ingestion buffer is full, retry later"},
+    },
 )
-def create_location(  # Nazwa funkcji create_location_entry byłaby bardziej spójna z CRUD
+async def create_location(  # Nazwa funkcji create_location_entry byłaby bardziej spójna z CRUD
     vessel_id: int,
     location_in: LocationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     # check_vessel_exists_for_location(db, vessel_id) # CRUD to sprawdza
+    if ingest_buffer.INGEST_BUFFER_ENABLED:
+        await check_vessel_exists_for_location_async(db, vessel_id)
+        row = location_in.model_dump(exclude={"position"})
+        row.update(
+            source="manual",
+            vessel_id=vessel_id,
+            position=WKTElement(location_in.position, srid=4326),
+        )
+        try:
+            ingest_buffer.locations_buffer.offer(row)
+        except ingest_buffer.IngestBufferFull as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": "1"},
+            )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=IngestQueuedResponse(
+                queued=1, buffer=ingest_buffer.locations_buffer.name
+            ).model_dump(),
+        )
     try:
-        return crud_location.create_location_entry(
+        return await crud_location.create_location_entry_async(
             db=db, location_in=location_in, vessel_id=vessel_id
         )
     except ValueError as e:
@@ -59,26 +127,78 @@ def create_location(  # Nazwa funkcji create_location_entry byłaby bardziej sp
     "/",
     response_model=List[LocationResponse],
     summary="List location entries for a specific vessel",
+    responses={
+        200: {
+            "content": {
+                media_type: {}
+                for media_type in (*COLUMNAR_MEDIA_TYPES.values(), GEOJSON_MEDIA_TYPE)
+            },
+            "description": "List of objects, arrays per field for format=columnar|msgpack, "
+            "or a FeatureCollection for format=geojson",
+        }
+    },
 )
-def list_locations_for_vessel(
+async def list_locations_for_vessel(
     vessel_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),  # Zwiększony limit dla historii
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor from the X-Next-Cursor header (replaces skip)"
+    ),
     start_time: Optional[datetime] = Query(
         None, description="ISO 8601 format datetime"
     ),
     end_time: Optional[datetime] = Query(None, description="ISO 8601 format datetime"),
-    db: Session = Depends(get_db),
+    format: Literal["json", "columnar", "msgpack", "geojson"] = Query(
+        "json",
+        description="columnar/msgpack return one array per field (lon/lat), "
+        "geojson a FeatureCollection built by the database",
+    ),
+    precision: int = Query(
+        GEOJSON_DEFAULT_PRECISION,
+        ge=0,
+        le=15,
+        description="Coordinate decimal places for format=geojson",
+    ),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    check_vessel_exists_for_location(db, vessel_id)
-    locations = crud_location.get_location_entries_for_vessel(
+    await check_vessel_exists_for_location_async(db, vessel_id)
+    try:
+        before = decode_cursor(cursor, (datetime, int)) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if format == "geojson":
+        row = await crud_location.get_location_entries_geojson_async(
+            db=db,
+            vessel_id=vessel_id,
+            skip=0 if before else skip,
+            limit=limit,
+            start_time=start_time,
+            end_time=end_time,
+            before=before,
+            precision=precision,
+        )
+        return geojson_response(row, limit)
+
+    locations = await crud_location.get_location_entries_for_vessel_async(
         db=db,
         vessel_id=vessel_id,
-        skip=skip,
+        skip=0 if before else skip,
         limit=limit,
         start_time=start_time,
         end_time=end_time,
+        before=before,
+        as_rows=format != "json",
     )
+    cursor_out = next_cursor(locations, limit, lambda l: (l.timestamp, l.location_id))
+    headers = {NEXT_CURSOR_HEADER: cursor_out} if cursor_out else {}
+    if format != "json":
+        return columnar_response(
+            format, locations, crud_location.LOCATION_COLUMNAR_FIELDS, headers
+        )
+    response.headers.update(headers)
     return locations
 
 
@@ -87,9 +207,11 @@ def list_locations_for_vessel(
     response_model=Optional[LocationResponse],  # Może nie być żadnej lokalizacji
     summary="Get the latest location entry for a specific vessel",
 )
-def get_latest_location(vessel_id: int, db: Session = Depends(get_db)):
-    check_vessel_exists_for_location(db, vessel_id)
-    latest_location = crud_location.get_latest_location_for_vessel(
+async def get_latest_location(
+    vessel_id: int, db: AsyncSession = Depends(get_async_db)
+):
+    await check_vessel_exists_for_location_async(db, vessel_id)
+    latest_location = await crud_location.get_latest_location_for_vessel_async(
         db=db, vessel_id=vessel_id
     )
     if not latest_location:
@@ -100,6 +222,36 @@ def get_latest_location(vessel_id: int, db: Session = Depends(get_db)):
     return latest_location
 
 
+@router.get(
+    "/track",
+    response_model=VesselTrackResponse,
+    summary="Get the vessel track over a time range as one simplified LineString",
+)
+async def get_vessel_track(
+    vessel_id: int,
+    start_time: Optional[datetime] = Query(
+        None, description="ISO 8601 format datetime"
+    ),
+    end_time: Optional[datetime] = Query(None, description="ISO 8601 format datetime"),
+    zoom: Optional[int] = Query(
+        None,
+        ge=0,
+        le=22,
+        description="Map zoom level; the track is simplified to its pixel size (omit for full detail)",
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    await check_vessel_exists_for_location_async(db, vessel_id)
+    if start_time and end_time and start_time > end_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_time must not be later than end_time.",
+        )
+    return await crud_location.get_vessel_track_async(
+        db, vessel_id, start_time=start_time, end_time=end_time, zoom=zoom
+    )
+
+
 @router.get(
     "/{location_id}",
     response_model=LocationResponse,
@@ -182,3 +334,61 @@ def delete_existing_location(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
     return None
+
+
+@area_router.get(
+    "/who-was-here",
+    response_model=List[AreaVisitResponse],
+    summary="List vessels within a radius of a point (or inside a polygon) between two times",
+)
+async def who_was_here(
+    start_time: datetime = Query(..., description="ISO 8601 format datetime"),
+    end_time: datetime = Query(..., description="ISO 8601 format datetime"),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    radius_km: Optional[float] = Query(
+        None, gt=0, le=WHO_WAS_HERE_MAX_RADIUS_KM, description="Used with lon/lat"
+    ),
+    polygon: Optional[str] = Query(
+        None,
+        description="WKT POLYGON/MULTIPOLYGON in WGS84 (instead of lon/lat/radius_km)",
+        example="POLYGON ((14.5 54.1, 14.7 54.1, 14.7 54.2, 14.5 54.2, 14.5 54.1))",
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if start_time > end_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_time must not be later than end_time.",
+        )
+    if end_time - start_time > timedelta(days=WHO_WAS_HERE_MAX_WINDOW_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Time window must not exceed {WHO_WAS_HERE_MAX_WINDOW_DAYS} days.",
+        )
+    circle = (lon, lat, radius_km)
+    if polygon is not None:
+        if any(value is not None for value in circle):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Provide either polygon or lon/lat/radius_km, not both.",
+            )
+        # Geometria sprawdzana przed zapytaniem - błąd bazy to już nie błąd klienta
+        try:
+            validate_area_wkt(polygon)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    elif any(value is None for value in circle):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide lon, lat and radius_km, or polygon.",
+        )
+
+    return await crud_location.get_area_visits_async(
+        db,
+        start_time=start_time,
+        end_time=end_time,
+        point=(lon, lat) if polygon is None else None,
+        radius_m=radius_km * 1000 if polygon is None else None,
+        polygon_wkt=polygon,
+    )
@@ -0,0 +1,71 @@
+from fastapi import APIRouter
+
+from app.core import collision_risk, ingest_buffer, live_readings
+from app.core.geofence import geofence_index
+from app.core.sensor_cache import sensor_cache
+from app.core.tile_cache import tile_cache
+from app.crud.public_map import public_map_snapshot
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get(
+    "/sensor-cache",
+    summary="Hit/miss counters of the in-memory sensor metadata cache",
+)
+def get_sensor_cache_stats():
+    return sensor_cache.stats()
+
+
+@router.get(
+    "/ingest-buffers",
+    summary="Queue depth and counters of the write-behind ingestion buffers",
+)
+def get_ingest_buffer_stats():
+    return {
+        "enabled": ingest_buffer.INGEST_BUFFER_ENABLED,
+        "buffers": [
+            ingest_buffer.sensor_readings_buffer.stats(),
+            ingest_buffer.locations_buffer.stats(),
+        ],
+    }
+
+
+@router.get(
+    "/live-readings",
+    summary="Subscriber and throughput counters of the live sensor readings feed",
+)
+def get_live_readings_stats():
+    return live_readings.hub.stats()
+
+
+@router.get(
+    "/snapshots",
+    summary="Version checks and rebuilds of cached public response snapshots",
+)
+def get_snapshot_stats():
+    return [public_map_snapshot.stats()]
+
+
+@router.get(
+    "/tile-cache",
+    summary="Hit/miss and invalidation counters of the vector tile cache",
+)
+def get_tile_cache_stats():
+    return tile_cache.stats()
+
+
+@router.get(
+    "/geofences",
+    summary="Loaded zones, tracked vessels and transition counters of the geofence engine",
+)
+def get_geofence_stats():
+    return geofence_index.stats()
+
+
+@router.get(
+    "/collision-risk",
+    summary="Vessel, candidate pair and timing counters of the last CPA/TCPA evaluation",
+)
+def get_collision_risk_stats():
+    return collision_risk.last_run
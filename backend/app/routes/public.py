@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import SessionLocal
-from app.schemas.public_map import PublicVesselMapData
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Tuple
+from app.core.database import AsyncSessionLocal
+from app.core.snapshot_cache import snapshot_response
+from app.schemas.public_map import PublicMapViewportResponse, PublicVesselMapData
 from app.crud import (
     public_map as crud_public_map,
 )
@@ -10,12 +11,9 @@ from app.crud import (
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 router = APIRouter(
@@ -30,6 +28,44 @@ router = APIRouter(
     summary="Get initial data for public map display (vessels, latest positions, planned routes)",
     # Ten endpoint NIE MA autoryzacji
 )
-def get_public_map_data(db: Session = Depends(get_db)):
-    data = crud_public_map.get_public_map_initial_data(db=db)
-    return data
+async def get_public_map_data(request: Request):
+    # Gotowy snapshot (JSON + gzip, silny ETag) odświeżany co kilka sekund,
+    # i to tylko po zmianie danych - żądanie zwykle nie dotyka bazy
+    snapshot = await crud_public_map.public_map_snapshot.get()
+    return snapshot_response(snapshot, request)
+
+
+def _parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    """bbox w formacie min_lon,min_lat,max_lon,max_lat (WGS84)."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="bbox must be 'min_lon,min_lat,max_lon,max_lat'",
+        )
+    if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise HTTPException(status_code=400, detail="bbox longitude out of range")
+    if not (-90 <= min_lat <= max_lat <= 90):
+        raise HTTPException(status_code=400, detail="bbox latitude out of range")
+    # min_lon > max_lon oznacza prostokąt przecinający antypołudnik
+    return min_lon, min_lat, max_lon, max_lat
+
+
+@router.get(
+    "/map/vessels",
+    response_model=PublicMapViewportResponse,
+    summary="Get vessels (or clusters at low zoom) inside the visible map area",
+    # Ten endpoint NIE MA autoryzacji
+)
+async def get_public_map_viewport(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    zoom: int = Query(..., ge=0, le=22),
+    include_routes: bool = Query(
+        False, description="Include planned routes of visible vessels (not clustered)"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await crud_public_map.get_public_map_viewport_data(
+        db, _parse_bbox(bbox), zoom, include_routes
+    )
@@ -1,8 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal
 
 from app.core.database import SessionLocal
+from app.core.export import (
+    GEOJSON_DEFAULT_PRECISION,
+    GEOJSON_MEDIA_TYPE,
+    geojson_response,
+)
 from app.schemas.route_point import (
     RoutePointCreate,
     RoutePointUpdate,
@@ -63,14 +68,34 @@ def create_route_point(
     "/",
     response_model=List[RoutePointResponse],
     summary="List all route points for a specific vessel",
+    responses={
+        200: {
+            "content": {GEOJSON_MEDIA_TYPE: {}},
+            "description": "List of objects, or a FeatureCollection for format=geojson",
+        }
+    },
 )
 def list_route_points_for_vessel(
     vessel_id: int,  # Pobierane z prefiksu routera
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    format: Literal["json", "geojson"] = Query(
+        "json", description="geojson returns a FeatureCollection built by the database"
+    ),
+    precision: int = Query(
+        GEOJSON_DEFAULT_PRECISION,
+        ge=0,
+        le=15,
+        description="Coordinate decimal places for format=geojson",
+    ),
     db: Session = Depends(get_db),
 ):
     check_vessel_exists(db, vessel_id)
+    if format == "geojson":
+        row = crud_route_point.get_route_points_geojson(
+            db=db, vessel_id=vessel_id, skip=skip, limit=limit, precision=precision
+        )
+        return geojson_response(row)
     route_points = crud_route_point.get_route_points_for_vessel(
         db=db, vessel_id=vessel_id, skip=skip, limit=limit
     )
@@ -1,17 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, Request, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta, timezone
 
 from app.schemas.sensor_reading import (
     SensorReadingCreate,
     SensorReadingResponse,
+    SensorReadingBatchCreate,
+    SensorReadingBatchResponse,
+    SensorReadingRollupSeries,
 )
+from app.schemas.ingest import IngestQueuedResponse
 from app.crud import sensor_readings as crud_sensor_reading
+from app.crud import sensor_rollups as crud_sensor_rollup
+from app.crud import sensor_latest as crud_sensor_latest
 from app.crud import sensors as crud_sensor
 from app.crud import vessels as crud_vessel
 
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, AsyncSessionLocal
+from app.core import ingest_buffer, live_readings
+from app.core.etag import ETAG_HEADERS, etag_matches, make_etag, not_modified
+from app.core.export import COLUMNAR_MEDIA_TYPES, columnar_response
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from app.core.sensor_cache import sensor_cache
 
 
 router = APIRouter(
@@ -19,6 +32,11 @@ router = APIRouter(
     tags=["Sensor Readings Ingestion"],
 )
 
+batch_router = APIRouter(
+    prefix="/sensor-readings",
+    tags=["Sensor Readings Ingestion"],
+)
+
 
 def get_db():
     db = SessionLocal()
@@ -28,25 +46,53 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 @router.post(
     "/",  # Pełna ścieżka: /sensors/{sensor_id}/readings/
     response_model=SensorReadingResponse,
     status_code=status.HTTP_201_CREATED,
     summary="Submit a new sensor reading (for data ingestion systems)",
+    responses={
+        202: {
+            "model": IngestQueuedResponse,
+            "description": "Reading queued for write-behind (INGEST_BUFFER_ENABLED)",
+        },
+        503: {"description": "Ingestion buffer is full, retry later"},
+    },
 )
-def submit_sensor_reading(
+async def submit_sensor_reading(
     sensor_id: int,
     reading_in: SensorReadingCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_sensor = crud_sensor.get_sensor(db, sensor_id=sensor_id)
-    if not db_sensor:
+    if await sensor_cache.get_or_load_async(db, sensor_id) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Sensor with id {sensor_id} not found",
         )
+    if ingest_buffer.INGEST_BUFFER_ENABLED:
+        try:
+            ingest_buffer.sensor_readings_buffer.offer(
+                {**reading_in.model_dump(), "sensor_id": sensor_id}
+            )
+        except ingest_buffer.IngestBufferFull as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": "1"},
+            )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=IngestQueuedResponse(
+                queued=1, buffer=ingest_buffer.sensor_readings_buffer.name
+            ).model_dump(),
+        )
     try:
-        return crud_sensor_reading.create_sensor_reading(
+        return await crud_sensor_reading.create_sensor_reading_async(
             db=db, reading_in=reading_in, sensor_id=sensor_id
         )
     except ValueError as e:  # Błędy z CRUD (np. sensor nie istnieje, zły status)
@@ -61,29 +107,219 @@ def submit_sensor_reading(
     "/",  # Pełna ścieżka: /sensors/{sensor_id}/readings/
     response_model=List[SensorReadingResponse],
     summary="Get sensor readings for a specific sensor (public)",
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in COLUMNAR_MEDIA_TYPES.values()},
+            "description": "List of objects, or arrays per field for format=columnar|msgpack",
+        }
+    },
 )
-def public_get_readings_for_sensor(
+async def public_get_readings_for_sensor(
     sensor_id: int,
+    request: Request,
+    response: Response,
     start_time: Optional[datetime] = Query(None, description="Start time (ISO 8601)"),
     end_time: Optional[datetime] = Query(None, description="End time (ISO 8601)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(1000, ge=1, le=5000),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor from the X-Next-Cursor header (replaces skip)"
+    ),
+    max_points: Optional[int] = Query(
+        None,
+        ge=3,
+        le=10000,
+        description="Downsample the whole time range (LTTB) to at most this many "
+        "readings; skip and limit are ignored",
+    ),
+    format: Literal["json", "columnar", "msgpack"] = Query(
+        "json", description="columnar/msgpack return one array per field"
+    ),
+    after_id: Optional[int] = Query(
+        None, description="Only readings stored after this reading id (delta polling)"
+    ),
+    since: Optional[datetime] = Query(
+        None, description="Only readings with timestamp after this time (delta polling)"
+    ),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
 ):
     # Sprawdź, czy sensor istnieje, aby zwrócić 404, jeśli nie
-    db_sensor = crud_sensor.get_sensor(db, sensor_id=sensor_id)
-    if not db_sensor:
+    if await sensor_cache.get_or_load_async(db, sensor_id) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Sensor with id {sensor_id} not found",
         )
 
-    readings = crud_sensor_reading.get_sensor_readings(
+    # ETag ze znacznika zmian sensora (największe id i liczba odczytów) - brak
+    # nowych odczytów kończy się 304 bez zapytania o odczyty
+    marks = await crud_sensor_latest.get_change_marks_async(db, [sensor_id])
+    etag = make_etag(sensor_id, marks.get(sensor_id), request.url.query)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    etag_headers = {"ETag": etag, **ETAG_HEADERS}
+
+    if max_points is not None:
+        readings = await crud_sensor_reading.get_sensor_readings_downsampled_async(
+            db=db,
+            sensor_id=sensor_id,
+            max_points=max_points,
+            start_time=start_time,
+            end_time=end_time,
+        )
+        if format != "json":
+            return columnar_response(
+                format, readings, crud_sensor_reading.READING_COLUMNAR_FIELDS, etag_headers
+            )
+        response.headers.update(etag_headers)
+        return readings
+
+    try:
+        after = decode_cursor(cursor, (datetime, int)) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    readings = await crud_sensor_reading.get_sensor_readings_async(
         db=db,
         sensor_id=sensor_id,
         start_time=start_time,
         end_time=end_time,
-        skip=skip,
+        skip=0 if after else skip,
         limit=limit,
+        after=after,
+        as_rows=format != "json",
+        after_id=after_id,
+        since=since,
     )
+    cursor_out = next_cursor(readings, limit, lambda r: (r.timestamp, r.id))
+    headers = dict(etag_headers)
+    if cursor_out:
+        headers[NEXT_CURSOR_HEADER] = cursor_out
+    if format != "json":
+        return columnar_response(
+            format, readings, crud_sensor_reading.READING_COLUMNAR_FIELDS, headers
+        )
+    response.headers.update(headers)
     return readings
+
+
+@router.get(
+    "/rollup",  # Pełna ścieżka: /sensors/{sensor_id}/readings/rollup
+    response_model=SensorReadingRollupSeries,
+    summary="Get aggregated sensor readings (min/max/avg per time bucket) for charts",
+)
+async def public_get_reading_rollups_for_sensor(
+    sensor_id: int,
+    start_time: Optional[datetime] = Query(
+        None, description="Start time (ISO 8601), default: 24 hours before end_time"
+    ),
+    end_time: Optional[datetime] = Query(
+        None, description="End time (ISO 8601), default: now"
+    ),
+    points: int = Query(
+        500, ge=1, le=10000, description="Minimum number of points to return"
+    ),
+    resolution: Optional[Literal["raw", "1m", "1h", "1d"]] = Query(
+        None, description="Force a resolution instead of picking it from points"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if await sensor_cache.get_or_load_async(db, sensor_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sensor with id {sensor_id} not found",
+        )
+
+    end_time = crud_sensor_rollup.as_utc(end_time or datetime.now(timezone.utc))
+    start_time = crud_sensor_rollup.as_utc(start_time or end_time - timedelta(hours=24))
+    if start_time >= end_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_time must be earlier than end_time",
+        )
+
+    chosen_resolution, series = await crud_sensor_rollup.get_sensor_reading_series_async(
+        db=db,
+        sensor_id=sensor_id,
+        start_time=start_time,
+        end_time=end_time,
+        points=points,
+        resolution=resolution,
+    )
+    return SensorReadingRollupSeries(
+        sensor_id=sensor_id,
+        resolution=chosen_resolution,
+        start_time=start_time,
+        end_time=end_time,
+        points=series,
+    )
+
+
+@batch_router.post(
+    "/batch",  # Pełna ścieżka: /sensor-readings/batch
+    response_model=SensorReadingBatchResponse,
+    summary="Submit a batch of sensor readings for many sensors in one transaction",
+)
+async def submit_sensor_readings_batch(
+    batch_in: SensorReadingBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        return await crud_sensor_reading.create_sensor_readings_batch_async(
+            db=db, readings_in=batch_in.readings
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@batch_router.get(
+    "/live",  # Pełna ścieżka: /sensor-readings/live
+    summary="Subscribe to new readings of a vessel or of selected sensors (SSE)",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"text/event-stream": {}},
+            "description": "'readings' events with a JSON list of readings committed "
+            "since the previous event; 'overflow' when the client falls behind",
+        }
+    },
+)
+async def subscribe_live_sensor_readings(
+    vessel_id: Optional[int] = Query(None, description="All sensors of this vessel"),
+    sensor_ids: Optional[List[int]] = Query(None, description="Selected sensors"),
+):
+    if vessel_id is None and not sensor_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide vessel_id or at least one sensor_ids value.",
+        )
+    # Własna sesja tylko na walidację - połączenie nie jest trzymane przez
+    # cały czas trwania strumienia
+    async with AsyncSessionLocal() as db:
+        if vessel_id is not None and not await crud_vessel.vessel_exists_async(
+            db, vessel_id=vessel_id
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Vessel with id {vessel_id} not found",
+            )
+        if sensor_ids:
+            found = await sensor_cache.get_many_or_load_async(db, sensor_ids)
+            missing = sorted(set(sensor_ids) - set(found))
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Sensors not found: {missing}",
+                )
+
+    subscription = live_readings.hub.subscribe(vessel_id, sensor_ids or ())
+    return StreamingResponse(
+        live_readings.sse_events(subscription),
+        media_type="text/event-stream",
+        # X-Accel-Buffering - nginx nie buforuje strumienia zdarzeń
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
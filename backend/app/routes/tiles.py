@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import AsyncSessionLocal
+from app.core.snapshot_cache import snapshot_response
+from app.core.tile_cache import TILE_LAYERS, tile_cache
+from app.crud import tiles as crud_tiles
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+router = APIRouter(
+    prefix="/tiles",
+    tags=["Tiles"],
+)
+
+
+@router.get(
+    "/{layer}/{z}/{x}/{y}.mvt",
+    summary="Get a Mapbox Vector Tile with vessels, recent tracks or planned routes",
+    responses={200: {"content": {MVT_MEDIA_TYPE: {}}}},
+)
+async def get_vector_tile(
+    request: Request,
+    layer: str,
+    z: int = Path(..., ge=0, le=22),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if layer not in TILE_LAYERS:
+        raise HTTPException(status_code=404, detail=f"Unknown tile layer '{layer}'")
+    if x >= 2**z or y >= 2**z:
+        raise HTTPException(status_code=400, detail="Tile coordinates out of range")
+    # Kafel z cache (do zapisu w warstwie lub upływu TTL); sesja bazy jest
+    # używana tylko przy przeliczeniu
+    snapshot = await tile_cache.get(
+        (layer, z, x, y), lambda: crud_tiles.get_tile(db, layer, z, x, y)
+    )
+    return snapshot_response(snapshot, request, media_type=MVT_MEDIA_TYPE)
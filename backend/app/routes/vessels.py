@@ -1,8 +1,10 @@
 # app/routes/vessels.py (w głównym API backendu)
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, Request, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta, timezone
 from app.schemas.vessel import (
     VesselCreate,
     VesselUpdate,
@@ -11,12 +13,23 @@ from app.schemas.vessel import (
 )
 from app.schemas.sensor_reading import (
     SensorReadingResponse,
+    VesselSensorReadingsGroupedResponse,
 )
 from app.schemas.location import LocationResponse
+from app.schemas.sensor import SensorCurrentState
 from app.crud import vessels as crud_vessel
 from app.crud import locations as crud_location
 from app.crud import sensor_readings as crud_sensor_reading
-from app.core.database import SessionLocal
+from app.crud import sensor_latest as crud_sensor_latest
+from app.core.database import SessionLocal, AsyncSessionLocal
+from app.core.etag import ETAG_HEADERS, etag_matches, make_etag, not_modified
+from app.core.export import (
+    COLUMNAR_MEDIA_TYPES,
+    EXPORT_MEDIA_TYPES,
+    columnar_response,
+    export_chunks,
+)
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
 
 
 router = APIRouter(prefix="/vessels", tags=["Vessels"])
@@ -30,6 +43,11 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 @router.post("/", response_model=VesselResponse, status_code=status.HTTP_201_CREATED)
 def create_new_vessel(vessel_in: VesselCreate, db: Session = Depends(get_db)):
     try:
@@ -141,18 +159,41 @@ def read_vessel_sensor_configuration_status(
     return status_response
 
 
+@router.get(
+    "/{vessel_id}/sensor-states",
+    response_model=List[SensorCurrentState],
+    summary="Get the latest value and status of every sensor on a vessel",
+)
+async def get_vessel_sensor_states(
+    vessel_id: int,
+    silent_minutes: Optional[int] = Query(
+        None, ge=1, description="Only sensors without a reading for this many minutes"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not await crud_vessel.vessel_exists_async(db, vessel_id=vessel_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Vessel with id {vessel_id} not found",
+        )
+    return await crud_sensor_latest.get_sensors_current_state_async(
+        db, vessel_id=vessel_id, silent_minutes=silent_minutes
+    )
+
+
 @router.get(
     "/{vessel_id}/locations/latest",  # Lub w routerze dla Location, np. /locations/vessel/{vessel_id}/latest
     response_model=Optional[LocationResponse],  # Może nie być lokalizacji
     summary="Get the latest location for a specific vessel",
 )
-def get_latest_location_for_vessel(vessel_id: int, db: Session = Depends(get_db)):
+async def get_latest_location_for_vessel(
+    vessel_id: int, db: AsyncSession = Depends(get_async_db)
+):
     # Sprawdź, czy statek istnieje
-    db_vessel = crud_vessel.get_vessel(db, vessel_id=vessel_id)
-    if not db_vessel:
+    if not await crud_vessel.vessel_exists_async(db, vessel_id=vessel_id):
         raise HTTPException(status_code=404, detail="Vessel not found")
 
-    latest_location = crud_location.get_latest_location_for_vessel(
+    latest_location = await crud_location.get_latest_location_for_vessel_async(
         db, vessel_id=vessel_id
     )
     if not latest_location:
@@ -166,9 +207,20 @@ def get_latest_location_for_vessel(vessel_id: int, db: Session = Depends(get_db)
     "/{vessel_id}/sensor-readings/",  # Pełna ścieżka: /vessels/{vessel_id}/sensor-readings/
     response_model=List[SensorReadingResponse],
     summary="Get all sensor readings for a specific vessel (public)",
+    responses={
+        200: {
+            "content": {
+                media_type: {}
+                for media_type in {**EXPORT_MEDIA_TYPES, **COLUMNAR_MEDIA_TYPES}.values()
+            },
+            "description": "JSON array, a streamed export for format=ndjson|csv "
+            "or arrays per field for format=columnar|msgpack",
+        }
+    },
 )
-def public_get_readings_for_vessel(
+async def public_get_readings_for_vessel(
     vessel_id: int,
+    response: Response,
     start_time: Optional[datetime] = Query(None, description="Start time (ISO 8601)"),
     end_time: Optional[datetime] = Query(None, description="End time (ISO 8601)"),
     sensor_ids: Optional[List[int]] = Query(
@@ -176,23 +228,147 @@ def public_get_readings_for_vessel(
     ),
     skip: int = Query(0, ge=0),
     limit: int = Query(10000, ge=1, le=50000),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor from the X-Next-Cursor header (replaces skip)"
+    ),
+    max_points: Optional[int] = Query(
+        None,
+        ge=3,
+        le=10000,
+        description="Downsample each sensor's readings (LTTB) to at most this many "
+        "points; skip and limit are ignored",
+    ),
+    format: Literal["json", "ndjson", "csv", "columnar", "msgpack"] = Query(
+        "json",
+        description="ndjson/csv stream the whole time range without a row cap "
+        "(skip, limit and max_points are ignored); columnar/msgpack return one "
+        "array per field",
+    ),
+    db: AsyncSession = Depends(get_async_db),
 ):
     # Sprawdź, czy statek istnieje
-    db_vessel = crud_vessel.get_vessel(db, vessel_id=vessel_id)
-    if not db_vessel:
+    if not await crud_vessel.vessel_exists_async(db, vessel_id=vessel_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Vessel with id {vessel_id} not found",
         )
 
-    readings = crud_sensor_reading.get_sensor_readings_for_vessel(
+    if format in EXPORT_MEDIA_TYPES:
+        chunks = crud_sensor_reading.stream_sensor_readings_for_vessel_async(
+            vessel_id=vessel_id,
+            start_time=start_time,
+            end_time=end_time,
+            sensor_ids=sensor_ids,
+        )
+        return StreamingResponse(
+            export_chunks(format, chunks, crud_sensor_reading.READING_EXPORT_COLUMNS),
+            media_type=EXPORT_MEDIA_TYPES[format],
+            headers={
+                "Content-Disposition": f'attachment; filename="vessel_{vessel_id}_sensor_readings.{format}"'
+            },
+        )
+
+    columnar = format in COLUMNAR_MEDIA_TYPES
+    if max_points is not None:
+        readings = await crud_sensor_reading.get_sensor_readings_for_vessel_downsampled_async(
+            db=db,
+            vessel_id=vessel_id,
+            max_points=max_points,
+            start_time=start_time,
+            end_time=end_time,
+            sensor_ids=sensor_ids,
+        )
+        if columnar:
+            return columnar_response(
+                format, readings, crud_sensor_reading.VESSEL_READING_COLUMNAR_FIELDS
+            )
+        return readings
+
+    try:
+        after = decode_cursor(cursor, (int, datetime, int)) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    readings = await crud_sensor_reading.get_sensor_readings_for_vessel_async(
         db=db,
         vessel_id=vessel_id,
         start_time=start_time,
         end_time=end_time,
         sensor_ids=sensor_ids,  # Przekaż bezpośrednio listę int
-        skip=skip,
+        skip=0 if after else skip,
         limit=limit,
+        after=after,
+        as_rows=columnar,
     )
+    cursor_out = next_cursor(
+        readings, limit, lambda r: (r.sensor_id, r.timestamp, r.id)
+    )
+    headers = {NEXT_CURSOR_HEADER: cursor_out} if cursor_out else {}
+    if columnar:
+        return columnar_response(
+            format, readings, crud_sensor_reading.VESSEL_READING_COLUMNAR_FIELDS, headers
+        )
+    response.headers.update(headers)
     return readings
+
+
+@router.get(
+    "/{vessel_id}/sensor-readings/grouped",  # Pełna ścieżka: /vessels/{vessel_id}/sensor-readings/grouped
+    response_model=VesselSensorReadingsGroupedResponse,
+    summary="Get readings of every sensor on a vessel, grouped by sensor (public)",
+)
+async def public_get_readings_for_vessel_grouped(
+    vessel_id: int,
+    request: Request,
+    response: Response,
+    start_time: Optional[datetime] = Query(
+        None, description="Start time (ISO 8601), default: 24 hours before end_time"
+    ),
+    end_time: Optional[datetime] = Query(
+        None, description="End time (ISO 8601), default: now"
+    ),
+    max_points: Optional[int] = Query(
+        None,
+        ge=3,
+        le=10000,
+        description="Downsample each sensor's readings (LTTB) to at most this many points",
+    ),
+    after_id: Optional[int] = Query(
+        None, description="Only readings stored after this reading id (delta polling)"
+    ),
+    since: Optional[datetime] = Query(
+        None, description="Only readings with timestamp after this time (delta polling)"
+    ),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not await crud_vessel.vessel_exists_async(db, vessel_id=vessel_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Vessel with id {vessel_id} not found",
+        )
+
+    # ETag ze znaczników zmian wszystkich sensorów statku
+    marks = await crud_sensor_latest.get_vessel_change_marks_async(db, vessel_id)
+    etag = make_etag(vessel_id, sorted(marks.items()), request.url.query)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    end_time = end_time or datetime.now(timezone.utc)
+    start_time = start_time or end_time - timedelta(hours=24)
+    groups = await crud_sensor_reading.get_sensor_readings_grouped_for_vessel_async(
+        db=db,
+        vessel_id=vessel_id,
+        start_time=start_time,
+        end_time=end_time,
+        max_points=max_points,
+        after_id=after_id,
+        since=since,
+    )
+    response.headers.update({"ETag": etag, **ETAG_HEADERS})
+    return VesselSensorReadingsGroupedResponse(
+        vessel_id=vessel_id,
+        start_time=start_time,
+        end_time=end_time,
+        sensors=groups,
+    )
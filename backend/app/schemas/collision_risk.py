@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from datetime import datetime
+from decimal import Decimal
+
+
+class CollisionRiskResponse(BaseModel):
+    vessel_id: int
+    other_vessel_id: int
+    cpa_meters: Decimal  # Najmniejsza przewidywana odległość
+    tcpa_seconds: Decimal  # Czas do niej od chwili oceny
+    distance_meters: Decimal
+    first_detected_at: datetime
+    evaluated_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,70 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional
+from datetime import datetime
+import shapely
+
+ZONE_TYPE_PATTERN = r"^(port|restricted|anchorage|other)$"
+SEVERITY_PATTERN = r"^(info|warning|critical|emergency)$"
+
+
+def validate_area_wkt(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return value
+    try:
+        area = shapely.from_wkt(value)
+    except Exception:
+        raise ValueError("Area must be a valid WKT POLYGON or MULTIPOLYGON string.")
+    if area.geom_type not in ("Polygon", "MultiPolygon") or area.is_empty:
+        raise ValueError("Area must be a non-empty WKT POLYGON or MULTIPOLYGON.")
+    if not area.is_valid:
+        raise ValueError(f"Invalid area geometry: {shapely.is_valid_reason(area)}")
+    min_lon, min_lat, max_lon, max_lat = area.bounds
+    if not (-180 <= min_lon and max_lon <= 180 and -90 <= min_lat and max_lat <= 90):
+        raise ValueError("Area coordinates out of valid WGS84 range.")
+    return value
+
+
+class GeofenceZoneBase(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    zone_type: str = Field(default="other", pattern=ZONE_TYPE_PATTERN)
+    area: str = Field(
+        ...,
+        example="POLYGON ((14.5 54.1, 14.7 54.1, 14.7 54.2, 14.5 54.2, 14.5 54.1))",
+    )  # WKT POLYGON/MULTIPOLYGON
+    severity: str = Field(default="info", pattern=SEVERITY_PATTERN)
+    alert_on_enter: bool = True
+    alert_on_exit: bool = True
+    active: bool = True
+    description: Optional[str] = None
+
+
+class GeofenceZoneCreate(GeofenceZoneBase):
+    @field_validator("area")
+    @classmethod
+    def check_area(cls, value: str) -> str:
+        return validate_area_wkt(value)
+
+
+class GeofenceZoneUpdate(BaseModel):
+    name: Optional[str] = Field(default=None, min_length=1, max_length=100)
+    zone_type: Optional[str] = Field(default=None, pattern=ZONE_TYPE_PATTERN)
+    area: Optional[str] = None
+    severity: Optional[str] = Field(default=None, pattern=SEVERITY_PATTERN)
+    alert_on_enter: Optional[bool] = None
+    alert_on_exit: Optional[bool] = None
+    active: Optional[bool] = None
+    description: Optional[str] = None
+
+    @field_validator("area")
+    @classmethod
+    def check_area(cls, value: Optional[str]) -> Optional[str]:
+        return validate_area_wkt(value)
+
+
+class GeofenceZoneResponse(GeofenceZoneBase):
+    id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
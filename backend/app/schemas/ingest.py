@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class IngestQueuedResponse(BaseModel):
+    queued: int  # Liczba wierszy przyjętych do bufora zapisu
+    buffer: str
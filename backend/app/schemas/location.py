@@ -9,7 +9,9 @@ from geoalchemy2.elements import WKBElement
 class LocationBase(BaseModel):
     position: str  # WKT format
     heading: Decimal = Field(..., ge=0, lt=360)
-    accuracy_meters: Optional[Decimal] = Field(default=None, ge=0)
+    accuracy_meters: Optional[Decimal] = Field(
+        default=None, ge=0, le=Decimal("99999.99")
+    )  # Numeric(7, 2)
     timestamp: datetime = Field(default_factory=datetime.now)
     source: str = Field(default="manual", pattern=r"^(ais|gps|manual|calculated)$")
 
@@ -53,7 +55,9 @@ class LocationUpdate(BaseModel):
     timestamp: Optional[datetime] = None
     position: Optional[str] = Field(default=None, example="POINT (14.568 54.124)")
     heading: Optional[Decimal] = Field(default=None, ge=0, lt=360)
-    accuracy_meters: Optional[Decimal] = Field(default=None, ge=0)
+    accuracy_meters: Optional[Decimal] = Field(
+        default=None, ge=0, le=Decimal("99999.99")
+    )  # Numeric(7, 2)
     source: Optional[str] = Field(default=None, pattern="^(ais|gps|manual|calculated)$")
 
 
@@ -72,3 +76,30 @@ class LocationResponse(LocationBase):
 
     class Config:
         from_attributes = True
+
+
+class VesselTrackResponse(BaseModel):
+    vessel_id: int
+    zoom: Optional[int] = None
+    tolerance_meters: float  # 0 - ślad bez uproszczenia
+    point_count: int  # Liczba wpisów lokalizacji w zakresie czasu
+    vertex_count: int  # Liczba wierzchołków uproszczonego śladu
+    first_timestamp: Optional[datetime] = None
+    last_timestamp: Optional[datetime] = None
+    track_wkt: Optional[str] = None  # LINESTRING w WGS84 (POINT dla jednego wpisu)
+
+
+class AreaVisitResponse(BaseModel):
+    """Pobyt statku w obszarze w oknie czasu (zapytanie "kto tu był")."""
+
+    vessel_id: int
+    vessel_name: str
+    entry_count: int  # Liczba wpisów lokalizacji w obszarze
+    first_timestamp: datetime
+    first_position_wkt: str
+    last_timestamp: datetime
+    last_position_wkt: str
+    # Najbliższe podejście do punktu (lub środka wielokąta)
+    closest_timestamp: datetime
+    closest_position_wkt: str
+    closest_distance_meters: float
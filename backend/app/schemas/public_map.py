@@ -15,3 +15,29 @@ class PublicVesselMapData(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class PublicMapCluster(BaseModel):
+    count: int
+    longitude: float  # Środek ciężkości pozycji statków w komórce siatki
+    latitude: float
+
+
+class PublicVesselViewportData(BaseModel):
+    vessel_id: int
+    name: str
+    longitude: float
+    latitude: float
+    latest_heading: Optional[Decimal] = None
+    latest_timestamp: Optional[datetime] = None
+    planned_route: Optional[List[RoutePointResponse]] = None  # Tylko z include_routes
+
+    class Config:
+        from_attributes = True
+
+
+class PublicMapViewportResponse(BaseModel):
+    zoom: int
+    clustered: bool  # True - widoczne są klastry zamiast pojedynczych statków
+    clusters: List[PublicMapCluster] = Field(default_factory=list)
+    vessels: List[PublicVesselViewportData] = Field(default_factory=list)
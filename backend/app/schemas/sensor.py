@@ -52,3 +52,18 @@ class SensorResponse(SensorBase):
 
     class Config:
         from_attributes = True
+
+
+class SensorCurrentState(BaseModel):
+    sensor_id: int
+    sensor_name: str
+    vessel_id: int
+    measurement_unit: Optional[str] = None
+    # Puste, jeśli sensor nie przysłał jeszcze żadnego odczytu
+    last_value: Optional[Decimal] = None
+    last_status: Optional[str] = None
+    last_timestamp: Optional[datetime] = None
+    reading_count: int = 0
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 
@@ -20,3 +20,68 @@ class SensorReadingResponse(SensorReadingBase):
 
     class Config:
         from_attributes = True
+
+
+class SensorReadingBatchItem(SensorReadingBase):
+    sensor_id: int
+
+
+class SensorReadingBatchCreate(BaseModel):
+    readings: List[SensorReadingBatchItem] = Field(..., min_length=1, max_length=10000)
+
+
+class SensorReadingBatchItemResult(BaseModel):
+    index: int  # Pozycja odczytu w przesłanej liście
+    sensor_id: int
+    accepted: bool
+    id: Optional[int] = None  # ID zapisanego odczytu (tylko dla zaakceptowanych)
+    error: Optional[str] = None
+
+
+class SensorReadingBatchResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[SensorReadingBatchItemResult]
+
+
+class SensorReadingRollupPoint(BaseModel):
+    bucket_start: datetime  # Dla rozdzielczości "raw" - czas odczytu
+    min_value: Decimal
+    max_value: Decimal
+    avg_value: Decimal
+    reading_count: int
+    first_value: Decimal
+    last_value: Decimal
+    worst_status: str
+
+
+class SensorReadingRollupSeries(BaseModel):
+    sensor_id: int
+    resolution: str  # "1m", "1h", "1d" lub "raw"
+    start_time: datetime
+    end_time: datetime
+    points: List[SensorReadingRollupPoint]
+
+
+class SensorReadingPoint(BaseModel):
+    id: int
+    value: Decimal
+    status: Optional[str] = None
+    timestamp: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SensorReadingsGroup(BaseModel):
+    sensor_id: int
+    sensor_name: str
+    measurement_unit: Optional[str] = None
+    readings: List[SensorReadingPoint]
+
+
+class VesselSensorReadingsGroupedResponse(BaseModel):
+    vessel_id: int
+    start_time: datetime
+    end_time: datetime
+    sensors: List[SensorReadingsGroup]  # Wszystkie sensory statku, także bez odczytów
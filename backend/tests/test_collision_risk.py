@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+
+from app.core.collision_risk import (
+    EARTH_RADIUS_M,
+    METERS_PER_NM,
+    VesselSnapshot,
+    candidate_pairs,
+    compute_cpa,
+    evaluate_snapshot,
+)
+
+RADIUS_M = 12 * METERS_PER_NM
+
+
+def brute_force_pairs(lon, lat, radius_m):
+    """Wszystkie pary (i < j) o cięciwie <= radius_m - wzorzec dla siatki komórek."""
+    lon_r, lat_r = np.radians(lon), np.radians(lat)
+    xyz = EARTH_RADIUS_M * np.column_stack(
+        (np.cos(lat_r) * np.cos(lon_r), np.cos(lat_r) * np.sin(lon_r), np.sin(lat_r))
+    )
+    first, second = np.triu_indices(len(lon), k=1)
+    chord = np.linalg.norm(xyz[first] - xyz[second], axis=1)
+    close = chord <= radius_m
+    return set(zip(first[close].tolist(), second[close].tolist()))
+
+
+def as_pair_set(first, second):
+    pairs = [tuple(sorted(pair)) for pair in zip(first.tolist(), second.tolist())]
+    assert len(pairs) == len(set(pairs)), "each pair must be returned once"
+    return set(pairs)
+
+
+def snapshot(lon, lat, cog, sog, timestamp=0.0):
+    n = len(lon)
+    return VesselSnapshot(
+        np.arange(1, n + 1, dtype=np.int64),
+        np.asarray(lon, dtype=np.float64),
+        np.asarray(lat, dtype=np.float64),
+        np.asarray(cog, dtype=np.float64),
+        np.asarray(sog, dtype=np.float64),
+        np.full(n, timestamp, dtype=np.float64),
+    )
+
+
+@pytest.mark.parametrize(
+    "lon_range, lat_range",
+    [
+        ((14.0, 15.0), (54.0, 55.0)),  # zatoka - gęsto
+        ((-180.0, 180.0), (-80.0, 80.0)),  # cały świat - rzadko
+        ((179.7, 180.0), (-1.0, 1.0)),  # antypołudnik, wschodnia strona
+        ((-180.0, 180.0), (88.5, 90.0)),  # okolice bieguna północnego
+        ((-180.0, 180.0), (-90.0, -88.5)),  # okolice bieguna południowego
+    ],
+)
+def test_candidate_pairs_match_brute_force(lon_range, lat_range):
+    rng = np.random.default_rng(7)
+    lon = rng.uniform(*lon_range, 1500)
+    lat = rng.uniform(*lat_range, 1500)
+
+    found = as_pair_set(*candidate_pairs(lon, lat, RADIUS_M))
+
+    assert found == brute_force_pairs(lon, lat, RADIUS_M)
+
+
+def test_candidate_pairs_across_antimeridian():
+    rng = np.random.default_rng(11)
+    lon = np.concatenate((rng.uniform(179.8, 180.0, 300), rng.uniform(-180.0, -179.8, 300)))
+    lat = rng.uniform(-0.5, 0.5, 600)
+
+    found = as_pair_set(*candidate_pairs(lon, lat, RADIUS_M))
+
+    assert found == brute_force_pairs(lon, lat, RADIUS_M)
+    assert any((i < 300) != (j < 300) for i, j in found)
+
+
+def test_candidate_pairs_at_poles():
+    # Na biegunie długość geograficzna nie ma znaczenia - wszystkie punkty to jeden punkt
+    lon = np.array([-179.99, -90.0, 0.0, 90.0, 179.99, 0.0, 45.0])
+    lat = np.array([90.0, 90.0, 90.0, 89.99, 89.99, -90.0, -89.99])
+
+    found = as_pair_set(*candidate_pairs(lon, lat, RADIUS_M))
+
+    assert found == brute_force_pairs(lon, lat, RADIUS_M)
+    assert (0, 4) in found
+    assert (5, 6) in found
+    assert (0, 5) not in found
+
+
+def test_candidate_pairs_empty_and_single():
+    for lon, lat in (([], []), ([14.0], [54.0])):
+        first, second = candidate_pairs(np.array(lon), np.array(lat), RADIUS_M)
+        assert len(first) == len(second) == 0
+
+
+def test_candidate_pairs_rejects_tiny_radius():
+    with pytest.raises(ValueError):
+        candidate_pairs(np.array([14.0]), np.array([54.0]), 1.0)
+
+
+def test_compute_cpa_head_on():
+    # Dwie łodzie na równiku, 2 Mm od siebie, płyną na siebie po 10 węzłów
+    separation_deg = np.degrees(2 * METERS_PER_NM / EARTH_RADIUS_M)
+    snap = snapshot([0.0, separation_deg], [0.0, 0.0], [90.0, 270.0], [10.0, 10.0])
+
+    cpa, tcpa, distance = compute_cpa(snap, np.array([0]), np.array([1]))
+
+    assert distance[0] == pytest.approx(2 * METERS_PER_NM)
+    assert cpa[0] == pytest.approx(0.0, abs=1e-6)
+    # Prędkość zbliżania 20 węzłów - spotkanie po 6 minutach
+    assert tcpa[0] == pytest.approx(360.0)
+
+
+def test_compute_cpa_parallel_and_diverging():
+    offset_deg = np.degrees(METERS_PER_NM / EARTH_RADIUS_M)
+    snap = snapshot(
+        [0.0, 0.0, offset_deg],
+        [0.0, offset_deg, 0.0],
+        [0.0, 0.0, 90.0],
+        [10.0, 10.0, 10.0],
+    )
+
+    cpa, tcpa, distance = compute_cpa(snap, np.array([0, 0]), np.array([1, 2]))
+
+    # Równoległe kursy: odległość się nie zmienia, TCPA = 0
+    assert tcpa[0] == 0.0
+    assert cpa[0] == pytest.approx(distance[0])
+    # Druga łódź ucieka na wschód - TCPA ujemne, CPA to bieżąca odległość
+    assert tcpa[1] < 0
+    assert cpa[1] == pytest.approx(distance[1])
+
+
+def test_compute_cpa_across_antimeridian():
+    separation_deg = np.degrees(2 * METERS_PER_NM / EARTH_RADIUS_M)
+    snap = snapshot(
+        [180.0 - separation_deg / 2, -180.0 + separation_deg / 2],
+        [0.0, 0.0],
+        [90.0, 270.0],
+        [10.0, 10.0],
+    )
+
+    cpa, tcpa, distance = compute_cpa(snap, np.array([0]), np.array([1]))
+
+    assert distance[0] == pytest.approx(2 * METERS_PER_NM)
+    assert tcpa[0] == pytest.approx(360.0)
+
+
+def test_evaluate_snapshot_flags_only_converging_pairs():
+    separation_deg = np.degrees(2 * METERS_PER_NM / EARTH_RADIUS_M)
+    snap = snapshot(
+        [0.0, separation_deg, 10.0, 10.0 + separation_deg],
+        [0.0, 0.0, 0.0, 0.0],
+        [90.0, 270.0, 270.0, 90.0],
+        [10.0, 10.0, 10.0, 10.0],
+    )
+
+    result, stats = evaluate_snapshot(snap, at=0.0)
+
+    assert stats["candidate_pairs"] == 2
+    assert stats["risky_pairs"] == 1
+    assert result.vessel_ids.tolist() == [1]
+    assert result.other_vessel_ids.tolist() == [2]
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.core.downsampling import downsample_readings, lttb_indices
+
+
+def series(n, seed=3):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=np.float64), rng.normal(size=n).cumsum()
+
+
+@pytest.mark.parametrize("n, threshold", [(10, 3), (100, 7), (1000, 100), (1001, 1000)])
+def test_lttb_keeps_endpoints_and_threshold_points(n, threshold):
+    x, y = series(n)
+
+    indices = lttb_indices(x, y, threshold)
+
+    assert len(indices) == threshold
+    assert indices[0] == 0
+    assert indices[-1] == n - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize("n, threshold", [(100, 7), (1000, 100), (997, 13)])
+def test_lttb_picks_one_point_per_bucket(n, threshold):
+    x, y = series(n)
+
+    indices = lttb_indices(x, y, threshold)
+
+    # Środkowe punkty: po jednym z każdego kubełka [edges[i], edges[i + 1])
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    buckets = np.searchsorted(edges, indices[1:-1], side="right") - 1
+    assert buckets.tolist() == list(range(threshold - 2))
+
+
+@pytest.mark.parametrize("threshold", [0, 1, 2, 50, 51, 100])
+def test_lttb_returns_all_points_when_not_reducing(threshold):
+    x, y = series(50)
+
+    assert lttb_indices(x, y, threshold).tolist() == list(range(50))
+
+
+def test_lttb_keeps_spike():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[437] = 100.0
+    y[811] = -100.0
+
+    indices = lttb_indices(x, y, 20)
+
+    assert 437 in indices
+    assert 811 in indices
+
+
+def test_downsample_readings_returns_original_readings():
+    start = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    readings = [
+        SimpleNamespace(timestamp=start + timedelta(seconds=i), value=float(i % 17))
+        for i in range(500)
+    ]
+
+    sampled = downsample_readings(readings, 50)
+
+    assert len(sampled) == 50
+    assert sampled[0] is readings[0]
+    assert sampled[-1] is readings[-1]
+    assert all(any(s is r for r in readings) for s in sampled)
+    assert downsample_readings(readings[:10], 50) == readings[:10]
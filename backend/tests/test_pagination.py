@@ -0,0 +1,77 @@
+import base64
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.pagination import decode_cursor, encode_cursor, next_cursor
+
+TYPES = (datetime, int)
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        (datetime(2025, 6, 1, 12, 30, 15, 123456, tzinfo=timezone.utc), 42),
+        (datetime(2025, 1, 1), 0),
+        (datetime(2024, 12, 31, 23, 59, 59, tzinfo=timezone.utc), 2**62),
+    ],
+)
+def test_cursor_round_trip(values):
+    cursor = encode_cursor(values)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, TYPES) == values
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "!!!!",
+        "not a cursor",
+        raw_cursor({"timestamp": "2025-06-01T00:00:00", "id": 1}),  # nie lista
+        raw_cursor(["2025-06-01T00:00:00"]),  # za krótki
+        raw_cursor(["2025-06-01T00:00:00", 1, 2]),  # za długi
+        raw_cursor(["yesterday", 1]),  # zła data
+        raw_cursor([1717200000, 1]),  # liczba zamiast daty
+        raw_cursor(["2025-06-01T00:00:00", "abc"]),  # tekst zamiast id
+        raw_cursor(["2025-06-01T00:00:00", None]),
+        raw_cursor(["2025-06-01T00:00:00", [1]]),
+    ],
+)
+def test_decode_cursor_rejects_invalid_input(cursor):
+    with pytest.raises(ValueError, match="Invalid pagination cursor."):
+        decode_cursor(cursor, TYPES)
+
+
+def test_decode_cursor_rejects_tampered_cursor():
+    cursor = encode_cursor((datetime(2025, 6, 1, tzinfo=timezone.utc), 42))
+
+    for position in range(len(cursor)):
+        replacement = "A" if cursor[position] != "A" else "B"
+        tampered = cursor[:position] + replacement + cursor[position + 1 :]
+        try:
+            decoded = decode_cursor(tampered, TYPES)
+        except ValueError:
+            continue
+        # Zmiana, która wciąż daje poprawny kursor, musi dać wartości właściwych typów
+        assert isinstance(decoded[0], datetime)
+        assert isinstance(decoded[1], int)
+
+
+def test_next_cursor_only_for_full_page():
+    timestamp = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    items = [SimpleNamespace(timestamp=timestamp, id=i) for i in range(3)]
+
+    def key(item):
+        return (item.timestamp, item.id)
+
+    assert next_cursor(items, limit=4, key=key) is None
+    assert next_cursor([], limit=0, key=key) is None
+    assert decode_cursor(next_cursor(items, limit=3, key=key), TYPES) == key(items[-1])
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone
+
+from app.crud.sensor_latest import aggregate_latest
+
+START = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def reading(id_, sensor_id, seconds, value, status="normal"):
+    return {
+        "id": id_,
+        "sensor_id": sensor_id,
+        "timestamp": START + timedelta(seconds=seconds),
+        "value": value,
+        "status": status,
+    }
+
+
+def test_aggregate_latest_keeps_newest_reading_per_sensor():
+    rows = [
+        reading(10, 2, 0, "1.0"),
+        reading(11, 1, 5, "2.0", "warning"),
+        reading(12, 1, 10, "3.0", "critical"),
+        reading(13, 2, 20, "4.0"),
+    ]
+
+    latest = aggregate_latest(rows)
+
+    assert [state["sensor_id"] for state in latest] == [1, 2]
+    first, second = latest
+    assert first["last_value"] == "3.0"
+    assert first["last_status"] == "critical"
+    assert first["last_timestamp"] == START + timedelta(seconds=10)
+    assert first["reading_count"] == 2
+    assert first["last_reading_id"] == 12
+    assert second["last_value"] == "4.0"
+    assert second["reading_count"] == 2
+    assert second["last_reading_id"] == 13
+
+
+def test_aggregate_latest_late_reading_counts_but_does_not_replace():
+    rows = [
+        reading(20, 1, 30, "new"),
+        reading(21, 1, 10, "late", "error"),  # starszy pomiar, wyższe id
+    ]
+
+    (state,) = aggregate_latest(rows)
+
+    assert state["last_value"] == "new"
+    assert state["last_status"] == "normal"
+    assert state["reading_count"] == 2
+    # Znacznik zmian rośnie także przy spóźnionym odczycie
+    assert state["last_reading_id"] == 21
+
+
+def test_aggregate_latest_defaults_and_utc():
+    rows = [
+        {"sensor_id": 5, "timestamp": datetime(2025, 6, 1, 12, 0), "value": "1", "status": None},
+    ]
+
+    (state,) = aggregate_latest(rows)
+
+    assert state["last_status"] == "normal"
+    assert state["last_timestamp"] == START
+    assert state["last_reading_id"] is None
+
+
+def test_aggregate_latest_empty():
+    assert aggregate_latest([]) == []
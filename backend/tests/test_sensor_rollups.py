@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.crud.sensor_rollups import aggregate_readings, choose_rollup_resolution
+
+UTC = timezone.utc
+CEST = timezone(timedelta(hours=2))
+
+
+def reading(sensor_id, timestamp, value, status="normal"):
+    return {
+        "sensor_id": sensor_id,
+        "timestamp": timestamp,
+        "value": value,
+        "status": status,
+    }
+
+
+def by_key(buckets):
+    return {(b["sensor_id"], b["resolution"], b["bucket_start"]): b for b in buckets}
+
+
+def test_aggregate_readings_fills_every_resolution():
+    start = datetime(2025, 6, 1, 12, 30, tzinfo=UTC)
+    rows = [
+        reading(1, start + timedelta(seconds=5), "10.5"),
+        reading(1, start + timedelta(seconds=50), "7.25", "warning"),
+        reading(1, start + timedelta(seconds=20), "12.0"),
+    ]
+
+    buckets = by_key(aggregate_readings(rows))
+
+    assert set(buckets) == {
+        (1, "1m", start),
+        (1, "1h", start.replace(minute=0)),
+        (1, "1d", start.replace(hour=0, minute=0)),
+    }
+    for bucket in buckets.values():
+        assert bucket["min_value"] == Decimal("7.25")
+        assert bucket["max_value"] == Decimal("12.0")
+        assert bucket["sum_value"] == Decimal("29.75")
+        assert bucket["reading_count"] == 3
+        assert bucket["first_value"] == Decimal("10.5")
+        assert bucket["first_timestamp"] == start + timedelta(seconds=5)
+        assert bucket["last_value"] == Decimal("7.25")
+        assert bucket["last_timestamp"] == start + timedelta(seconds=50)
+        assert bucket["worst_status"] == "warning"
+
+
+def test_aggregate_readings_late_reading_updates_first_value():
+    start = datetime(2025, 6, 1, 12, 30, tzinfo=UTC)
+    rows = [
+        reading(1, start + timedelta(seconds=30), "2"),
+        reading(1, start + timedelta(seconds=40), "3"),
+        reading(1, start + timedelta(seconds=10), "1"),  # spóźniony
+    ]
+
+    bucket = by_key(aggregate_readings(rows))[(1, "1m", start)]
+
+    assert bucket["first_value"] == Decimal("1")
+    assert bucket["first_timestamp"] == start + timedelta(seconds=10)
+    assert bucket["last_value"] == Decimal("3")
+
+
+def test_aggregate_readings_splits_at_bucket_boundaries():
+    rows = [
+        reading(1, datetime(2025, 6, 1, 23, 59, 59, 999999, tzinfo=UTC), "1"),
+        reading(1, datetime(2025, 6, 2, 0, 0, tzinfo=UTC), "2"),
+    ]
+
+    buckets = aggregate_readings(rows)
+
+    counts = {}
+    for bucket in buckets:
+        counts[bucket["resolution"]] = counts.get(bucket["resolution"], 0) + 1
+        assert bucket["reading_count"] == 1
+    assert counts == {"1m": 2, "1h": 2, "1d": 2}
+
+
+def test_aggregate_readings_worst_status_and_defaults():
+    start = datetime(2025, 6, 1, tzinfo=UTC)
+    rows = [
+        reading(1, start, "1", "critical"),
+        reading(1, start + timedelta(seconds=1), "1", "warning"),
+        reading(1, start + timedelta(seconds=2), "1", "error"),
+        reading(1, start + timedelta(seconds=3), "1", "normal"),
+        reading(2, start, "1", None),
+    ]
+
+    buckets = by_key(aggregate_readings(rows))
+
+    assert buckets[(1, "1m", start)]["worst_status"] == "error"
+    assert buckets[(2, "1m", start)]["worst_status"] == "normal"
+
+
+def test_aggregate_readings_sorted_and_utc():
+    rows = [
+        reading(2, datetime(2025, 6, 1, 12, 0), "1"),  # bez strefy - UTC
+        reading(1, datetime(2025, 6, 1, 14, tzinfo=CEST), "1"),
+    ]
+
+    buckets = aggregate_readings(rows)
+
+    keys = [(b["sensor_id"], b["resolution"], b["bucket_start"]) for b in buckets]
+    assert keys == sorted(keys)
+    assert all(b["bucket_start"].tzinfo == UTC for b in buckets)
+    # Obie godziny to 12:00 UTC
+    assert by_key(buckets)[(1, "1h", datetime(2025, 6, 1, 12, tzinfo=UTC))]
+    assert by_key(buckets)[(2, "1h", datetime(2025, 6, 1, 12, tzinfo=UTC))]
+
+
+def test_aggregate_readings_empty():
+    assert aggregate_readings([]) == []
+
+
+@pytest.mark.parametrize(
+    "span, points, expected",
+    [
+        (timedelta(days=30), 20, "1d"),
+        (timedelta(days=30), 30, "1d"),
+        (timedelta(days=30), 31, "1h"),
+        (timedelta(days=1), 24, "1h"),
+        (timedelta(days=1), 500, "1m"),
+        (timedelta(days=1), 1440, "1m"),
+        (timedelta(days=1), 1441, None),
+        (timedelta(minutes=30), 100, None),
+    ],
+)
+def test_choose_rollup_resolution(span, points, expected):
+    start = datetime(2025, 6, 1, tzinfo=UTC)
+
+    assert choose_rollup_resolution(start, start + span, points) == expected
+
+
+def test_choose_rollup_resolution_mixed_timezones():
+    start = datetime(2025, 6, 1, 0, 0)  # bez strefy - UTC
+    end = datetime(2025, 6, 2, 2, 0, tzinfo=CEST)
+
+    assert choose_rollup_resolution(start, end, 24) == "1h"
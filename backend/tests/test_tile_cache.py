@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.core.tile_cache import TileCache
+
+KEY = ("vessels", 1, 0, 0)
+
+
+def test_waiters_rebuild_tile_when_builder_is_cancelled():
+    async def scenario():
+        cache = TileCache(max_entries=10, ttl_s=30)
+        builds = []
+
+        async def hanging_build():
+            builds.append("hanging")
+            await asyncio.sleep(60)
+            return b"never"
+
+        async def build():
+            builds.append("build")
+            await asyncio.sleep(0.01)
+            return b"tile"
+
+        builder = asyncio.create_task(cache.get(KEY, hanging_build))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get(KEY, build)) for _ in range(3)]
+        await asyncio.sleep(0)
+        builder.cancel()
+
+        snapshots = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await builder
+        return cache, builds, snapshots
+
+    cache, builds, snapshots = asyncio.run(scenario())
+
+    assert [snapshot.body for snapshot in snapshots] == [b"tile"] * 3
+    # Po anulowaniu kafel liczy jeden z oczekujących, reszta czeka na niego
+    assert builds == ["hanging", "build"]
+    assert cache.stats()["entries"] == 1
+    assert not cache._pending
+
+
+def test_waiters_get_build_error():
+    async def scenario():
+        cache = TileCache(max_entries=10, ttl_s=30)
+
+        async def failing_build():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("query failed")
+
+        tasks = [asyncio.create_task(cache.get(KEY, failing_build)) for _ in range(3)]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -2,12 +2,14 @@ import socket
 import os
 import httpx
 import csv
+import json
 
 from datetime import datetime
+from typing import Optional
 from decimal import Decimal
 
 from fastapi import FastAPI, Request, HTTPException, status, Query
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.middleware.sessions import SessionMiddleware
@@ -120,17 +122,83 @@ async def save_message(request: Request):
     return templates.TemplateResponse("index.html", context)
 
 
+async def _proxy_raw(
+    request: Request, api_url: str, what: str, media_type: Optional[str] = None
+):
+    """
+    Przekazuje gotowe (często skompresowane) bajty odpowiedzi backendu bez
+    ponownego parsowania, razem z ETagiem; If-None-Match pozwala odpowiedzieć 304.
+    """
+    forwarded = {
+        name: request.headers[name]
+        for name in ("if-none-match", "accept-encoding")
+        if name in request.headers
+    }
+    async with httpx.AsyncClient() as client:
+        try:
+            async with client.stream("GET", api_url, headers=forwarded) as response:
+                body = b"".join([chunk async for chunk in response.aiter_raw()])
+            headers = {
+                name: response.headers[name]
+                for name in ("ETag", "Cache-Control", "Vary", "Content-Encoding")
+                if name in response.headers
+            }
+            if response.status_code == status.HTTP_304_NOT_MODIFIED:
+                return Response(status_code=response.status_code, headers=headers)
+            if response.is_error:
+                try:
+                    content = json.loads(body)
+                except ValueError:
+                    content = {"detail": response.reason_phrase}
+                return JSONResponse(content=content, status_code=response.status_code)
+            return Response(
+                content=body,
+                status_code=response.status_code,
+                media_type=media_type or response.headers.get("content-type"),
+                headers=headers,
+            )
+        except Exception as e:
+            return JSONResponse(
+                content={"detail": f"Proxy error fetching {what}: {str(e)}"},
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 @app.get(
     "/map-data/initial-vessels-public",
     response_class=JSONResponse,
     name="get_public_initial_map_data",
     summary="Proxy to fetch public initial map data (vessels, positions, planned routes)",
 )
-async def proxy_get_public_initial_map_data():
+async def proxy_get_public_initial_map_data(request: Request):
+    return await _proxy_raw(
+        request,
+        f"{VESSEL_API_BASE_URL}/public/map/initial-vessels",
+        "public map data",
+        media_type="application/json",
+    )
+
+
+@app.get(
+    "/map-data/vessels-public",
+    response_class=JSONResponse,
+    name="get_public_viewport_map_data",
+    summary="Proxy to fetch public vessels (or clusters) inside the visible map area",
+)
+async def proxy_get_public_viewport_map_data(
+    bbox: str = Query(...),
+    zoom: int = Query(...),
+    include_routes: bool = Query(False),
+):
     async with httpx.AsyncClient() as client:
         try:
-            api_url = f"{VESSEL_API_BASE_URL}/public/map/initial-vessels"
-            response = await client.get(api_url)
+            params = {
+                "bbox": bbox,
+                "zoom": str(zoom),
+                "include_routes": str(include_routes).lower(),
+            }
+            api_url = f"{VESSEL_API_BASE_URL}/public/map/vessels"
+            response = await client.get(api_url, params=params)
             response.raise_for_status()
             return JSONResponse(
                 content=response.json(), status_code=response.status_code
@@ -150,6 +218,21 @@ async def proxy_get_public_initial_map_data():
             )
 
 
+@app.get(
+    "/map-data/tiles/{layer}/{z}/{x}/{y}.mvt",
+    name="get_public_vector_tile",
+    summary="Proxy to fetch a vector tile (vessels, tracks, planned routes)",
+)
+async def proxy_get_public_vector_tile(
+    request: Request, layer: str, z: int, x: int, y: int
+):
+    return await _proxy_raw(
+        request,
+        f"{VESSEL_API_BASE_URL}/tiles/{layer}/{z}/{x}/{y}.mvt",
+        "vector tile",
+    )
+
+
 @app.get(
     "/public/vessels/{vessel_id}",
     response_class=JSONResponse,
@@ -222,3 +305,48 @@ async def public_proxy_get_vessel_locations(
                 },
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+@app.get(
+    "/public/vessels/{vessel_id}/track",
+    response_class=JSONResponse,
+    name="public_proxy_get_vessel_track",
+    summary="Proxy to fetch the simplified track of a specific vessel",
+)
+async def public_proxy_get_vessel_track(
+    vessel_id: int,
+    zoom: Optional[int] = Query(None),
+    start_time: Optional[datetime] = Query(None),
+    end_time: Optional[datetime] = Query(None),
+):
+    async with httpx.AsyncClient() as client:
+        try:
+            params = {}
+            if zoom is not None:
+                params["zoom"] = str(zoom)
+            if start_time:
+                params["start_time"] = start_time.isoformat()
+            if end_time:
+                params["end_time"] = end_time.isoformat()
+
+            api_url = f"{VESSEL_API_BASE_URL}/vessels/{vessel_id}/locations/track"
+            response = await client.get(api_url, params=params)
+            response.raise_for_status()
+            return JSONResponse(
+                content=response.json(), status_code=response.status_code
+            )
+        except httpx.HTTPStatusError as e:
+            return JSONResponse(
+                content=e.response.json()
+                if e.response.content
+                and e.response.headers.get("content-type") == "application/json"
+                else {"detail": e.response.text},
+                status_code=e.response.status_code,
+            )
+        except Exception as e:
+            return JSONResponse(
+                content={
+                    "detail": f"Proxy error fetching public vessel track: {str(e)}"
+                },
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, status, Query
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 import httpx
 import os
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pa_app.utils.utils import templates
 
@@ -15,6 +15,25 @@ router = APIRouter(
 )
 
 
+def _conditional_headers(request: Request) -> dict:
+    # If-None-Match od przeglądarki trafia do backendu (odpytywanie przyrostowe)
+    if_none_match = request.headers.get("if-none-match")
+    return {"If-None-Match": if_none_match} if if_none_match else {}
+
+
+def _conditional_proxy_response(response: httpx.Response):
+    headers = {
+        name: response.headers[name]
+        for name in ("ETag", "Cache-Control")
+        if name in response.headers
+    }
+    if response.status_code == status.HTTP_304_NOT_MODIFIED:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(
+        content=response.json(), status_code=response.status_code, headers=headers
+    )
+
+
 @router.get(
     "/",
     response_class=HTMLResponse,
@@ -138,6 +157,57 @@ async def proxy_public_get_sensors_for_vessel(vessel_id: int):
             )
 
 
+@router.get(
+    "/api/vessels/{vessel_id}/sensor-readings",  # Ścieżka np. /sensors-overview/api/vessels/1/sensor-readings
+    response_class=JSONResponse,
+    name="proxy_public_get_vessel_sensor_readings_grouped",
+    summary="Proxy to fetch readings of all sensors on a vessel in one request",
+)
+async def proxy_public_get_vessel_sensor_readings_grouped(
+    request: Request,
+    vessel_id: int,
+    start_time: Optional[datetime] = Query(None),
+    end_time: Optional[datetime] = Query(None),
+    max_points: Optional[int] = Query(None, ge=3, le=10000),
+    after_id: Optional[int] = Query(None),
+    since: Optional[datetime] = Query(None),
+):
+    async with httpx.AsyncClient() as client:
+        try:
+            params = {}
+            if start_time:
+                params["start_time"] = start_time.isoformat()
+            if end_time:
+                params["end_time"] = end_time.isoformat()
+            if max_points:
+                params["max_points"] = str(max_points)
+            if after_id is not None:
+                params["after_id"] = str(after_id)
+            if since:
+                params["since"] = since.isoformat()
+            api_url = f"{VESSEL_API_BASE_URL}/vessels/{vessel_id}/sensor-readings/grouped"
+            response = await client.get(
+                api_url, params=params, headers=_conditional_headers(request)
+            )
+            response.raise_for_status()
+            return _conditional_proxy_response(response)
+        except httpx.HTTPStatusError as e:
+            return JSONResponse(
+                content=e.response.json()
+                if e.response.content
+                and e.response.headers.get("content-type") == "application/json"
+                else {"detail": e.response.text},
+                status_code=e.response.status_code,
+            )
+        except Exception as e:
+            return JSONResponse(
+                content={
+                    "detail": f"Proxy error fetching sensor readings for vessel {vessel_id}: {str(e)}"
+                },
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 @router.get(
     "/api/sensors/{sensor_id}/readings",  # Ścieżka np. /sensors-overview/api/sensors/101/readings
     response_class=JSONResponse,
@@ -145,9 +215,13 @@ async def proxy_public_get_sensors_for_vessel(vessel_id: int):
     summary="Proxy to fetch readings for a specific sensor",
 )
 async def proxy_public_get_sensor_readings(
+    request: Request,
     sensor_id: int,
     start_time: Optional[datetime] = Query(None),
     end_time: Optional[datetime] = Query(None),
+    max_points: Optional[int] = Query(None, ge=3, le=10000),
+    after_id: Optional[int] = Query(None),
+    since: Optional[datetime] = Query(None),
     # Możesz dodać skip/limit, jeśli JS ma obsługiwać paginację dla bardzo dużych zestawów danych
 ):
     async with httpx.AsyncClient() as client:
@@ -157,9 +231,20 @@ async def proxy_public_get_sensor_readings(
                 params["start_time"] = start_time.isoformat()
             if end_time:
                 params["end_time"] = end_time.isoformat()
-            # Domyślnie pobierzemy duży limit, np. 5000 odczytów, aby wykres był pełny
-            # Backend API ma domyślny limit 1000, ale pozwala na max 5000.
-            params["limit"] = str(5000)  # Ustawiamy duży limit
+            if max_points:
+                # Backend próbkuje cały zakres (LTTB) do max_points odczytów
+                params["max_points"] = str(max_points)
+            elif after_id is not None or since:
+                # Odpytywanie przyrostowe - tylko nowe odczyty
+                if after_id is not None:
+                    params["after_id"] = str(after_id)
+                if since:
+                    params["since"] = since.isoformat()
+                params["limit"] = str(5000)
+            else:
+                # Bez próbkowania pobieramy duży limit, aby wykres był pełny
+                # Backend API ma domyślny limit 1000, ale pozwala na max 5000.
+                params["limit"] = str(5000)  # Ustawiamy duży limit
 
             # Zakładamy, że API backendu ma publiczny endpoint /public/sensors/{id}/readings/
             # Zgodnie z Twoim app/routes/sensor_readings.py, ścieżka to /sensors/{sensor_id}/readings/
@@ -167,11 +252,11 @@ async def proxy_public_get_sensor_readings(
             # Na razie zakładam, że jest to /public/sensors/{sensor_id}/readings/
             api_url = f"{VESSEL_API_BASE_URL}/sensors/{sensor_id}/readings/"  # Upewnij się, że ścieżka jest poprawna
 
-            response = await client.get(api_url, params=params)
-            response.raise_for_status()
-            return JSONResponse(
-                content=response.json(), status_code=response.status_code
+            response = await client.get(
+                api_url, params=params, headers=_conditional_headers(request)
             )
+            response.raise_for_status()
+            return _conditional_proxy_response(response)
         except httpx.HTTPStatusError as e:
             return JSONResponse(
                 content=e.response.json()
@@ -187,3 +272,58 @@ async def proxy_public_get_sensor_readings(
                 },
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+@router.get(
+    "/api/live",  # Ścieżka np. /sensors-overview/api/live?vessel_id=1
+    name="proxy_public_live_sensor_readings",
+    summary="Proxy to the live sensor readings stream (SSE)",
+)
+async def proxy_public_live_sensor_readings(
+    vessel_id: Optional[int] = Query(None),
+    sensor_ids: Optional[List[int]] = Query(None),
+):
+    params = {}
+    if vessel_id is not None:
+        params["vessel_id"] = str(vessel_id)
+    if sensor_ids:
+        params["sensor_ids"] = [str(sensor_id) for sensor_id in sensor_ids]
+    # Strumień bez limitu czasu odczytu - backend wysyła co kilkanaście sekund keepalive
+    client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=None))
+    try:
+        request = client.build_request(
+            "GET", f"{VESSEL_API_BASE_URL}/sensor-readings/live", params=params
+        )
+        response = await client.send(request, stream=True)
+    except Exception as e:
+        await client.aclose()
+        return JSONResponse(
+            content={"detail": f"Proxy error opening live sensor readings: {str(e)}"},
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+    if response.status_code != status.HTTP_200_OK:
+        await response.aread()
+        await response.aclose()
+        await client.aclose()
+        return JSONResponse(
+            content=response.json()
+            if response.headers.get("content-type") == "application/json"
+            else {"detail": response.text},
+            status_code=response.status_code,
+        )
+
+    async def relay():
+        # finally wykona się także po rozłączeniu przeglądarki (anulowanie strumienia)
+        try:
+            async for chunk in response.aiter_raw():
+                yield chunk
+        finally:
+            await response.aclose()
+            await client.aclose()
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
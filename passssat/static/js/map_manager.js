@@ -6,11 +6,15 @@ const vesselMarkers = {};
 let currentTraveledPath = null;
 let currentPlannedRoutePolyline = null;
 let selectedVesselId = null;
-let allVesselsMapData = [];
+// Dane statków widzianych w obecnym i wcześniejszych widokach (vessel_id -> dane)
+const allVesselsMapData = {};
 
-// NOWE: Grupa warstw dla markerów historii lokalizacji i obiekt do ich przechowywania
-const historicalLocationMarkersGroup = L.layerGroup();
-// const historicalLocationMarkers = {}; // Opcjonalnie, jeśli potrzebujesz dostępu do konkretnych markerów po ID
+// Klastry statków przy małym zoomie i stan ładowania widoku
+const clusterMarkersGroup = L.layerGroup();
+let viewportRequestController = null;
+let viewportReloadTimer = null;
+let initialVesselSelected = false;
+const VIEWPORT_RELOAD_DELAY_MS = 250;
 
 // Ikony dla statków (bez zmian)
 const mainVesselIconUrl = "/static/ship_selected.svg";
@@ -26,14 +30,6 @@ const plannedRoutePointIcon = L.divIcon({
 });
 const routePointMarkersLayerGroup = L.layerGroup();
 
-// NOWA IKONA: dla markerów historii lokalizacji
-const historyLocationPointIcon = L.divIcon({
-    html: '<div style="background-color: #007bff; width: 8px; height: 8px; border-radius: 50%; border: 1px solid #fff; opacity: 0.7;"></div>',
-    className: 'history-location-point-marker',
-    iconSize: [8, 8],
-    iconAnchor: [4, 4]
-});
-
 
 // parseWKTPosition, createVesselIcon, updateVesselInfoPanel, showVesselInfoPanel, hideVesselInfoPanel - bez zmian
 function parseWKTPosition(wktPoint) {
@@ -50,6 +46,20 @@ function parseWKTPosition(wktPoint) {
     }
 }
 
+// "LINESTRING (lon lat, lon lat, ...)" -> [[lat, lon], ...]; POINT daje jeden punkt
+function parseWKTLineString(wkt) {
+    if (!wkt) return [];
+    const match = wkt.match(/\(([^)]+)\)/);
+    if (!match) {
+        console.warn("Invalid WKT geometry for parsing:", wkt);
+        return [];
+    }
+    return match[1].split(',').map(pair => {
+        const [lon, lat] = pair.trim().split(/\s+/).map(parseFloat);
+        return [lat, lon];
+    }).filter(([lat, lon]) => !isNaN(lat) && !isNaN(lon));
+}
+
 function createVesselIcon(isMain, rotationAngle = 0) {
     return L.divIcon({
         html: `<img src="${isMain ? mainVesselIconUrl : otherVesselIconUrl}" style="transform: rotate(${rotationAngle}deg); width: ${iconSize[0]}px; height: ${iconSize[1]}px; transform-origin: center;">`,
@@ -129,7 +139,6 @@ function clearCurrentTraveledPath() {
         map.removeLayer(currentTraveledPath);
         currentTraveledPath = null;
     }
-    historicalLocationMarkersGroup.clearLayers(); // Wyczyść markery historii
 }
 
 function clearCurrentPlannedRoute() {
@@ -214,60 +223,13 @@ async function handleVesselClick(vesselId) {
 
             await displayVesselLocationHistory(selectedVesselId, vesselDetailsData.name); // Wypełnia tabelę
 
-            // Pobierz historię lokalizacji dla mapy (więcej punktów) i narysuj trasę oraz markery
-            const historyResponse = await fetch(`/public/vessels/${selectedVesselId}/locations?limit=200`);
-            if (!historyResponse.ok) {
-                console.warn('Nie udało się pobrać pełnej historii lokalizacji dla trasy na mapie');
-            } else {
-                const locationHistory = await historyResponse.json();
-                if (locationHistory && locationHistory.length > 0) {
-                    const latLngsForPath = [];
-
-                    const currentVesselData = allVesselsMapData.find(v => v.vessel_id === selectedVesselId);
-                    const latestPositionTimestampFromInitial = currentVesselData ? currentVesselData.latest_timestamp : null;
-
-                    locationHistory.forEach(loc => {
-                        const coords = parseWKTPosition(loc.position);
-                        if (coords) {
-                            const latLng = [coords.lat, coords.lon];
-                            latLngsForPath.push(latLng);
-
-                            let isLatestPoint = false;
-                            if (latestPositionTimestampFromInitial && loc.timestamp) {
-                                if (loc.timestamp === latestPositionTimestampFromInitial) {
-                                    isLatestPoint = true;
-                                }
-                            }
-
-                            if (!isLatestPoint) {
-                                const historyMarker = L.marker(latLng, {
-                                    icon: historyLocationPointIcon,
-                                })
-                                .addTo(historicalLocationMarkersGroup);
-                                
-                                historyMarker.bindTooltip(
-                                    `<b>Historia</b><br>Czas: ${new Date(loc.timestamp).toLocaleString()}<br>Kurs: ${parseFloat(loc.heading).toFixed(1)}°<br>Źródło: ${loc.source}`
-                                );
-                            }
-                        }
-                    });
-                    historicalLocationMarkersGroup.addTo(map); // Dodaj grupę do mapy
-
-                    if (latLngsForPath.length > 1) {
-                        currentTraveledPath = L.polyline(latLngsForPath.slice().reverse(), {
-                            color: '#007bff',
-                            weight: 3,
-                            opacity: 0.6
-                        }).addTo(map);
-                    }
-                }
-            }
+            // Cały ślad statku jako jedna linia uproszczona pod bieżący zoom
+            await drawVesselTrack(selectedVesselId);
 
             // Narysuj planowaną trasę (RoutePoint)
-            const vesselData = allVesselsMapData.find(v => v.vessel_id === selectedVesselId);
+            const vesselData = allVesselsMapData[selectedVesselId];
             if (vesselData && vesselData.planned_route && vesselData.planned_route.length > 0) {
-                const vesselCurrentPosition = parseWKTPosition(vesselData.latest_position_wkt);
-                drawPlannedRouteOnMainMap(vesselData.planned_route, vesselCurrentPosition ? [vesselCurrentPosition.lat, vesselCurrentPosition.lon] : null);
+                drawPlannedRouteOnMainMap(vesselData.planned_route, [vesselData.latitude, vesselData.longitude]);
             }
 
         } catch (error) {
@@ -278,7 +240,34 @@ async function handleVesselClick(vesselId) {
     }
 }
 
-// drawPlannedRouteOnMainMap, addVesselMarker, loadInitialMapData - bez zmian
+async function drawVesselTrack(vesselId) {
+    try {
+        const response = await fetch(`/public/vessels/${vesselId}/track?zoom=${map.getZoom()}`);
+        if (!response.ok) {
+            console.warn('Nie udało się pobrać śladu statku na mapie');
+            return;
+        }
+        const track = await response.json();
+        // Statek mógł zostać odznaczony w trakcie pobierania
+        if (selectedVesselId !== vesselId) return;
+        clearCurrentTraveledPath();
+        const latLngs = parseWKTLineString(track.track_wkt);
+        if (latLngs.length > 1) {
+            currentTraveledPath = L.polyline(latLngs, {
+                color: '#007bff',
+                weight: 3,
+                opacity: 0.6
+            }).addTo(map);
+            currentTraveledPath.bindTooltip(
+                `<b>Ślad</b><br>Od: ${new Date(track.first_timestamp).toLocaleString()}<br>Do: ${new Date(track.last_timestamp).toLocaleString()}<br>Pozycji: ${track.point_count}`
+            );
+        }
+    } catch (error) {
+        console.error(`Błąd podczas pobierania śladu statku ${vesselId}:`, error);
+    }
+}
+
+// drawPlannedRouteOnMainMap - bez zmian
 function drawPlannedRouteOnMainMap(plannedRoutePoints, vesselCurrentLatLng) {
     clearCurrentPlannedRoute();
     if (!plannedRoutePoints || plannedRoutePoints.length === 0) return;
@@ -316,14 +305,8 @@ function drawPlannedRouteOnMainMap(plannedRoutePoints, vesselCurrentLatLng) {
 }
 
 function addVesselMarker(vesselMapData) {
-    const { vessel_id, name, latest_position_wkt, latest_heading } = vesselMapData;
-    if (!latest_position_wkt) {
-        console.warn(`Brak najnowszej pozycji dla statku ${name} (ID: ${vessel_id})`);
-        return;
-    }
-    const coords = parseWKTPosition(latest_position_wkt);
-    if (!coords) return;
-    const latLng = [coords.lat, coords.lon];
+    const { vessel_id, name, longitude, latitude, latest_heading } = vesselMapData;
+    const latLng = [latitude, longitude];
     const rotation = parseFloat(latest_heading) || 0;
     if (vesselMarkers[vessel_id]) {
         vesselMarkers[vessel_id].setLatLng(latLng);
@@ -340,41 +323,116 @@ function addVesselMarker(vesselMapData) {
     }
 }
 
-async function loadInitialMapData() {
+function removeVesselMarkersExcept(visibleIds) {
+    Object.keys(vesselMarkers).forEach(id => {
+        const vesselId = Number(id);
+        if (!visibleIds.has(vesselId)) {
+            map.removeLayer(vesselMarkers[vesselId]);
+            delete vesselMarkers[vesselId];
+        }
+    });
+}
+
+function createClusterIcon(count) {
+    // Rozmiar rośnie logarytmicznie z liczbą statków w klastrze
+    const size = Math.round(24 + 8 * Math.log10(count));
+    return L.divIcon({
+        html: `<div style="background-color: rgba(13, 148, 136, 0.8); color: white; width: ${size}px; height: ${size}px; line-height: ${size}px; border-radius: 50%; border: 2px solid white; text-align: center; font-size: 12px; font-weight: 600; box-shadow: 0 0 4px rgba(0,0,0,0.4);">${count}</div>`,
+        className: 'vessel-cluster-marker',
+        iconSize: [size, size],
+        iconAnchor: [size / 2, size / 2]
+    });
+}
+
+function renderClusters(clusters) {
+    clusterMarkersGroup.clearLayers();
+    clusters.forEach(cluster => {
+        const latLng = [cluster.latitude, cluster.longitude];
+        L.marker(latLng, { icon: createClusterIcon(cluster.count) })
+            .addTo(clusterMarkersGroup)
+            .bindTooltip(`Statków: ${cluster.count}`)
+            .on('click', () => map.setView(latLng, map.getZoom() + 2));
+    });
+    clusterMarkersGroup.addTo(map);
+}
+
+function normalizeLongitude(lon) {
+    return ((lon + 180) % 360 + 360) % 360 - 180;
+}
+
+// Widoczny obszar jako min_lon,min_lat,max_lon,max_lat; przy przewinięciu
+// mapy przez antypołudnik min_lon > max_lon (backend dzieli prostokąt na dwa)
+function currentBBoxParam() {
+    const bounds = map.getBounds();
+    let west = bounds.getWest();
+    let east = bounds.getEast();
+    if (east - west >= 360) {
+        west = -180;
+        east = 180;
+    } else {
+        west = normalizeLongitude(west);
+        east = normalizeLongitude(east);
+    }
+    const south = Math.max(bounds.getSouth(), -90);
+    const north = Math.min(bounds.getNorth(), 90);
+    return [west, south, east, north].map(v => v.toFixed(5)).join(',');
+}
+
+async function loadViewportMapData() {
+    // Nowszy widok unieważnia trwające żądanie poprzedniego
+    if (viewportRequestController) viewportRequestController.abort();
+    viewportRequestController = new AbortController();
+    const params = new URLSearchParams({
+        bbox: currentBBoxParam(),
+        zoom: String(map.getZoom()),
+        include_routes: 'true'
+    });
     try {
-        const panelVesselName = document.getElementById('panel-vessel-name');
-        const panelVesselDetails = document.getElementById('panel-vessel-details');
-        if(panelVesselName) panelVesselName.textContent = "Ładowanie...";
-        if(panelVesselDetails) panelVesselDetails.innerHTML = '<p class="text-gray-400">Ładowanie mapy...</p>';
-        const response = await fetch('/map-data/initial-vessels-public');
+        const response = await fetch(`/map-data/vessels-public?${params}`, {
+            signal: viewportRequestController.signal
+        });
         if (!response.ok) {
             const errorData = await response.json().catch(() => null);
-            throw new Error(`Nie udało się pobrać danych inicjalnych mapy: ${errorData ? errorData.detail : response.statusText}`);
+            throw new Error(`Nie udało się pobrać danych mapy: ${errorData ? errorData.detail : response.statusText}`);
         }
-        allVesselsMapData = await response.json();
-        console.log("Pobrano publiczne dane inicjalne mapy:", allVesselsMapData);
-        if (!allVesselsMapData || allVesselsMapData.length === 0) {
-            hideVesselInfoPanel();
+        const viewportData = await response.json();
+
+        if (viewportData.clustered) {
+            removeVesselMarkersExcept(new Set());
+            renderClusters(viewportData.clusters);
             return;
         }
-        allVesselsMapData.forEach(vesselData => {
+        clusterMarkersGroup.clearLayers();
+        const visibleIds = new Set();
+        viewportData.vessels.forEach(vesselData => {
+            allVesselsMapData[vesselData.vessel_id] = vesselData;
+            visibleIds.add(vesselData.vessel_id);
             addVesselMarker(vesselData);
         });
-        const firstVesselWithPosition = allVesselsMapData.find(v => v.latest_position_wkt);
-        if (firstVesselWithPosition) {
-            const firstPosCoords = parseWKTPosition(firstVesselWithPosition.latest_position_wkt);
-            if (firstPosCoords) map.setView([firstPosCoords.lat, firstPosCoords.lon], 7);
-            selectedVesselId = null;
-            await handleVesselClick(firstVesselWithPosition.vessel_id);
-        } else {
-            hideVesselInfoPanel();
+        removeVesselMarkersExcept(visibleIds);
+
+        // Przy pierwszym załadowaniu wybierz pierwszy widoczny statek
+        if (!initialVesselSelected) {
+            initialVesselSelected = true;
+            if (viewportData.vessels.length > 0) {
+                selectedVesselId = null;
+                await handleVesselClick(viewportData.vessels[0].vessel_id);
+            } else {
+                hideVesselInfoPanel();
+            }
         }
     } catch (error) {
-        console.error("Błąd podczas ładowania danych inicjalnych mapy:", error);
-        hideVesselInfoPanel();
+        if (error.name === 'AbortError') return;
+        console.error("Błąd podczas ładowania danych mapy:", error);
+        if (!initialVesselSelected) hideVesselInfoPanel();
     }
 }
 
+function scheduleViewportReload() {
+    clearTimeout(viewportReloadTimer);
+    viewportReloadTimer = setTimeout(loadViewportMapData, VIEWPORT_RELOAD_DELAY_MS);
+}
+
 
 // Inicjalizacja
 document.addEventListener('DOMContentLoaded', () => {
@@ -388,5 +446,16 @@ document.addEventListener('DOMContentLoaded', () => {
         maxZoom: 18, minZoom: 3
     }).addTo(map);
 
-    loadInitialMapData();
+    const panelVesselName = document.getElementById('panel-vessel-name');
+    const panelVesselDetails = document.getElementById('panel-vessel-details');
+    if(panelVesselName) panelVesselName.textContent = "Ładowanie...";
+    if(panelVesselDetails) panelVesselDetails.innerHTML = '<p class="text-gray-400">Ładowanie mapy...</p>';
+
+    // Dane tylko dla widocznego obszaru - przeładowanie po przesunięciu/zmianie zoomu
+    map.on('moveend', scheduleViewportReload);
+    // Uproszczenie śladu zależy od zoomu - po zmianie pobieramy go ponownie
+    map.on('zoomend', () => {
+        if (selectedVesselId) drawVesselTrack(selectedVesselId);
+    });
+    loadViewportMapData();
 });
@@ -1,8 +1,10 @@
 // Globalne zmienne
 let singleSensorChart = null; // Instancja dla pojedynczego, dużego wykresu
 const multipleSensorCharts = {}; // Obiekt do przechowywania instancji wielu wykresów (key: sensorId)
-let autoRefreshIntervalId = null; // ID interwału dla auto-odświeżania
-const REFRESH_INTERVAL_MS = 10000; // Odświeżaj co 10 sekund (dla zakresu 1h)
+let liveEventSource = null; // Subskrypcja nowych odczytów (SSE)
+// Stan aktualizacji przyrostowych: narysowane odczyty, id ostatniego odczytu i ETag
+let singleChartState = null; // {sensorId, readings, lastId, etag}
+let multipleChartsState = null; // {vesselId, groups, lastId, etag}
 
 // Elementy DOM
 const vesselSelect = document.getElementById("vesselSelect");
@@ -220,7 +222,7 @@ async function handleSensorOrTimeRangeChange() {
         clearAllChartsAndMessages();
         // displayNoDataMessage(true); // Komunikat o braku wyboru sensora
     }
-    setupAutoRefresh(); // Ustaw/zresetuj auto-odświeżanie
+    setupLiveUpdates(); // Ustaw/zresetuj aktualizacje na żywo
 }
 
 function clearAllChartsAndMessages() {
@@ -251,7 +253,7 @@ async function loadAndDrawSingleChart(sensorId) {
         const params = new URLSearchParams({
             start_time: startTime.toISOString(),
             end_time: endTime.toISOString(),
-            limit: 5000
+            max_points: 1000 // Backend próbkuje cały zakres (LTTB), kształt wykresu zostaje
         });
         const response = await fetch(`/sensors-overview/api/sensors/${sensorId}/readings?${params.toString()}`);
         if (!response.ok) {
@@ -259,6 +261,12 @@ async function loadAndDrawSingleChart(sensorId) {
             throw new Error(`Nie udało się pobrać odczytów: ${err.detail || response.statusText}`);
         }
         const readings = await response.json();
+        singleChartState = {
+            sensorId,
+            readings: readings || [],
+            lastId: maxReadingId(readings || [], null),
+            etag: null, // ETag dotyczy zapytania z max_points, nie zapytań przyrostowych
+        };
         if (readings && readings.length > 0) {
             drawSingleChart(readings, sensorId);
         } else {
@@ -280,19 +288,40 @@ async function loadAndDrawMultipleCharts(vesselId) {
     const startTime = getStartTimeForRange(selectedTimeRange);
     const endTime = new Date();
 
-    // Najpierw pobierz listę sensorów dla statku
-    let sensorsOnVessel = [];
+    // Jedno żądanie: odczyty wszystkich sensorów statku pogrupowane po sensorze
+    let sensorGroups = [];
     try {
-        const sensorsResponse = await fetch(`/sensors-overview/api/vessels/${vesselId}/sensors`);
-        if (!sensorsResponse.ok) throw new Error("Nie udało się pobrać listy sensorów dla statku.");
-        sensorsOnVessel = await sensorsResponse.json();
+        const params = new URLSearchParams({
+            start_time: startTime.toISOString(),
+            end_time: endTime.toISOString(),
+            max_points: 300 // Mniej punktów dla wielu małych wykresów
+        });
+        const response = await fetch(`/sensors-overview/api/vessels/${vesselId}/sensor-readings?${params.toString()}`);
+        if (!response.ok) {
+            const err = await response.json().catch(() => ({detail: "Błąd serwera"}));
+            throw new Error(`Nie udało się pobrać odczytów sensorów statku: ${err.detail || response.statusText}`);
+        }
+        sensorGroups = (await response.json()).sensors;
     } catch (error) {
         console.error(error);
         displayChartError(error.message);
         return;
     }
 
-    if (!sensorsOnVessel || sensorsOnVessel.length === 0) {
+    multipleChartsState = {
+        vesselId,
+        groups: sensorGroups || [],
+        lastId: (sensorGroups || []).reduce((last, group) => maxReadingId(group.readings || [], last), null),
+        etag: null,
+    };
+    renderMultipleCharts(multipleChartsState.groups);
+}
+
+/**
+ * Rysuje wykresy wszystkich sensorów statku od nowa (po jednym canvasie na sensor z danymi).
+ */
+function renderMultipleCharts(sensorGroups) {
+    if (!sensorGroups || sensorGroups.length === 0) {
         displayNoDataMessage(true);
         return;
     }
@@ -303,45 +332,21 @@ async function loadAndDrawMultipleCharts(vesselId) {
     multipleChartsContainer.innerHTML = ''; // Wyczyść kontener
 
     let chartsRendered = 0;
-    for (const sensor of sensorsOnVessel) {
-        try {
-            const params = new URLSearchParams({
-                start_time: startTime.toISOString(),
-                end_time: endTime.toISOString(),
-                limit: 1000 // Mniejszy limit dla wielu wykresów
-            });
-            const readingsResponse = await fetch(`/sensors-overview/api/sensors/${sensor.id}/readings?${params.toString()}`);
-            if (!readingsResponse.ok) {
-                console.warn(`Nie udało się pobrać odczytów dla sensora ${sensor.name} (ID: ${sensor.id})`);
-                continue; // Przejdź do następnego sensora
-            }
-            const readings = await readingsResponse.json();
-
-            if (readings && readings.length > 0) {
-                const canvasId = `sensorChart-${sensor.id}`;
-                const chartDiv = document.createElement('div');
-                chartDiv.className = 'chart-container-multiple'; // Styl dla kontenera wykresu
-                const canvas = document.createElement('canvas');
-                canvas.id = canvasId;
-                chartDiv.appendChild(canvas);
-                multipleChartsContainer.appendChild(chartDiv);
-                
-                drawIndividualChart(readings, sensor, canvasId, true); // true dla isMultipleView
-                chartsRendered++;
-            }
-        } catch (error) {
-            console.error(`Błąd ładowania odczytów dla sensora ${sensor.name}:`, error);
-            // Można dodać komunikat błędu dla tego konkretnego wykresu
-            const errorP = document.createElement('p');
-            errorP.className = 'text-red-400 text-xs p-2';
-            errorP.textContent = `Błąd ładowania danych dla ${sensor.name}.`;
-            const chartDiv = document.createElement('div');
-            chartDiv.className = 'chart-container-multiple flex items-center justify-center';
-            chartDiv.appendChild(errorP);
-            multipleChartsContainer.appendChild(chartDiv);
-        }
+    for (const group of sensorGroups) {
+        if (!group.readings || group.readings.length === 0) continue;
+        const sensor = {id: group.sensor_id, name: group.sensor_name, measurement_unit: group.measurement_unit};
+        const canvasId = `sensorChart-${sensor.id}`;
+        const chartDiv = document.createElement('div');
+        chartDiv.className = 'chart-container-multiple'; // Styl dla kontenera wykresu
+        const canvas = document.createElement('canvas');
+        canvas.id = canvasId;
+        chartDiv.appendChild(canvas);
+        multipleChartsContainer.appendChild(chartDiv);
+
+        drawIndividualChart(group.readings, sensor, canvasId, true); // true dla isMultipleView
+        chartsRendered++;
     }
-    if (chartsRendered === 0 && sensorsOnVessel.length > 0) {
+    if (chartsRendered === 0) {
         displayNoDataMessage(true); // Jeśli były sensory, ale żaden nie miał danych
     }
 }
@@ -508,31 +513,172 @@ function drawIndividualChart(readings, sensor, canvasId, isMultipleView) {
 }
 
 /**
- * Ustawia lub czyści interwał automatycznego odświeżania.
+ * Największe id odczytu na liście (lub `current`, jeśli większe).
+ */
+function maxReadingId(readings, current) {
+    return readings.reduce((last, r) => (last === null || r.id > last ? r.id : last), current);
+}
+
+/**
+ * Dokleja nowe (nieznane) odczyty, sortuje po czasie (spóźnione odczyty) i usuwa te sprzed początku okna.
+ */
+function mergeReadings(readings, newReadings, windowStart) {
+    // Ten sam odczyt może przyjść strumieniem i w dociągnięciu po połączeniu, a backend
+    // przy after_id zwraca też zakładkę znanych odczytów (zatwierdzonych poza kolejnością id)
+    const knownIds = new Set(readings.map(r => r.id));
+    return readings
+        .concat(newReadings.filter(r => !knownIds.has(r.id)))
+        .filter(r => new Date(r.timestamp) >= windowStart)
+        .sort((a, b) => new Date(a.timestamp) - new Date(b.timestamp));
+}
+
+/**
+ * Pobiera odczyty zapisane po ostatnio widzianym (after_id, z zakładką po stronie backendu) z If-None-Match.
+ * Zwraca null, gdy backend odpowie 304 (brak nowych danych).
+ * Parametry zapytania nie zmieniają się między pustymi odświeżeniami, więc ETag pozostaje ważny.
+ */
+async function fetchDelta(url, state) {
+    const headers = state.etag ? {"If-None-Match": state.etag} : {};
+    const response = await fetch(url, {headers, cache: "no-store"});
+    if (response.status === 304) return null;
+    if (!response.ok) {
+        const err = await response.json().catch(() => ({detail: "Błąd serwera"}));
+        throw new Error(`Nie udało się pobrać nowych odczytów: ${err.detail || response.statusText}`);
+    }
+    state.etag = response.headers.get("ETag");
+    return response.json();
+}
+
+/**
+ * Dokłada nowe odczyty do pojedynczego wykresu i rysuje go ponownie.
+ */
+function applySingleChartReadings(state, newReadings) {
+    if (!newReadings || newReadings.length === 0) return;
+    const windowStart = getStartTimeForRange(timeRangeSelect.value);
+    state.lastId = maxReadingId(newReadings, state.lastId);
+    state.readings = mergeReadings(state.readings, newReadings, windowStart);
+    clearMessagesAndPrepareDisplay(true);
+    drawSingleChart(state.readings, state.sensorId);
+}
+
+/**
+ * Dokłada nowe odczyty (grupy {sensor_id, readings}) do wykresów statku i rysuje je ponownie.
+ */
+function applyMultipleChartsReadings(state, newGroups) {
+    newGroups = newGroups.filter(group => group.readings && group.readings.length > 0);
+    if (newGroups.length === 0) return;
+
+    const windowStart = getStartTimeForRange(timeRangeSelect.value);
+    for (const newGroup of newGroups) {
+        const group = state.groups.find(g => g.sensor_id === newGroup.sensor_id);
+        if (group) {
+            group.readings = mergeReadings(group.readings || [], newGroup.readings, windowStart);
+        } else if (newGroup.sensor_name !== undefined) {
+            state.groups.push(newGroup);
+        }
+        state.lastId = maxReadingId(newGroup.readings, state.lastId);
+    }
+    clearMessagesAndPrepareDisplay(false);
+    renderMultipleCharts(state.groups);
+}
+
+/**
+ * Dociąga przyrostowo odczyty pojedynczego wykresu; bez stanu (pierwsze ładowanie) rysuje od nowa.
+ */
+async function refreshSingleChart(sensorId) {
+    const state = singleChartState;
+    if (!state || String(state.sensorId) !== String(sensorId) || state.lastId === null) {
+        await loadAndDrawSingleChart(sensorId);
+        return;
+    }
+    const params = new URLSearchParams({after_id: state.lastId});
+    const newReadings = await fetchDelta(`/sensors-overview/api/sensors/${sensorId}/readings?${params.toString()}`, state);
+    applySingleChartReadings(state, newReadings);
+}
+
+/**
+ * Dociąga przyrostowo odczyty wszystkich sensorów statku (jedno żądanie grupowane).
+ */
+async function refreshMultipleCharts(vesselId) {
+    const state = multipleChartsState;
+    if (!state || String(state.vesselId) !== String(vesselId) || state.lastId === null) {
+        await loadAndDrawMultipleCharts(vesselId);
+        return;
+    }
+    const params = new URLSearchParams({after_id: state.lastId});
+    const data = await fetchDelta(`/sensors-overview/api/vessels/${vesselId}/sensor-readings?${params.toString()}`, state);
+    if (data) applyMultipleChartsReadings(state, data.sensors || []);
+}
+
+/**
+ * Obsługuje zdarzenie "readings" ze strumienia na żywo (płaska lista odczytów).
+ */
+function handleLiveReadings(readings, selectedSensorValue, selectedVesselId) {
+    if (selectedSensorValue !== "all") {
+        const state = singleChartState;
+        if (!state || String(state.sensorId) !== String(selectedSensorValue)) return;
+        applySingleChartReadings(state, readings.filter(r => String(r.sensor_id) === String(state.sensorId)));
+        return;
+    }
+    const state = multipleChartsState;
+    if (!state || String(state.vesselId) !== String(selectedVesselId)) return;
+    const groups = {};
+    for (const reading of readings) {
+        (groups[reading.sensor_id] = groups[reading.sensor_id] || {sensor_id: reading.sensor_id, readings: []})
+            .readings.push(reading);
+    }
+    applyMultipleChartsReadings(state, Object.values(groups));
+}
+
+/**
+ * Otwiera (lub zamyka) subskrypcję nowych odczytów (SSE) dla bieżącego widoku.
+ * Zastępuje odpytywanie co kilka sekund: backend wypycha odczyty po ich zapisie,
+ * a po (ponownym) połączeniu dociągamy jedynie to, co mogło umknąć (after_id).
  */
-function setupAutoRefresh() {
-    if (autoRefreshIntervalId) {
-        clearInterval(autoRefreshIntervalId);
-        autoRefreshIntervalId = null;
+function setupLiveUpdates() {
+    if (liveEventSource) {
+        liveEventSource.close();
+        liveEventSource = null;
     }
 
     const selectedTimeRange = timeRangeSelect.value;
     const selectedSensorValue = sensorSelect.value;
     const selectedVesselId = vesselSelect.value;
 
-    if (selectedTimeRange === "1h" && selectedVesselId) { // Odświeżaj tylko dla zakresu 1h i gdy statek jest wybrany
-        console.log("Ustawiam auto-odświeżanie co", REFRESH_INTERVAL_MS / 1000, "s");
-        autoRefreshIntervalId = setInterval(async () => {
-            console.log("Automatyczne odświeżanie danych...");
-            if (selectedSensorValue && selectedSensorValue !== "all") {
-                await loadAndDrawSingleChart(selectedSensorValue);
-            } else if (selectedSensorValue === "all") {
-                await loadAndDrawMultipleCharts(selectedVesselId);
-            }
-        }, REFRESH_INTERVAL_MS);
+    // Na żywo tylko dla zakresu 1h i gdy wybrano statek oraz sensor (lub "all")
+    if (selectedTimeRange !== "1h" || !selectedVesselId || !selectedSensorValue || !window.EventSource) {
+        console.log("Aktualizacje na żywo nieaktywne (zakres inny niż 1h lub brak wyboru).");
+        return;
+    }
+
+    const params = new URLSearchParams();
+    if (selectedSensorValue === "all") {
+        params.set("vessel_id", selectedVesselId);
     } else {
-        console.log("Auto-odświeżanie nieaktywne (zakres inny niż 1h lub brak statku).");
+        params.set("sensor_ids", selectedSensorValue);
     }
+    const source = new EventSource(`/sensors-overview/api/live?${params.toString()}`);
+    liveEventSource = source;
+
+    source.addEventListener("open", async () => {
+        try {
+            // Odczyty zapisane między pierwszym ładowaniem (lub zerwaniem połączenia) a subskrypcją
+            if (selectedSensorValue === "all") {
+                await refreshMultipleCharts(selectedVesselId);
+            } else {
+                await refreshSingleChart(selectedSensorValue);
+            }
+        } catch (error) {
+            console.error("Błąd dociągania odczytów po połączeniu:", error);
+        }
+    });
+    source.addEventListener("readings", (event) => {
+        handleLiveReadings(JSON.parse(event.data), selectedSensorValue, selectedVesselId);
+    });
+    source.addEventListener("overflow", () => {
+        // Serwer odpiął nas, bo nie nadążaliśmy - połącz ponownie (open dociągnie braki)
+        if (liveEventSource === source) setupLiveUpdates();
+    });
 }
 
 // Event Listeners
@@ -551,7 +697,7 @@ document.addEventListener("DOMContentLoaded", () => {
                 timeRangeSelect.disabled = true;
                 displayNoDataMessage(true);
             }
-            setupAutoRefresh(); // Zresetuj odświeżanie
+            setupLiveUpdates(); // Zresetuj aktualizacje na żywo
         });
 
         sensorSelect.addEventListener("change", handleSensorOrTimeRangeChange);